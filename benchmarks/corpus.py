@@ -0,0 +1,352 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from src.utils.utils import Mode
+from src.tournaments import configurePlayerRoster
+from src.scoreboard_reader.scorebird import scorebird, initBatchWorker
+from src.gameboard_reader.boardbird import boardbird
+
+# The fields checked for each pipeline, in the order they are written to CSV files.
+scoreboard_fields = ('read', 'version', 'winner', 'names', 'final_scores', 'details')
+gameboard_fields = ('read', 'birds')
+habitats = ('FOREST', 'GRASSLANDS', 'WETLANDS')
+
+
+class CorpusImage:
+    def __init__(self, image, pipeline, expected, mentioned_players=None):
+        # A labeled screenshot from a corpus manifest.
+        self.image = image  # The filename, relative filenames are relative to the manifest's directory
+        self.pipeline = pipeline  # 'scorebird' or 'boardbird'
+        self.expected = expected
+        self.mentioned_players = mentioned_players
+
+
+def readManifest(manifest_file):
+    # Read a corpus manifest, either a JSON list or a JSON lines file of labeled screenshots:
+    #  {"image": "scoreboards/12.png", "pipeline": "scorebird", "mentioned_players": null,
+    #   "expected": {"players": [{"name": "foxjoke", "score": 93, "details": {"bird_pts": 42, ...}}, ...],
+    #                "winner": ["foxjoke"], "version": "BASE_EE"}}
+    #  {"image": "gameboards/3.png", "pipeline": "boardbird",
+    #   "expected": {"FOREST": ["Bobolink", ...], "GRASSLANDS": [...], "WETLANDS": [...]}}
+    # Only the expected fields that are given are checked, IE a scoreboard without details only checks its scores.
+    with open(manifest_file) as f:
+        if manifest_file.endswith('.jsonl'):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    corpus = []
+    for entry in entries:
+        image = entry['image']
+        if not os.path.isabs(image) and '://' not in image:
+            image = os.path.join(manifest_dir, image)
+        pipeline = entry.get('pipeline', 'scorebird')
+        if pipeline not in ('scorebird', 'boardbird'):
+            raise ValueError(f'Unknown pipeline {pipeline!r} for {entry["image"]}')
+        corpus.append(CorpusImage(image, pipeline, entry.get('expected', {}), entry.get('mentioned_players')))
+    return corpus
+
+
+def checkScoreboard(results_dict, expected):
+    # Get which fields of a scoreboard result match the expected result, as field name -> (correct, total).
+    # The winner may be a name or a list of names, and the version a Version or its name.
+    checks = {'read': (int('players' in results_dict), 1)}
+    players = list(results_dict.get('players', {}).values())
+
+    if 'version' in expected:
+        version = getattr(results_dict.get('version'), 'name', results_dict.get('version'))
+        checks['version'] = (int(version == getattr(expected['version'], 'name', expected['version'])), 1)
+    if 'winner' in expected:
+        winners = expected['winner'] if isinstance(expected['winner'], list) else [expected['winner']]
+        checks['winner'] = (int(sorted(map(str, results_dict.get('winner', []))) == sorted(winners)), 1)
+
+    expected_players = expected.get('players', [])
+    names = scores = details = num_names = num_details = 0
+    for i, expected_player in enumerate(expected_players):
+        player = players[i] if i < len(players) else {}
+        if 'name' in expected_player:
+            names += player.get('name') == expected_player['name']
+            num_names += 1
+        scores += player.get('score') == expected_player.get('score')
+        player_details = player.get('details') or {}
+        expected_details = expected_player.get('details') or {}
+        details += sum(player_details.get(name) == points for name, points in expected_details.items())
+        num_details += len(expected_details)
+
+    # A result with more players than expected is wrong even if every expected player was read.
+    num_players = max(len(expected_players), len(players))
+    if num_names:
+        checks['names'] = (names, num_names)
+    if expected_players:
+        checks['final_scores'] = (scores, num_players)
+    if num_details:
+        checks['details'] = (details, num_details)
+    return checks
+
+
+def checkGameboard(result_dict, expected):
+    # Get how many birds of each habitat were read in the right place.
+    result_dict = result_dict if isinstance(result_dict, dict) else {}
+    checks = {'read': (int(all(habitat in result_dict for habitat in habitats)), 1)}
+    correct = total = 0
+    for habitat, birds in expected.items():
+        read_birds = result_dict.get(habitat) or []
+        correct += sum(i < len(read_birds) and read_birds[i] == bird for i, bird in enumerate(birds))
+        total += max(len(birds), len(read_birds))
+    if expected:
+        checks['birds'] = (correct, total)
+    return checks
+
+
+def initCorpusWorker(player_file):
+    initBatchWorker()
+    if player_file is not None:
+        configurePlayerRoster(player_file)
+
+
+def readCorpusImage(corpus_image: CorpusImage):
+    # Read one labeled screenshot and check it, returning its record for the run's output.
+    if corpus_image.pipeline == 'scorebird':
+        result = scorebird(corpus_image.image, mentioned_players=corpus_image.mentioned_players,
+                           get_details=True, mode=Mode.NO_DISPLAY, use_cache=False, timings=True)
+        checks = checkScoreboard(result, corpus_image.expected)
+        error = result.get('error')
+    else:
+        result = boardbird(corpus_image.image, mode=Mode.NO_DISPLAY, timings=True)
+        checks = checkGameboard(result, corpus_image.expected)
+        # Boardbird returns an error message instead of a dictionary when the board isn't found.
+        error = None if isinstance(result, dict) else result
+
+    timings = result.get('timings') if isinstance(result, dict) else None
+    return createRecord(corpus_image, checks, timings, error)
+
+
+def createRecord(corpus_image: CorpusImage, checks, timings, error=None):
+    return {'image': corpus_image.image,
+            'pipeline': corpus_image.pipeline,
+            'passed': all(correct == total for correct, total in checks.values()),
+            'fields': {field: list(check) for field, check in checks.items()},
+            'total_ms': timings['total_ms'] if timings else None,
+            'spans': {name: span['ms'] for name, span in timings['spans'].items()} if timings else {},
+            'error': error}
+
+
+def runCorpus(corpus, workers=None, player_file=None):
+    # Read every labeled screenshot across a pool of worker processes, returning the records in manifest order
+    # and the wall time of the run. Only a few images per worker are in flight so a large archive isn't queued
+    # all at once.
+    records = [None] * len(corpus)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=initCorpusWorker, initargs=(player_file,)) as executor:
+        max_pending = 2 * (workers or os.cpu_count() or 1)
+        items = iter(enumerate(corpus))
+        pending = {}
+
+        while True:
+            for i, corpus_image in items:
+                pending[executor.submit(readCorpusImage, corpus_image)] = i
+                if len(pending) >= max_pending:
+                    break
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                try:
+                    records[i] = future.result()
+                except Exception as e:
+                    # A crashed read fails every field it was expected to have.
+                    checks = {'read': (0, 1)}
+                    records[i] = createRecord(corpus[i], checks, None, f'{corpus[i].pipeline} failed with {e!r}')
+    return records, time.perf_counter() - start
+
+
+def summarizeRun(records, elapsed):
+    # Get the overall accuracy of each pipeline's fields and its latency, as written to the output file.
+    summary = {'images': len(records), 'seconds': round(elapsed, 3),
+               'images_per_second': round(len(records) / elapsed, 3) if elapsed else None,
+               'pipelines': {}}
+    for record in records:
+        pipeline = summary['pipelines'].setdefault(record['pipeline'], {'images': 0, 'passed': 0, 'fields': {},
+                                                                        'mean_ms': 0.0, 'stages_ms': {}})
+        pipeline['images'] += 1
+        pipeline['passed'] += record['passed']
+        for field, (correct, total) in record['fields'].items():
+            field_total = pipeline['fields'].setdefault(field, [0, 0])
+            field_total[0] += correct
+            field_total[1] += total
+        pipeline['mean_ms'] += record['total_ms'] or 0.0
+        for name, ms in record['spans'].items():
+            pipeline['stages_ms'][name] = pipeline['stages_ms'].get(name, 0.0) + ms
+
+    for pipeline in summary['pipelines'].values():
+        pipeline['mean_ms'] = round(pipeline['mean_ms'] / pipeline['images'], 3)
+        pipeline['stages_ms'] = {name: round(ms / pipeline['images'], 3) for name, ms in pipeline['stages_ms'].items()}
+        pipeline['accuracy'] = {field: correct / total if total else 1.0
+                                for field, (correct, total) in pipeline['fields'].items()}
+    return summary
+
+
+def writeRun(output_file, records, summary):
+    # Write the run as JSON (the summary and every record) or as CSV (one row per image) by the file extension.
+    if output_file.endswith('.csv'):
+        fields = [field for field in scoreboard_fields + gameboard_fields
+                  if any(field in record['fields'] for record in records)]
+        fields = list(dict.fromkeys(fields))
+        stages = sorted({name for record in records for name in record['spans']})
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['image', 'pipeline', 'passed'] + fields + ['total_ms'] + stages + ['error'])
+            for record in records:
+                row = [record['image'], record['pipeline'], int(record['passed'])]
+                row += ['/'.join(map(str, record['fields'][field])) if field in record['fields'] else ''
+                        for field in fields]
+                row += [record['total_ms'] if record['total_ms'] is not None else '']
+                row += [record['spans'].get(name, '') for name in stages]
+                row += [record['error'] or '']
+                writer.writerow(row)
+    else:
+        with open(output_file, 'w') as f:
+            json.dump({'summary': summary, 'records': records}, f, indent=2)
+
+
+def readRun(run_file):
+    # Read the records of an earlier run from its JSON or CSV output.
+    if not run_file.endswith('.csv'):
+        with open(run_file) as f:
+            return json.load(f)['records']
+
+    records = []
+    with open(run_file, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        for row in reader:
+            values = dict(zip(header, row))
+            record = {'image': values['image'], 'pipeline': values['pipeline'], 'passed': values['passed'] == '1',
+                      'fields': {}, 'spans': {}, 'error': values['error'] or None,
+                      'total_ms': float(values['total_ms']) if values['total_ms'] else None}
+            for column in header[3:header.index('total_ms')]:
+                if values[column]:
+                    record['fields'][column] = [int(value) for value in values[column].split('/')]
+            for column in header[header.index('total_ms') + 1:-1]:
+                if values[column]:
+                    record['spans'][column] = float(values[column])
+            records.append(record)
+    return records
+
+
+def diffRuns(records, previous_records):
+    # Compare a run to an earlier run of the same corpus: the images that now fail or now pass,
+    # and how each pipeline's field accuracy and mean latency changed.
+    previous_by_image = {record['image']: record for record in previous_records}
+    newly_failing = []
+    newly_passing = []
+    for record in records:
+        previous = previous_by_image.get(record['image'])
+        if previous is None:
+            continue
+        if previous['passed'] and not record['passed']:
+            newly_failing.append(record['image'])
+        elif not previous['passed'] and record['passed']:
+            newly_passing.append(record['image'])
+
+    # Only compare the images that are in both runs so that a changed corpus doesn't look like a regression.
+    images = {record['image'] for record in records} & set(previous_by_image)
+    summary = summarizeRun([record for record in records if record['image'] in images], 0)
+    previous_summary = summarizeRun([record for record in previous_records if record['image'] in images], 0)
+
+    pipelines = {}
+    for name, pipeline in summary['pipelines'].items():
+        previous = previous_summary['pipelines'].get(name)
+        if previous is None:
+            continue
+        pipelines[name] = {
+            'accuracy': {field: (previous['accuracy'].get(field), accuracy)
+                         for field, accuracy in pipeline['accuracy'].items()},
+            'mean_ms': (previous['mean_ms'], pipeline['mean_ms']),
+            'stages_ms': {stage: (previous['stages_ms'].get(stage), ms) for stage, ms in pipeline['stages_ms'].items()}}
+
+    return {'images': len(images), 'newly_failing': newly_failing, 'newly_passing': newly_passing,
+            'pipelines': pipelines}
+
+
+def hasAccuracyRegression(diff):
+    # A run regresses if any image that passed before now fails or any field is less accurate.
+    if diff['newly_failing']:
+        return True
+    for pipeline in diff['pipelines'].values():
+        for previous, accuracy in pipeline['accuracy'].values():
+            if previous is not None and accuracy < previous:
+                return True
+    return False
+
+
+def printSummary(summary):
+    print(f'\n{summary["images"]} images in {summary["seconds"]:.3f} s ({summary["images_per_second"]:.2f} images per second)')
+    for name, pipeline in summary['pipelines'].items():
+        print(f'\n{name}: {pipeline["passed"]}/{pipeline["images"]} images passed, {pipeline["mean_ms"]:.2f} ms per image')
+        for field, (correct, total) in pipeline['fields'].items():
+            print(f'\t{field:<32} {correct}/{total} ({pipeline["accuracy"][field]:.1%})')
+        print('\tStages (ms per image):')
+        for stage, ms in sorted(pipeline['stages_ms'].items(), key=lambda item: item[1], reverse=True):
+            print(f'\t\t{stage:<32} {ms:9.2f}')
+
+
+def printDiff(diff):
+    def formatChange(previous, current, unit):
+        if previous is None:
+            return f'{current:{unit}} (new)'
+        return f'{previous:{unit}} -> {current:{unit}}'
+
+    print(f'\nCompared to the previous run ({diff["images"]} images in both runs):')
+    for name, pipeline in diff['pipelines'].items():
+        print(f'\n{name}: {formatChange(*pipeline["mean_ms"], ".2f")} ms per image')
+        for field, (previous, accuracy) in pipeline['accuracy'].items():
+            print(f'\t{field:<32} {formatChange(previous, accuracy, ".1%")}')
+        print('\tStages (ms per image):')
+        for stage, (previous, ms) in pipeline['stages_ms'].items():
+            print(f'\t\t{stage:<32} {formatChange(previous, ms, ".2f")}')
+
+    for image in diff['newly_failing']:
+        print(f'\tNow failing: {image}')
+    for image in diff['newly_passing']:
+        print(f'\tNow passing: {image}')
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Check the readers against a labeled corpus of screenshots.')
+    parser.add_argument('manifest', help='The JSON or JSON lines manifest of labeled screenshots')
+    parser.add_argument('-o', '--output', help='Write the run to a .json or .csv file')
+    parser.add_argument('-p', '--previous', help='An earlier run\'s .json or .csv output to compare to')
+    parser.add_argument('-w', '--workers', type=int, help='The number of worker processes, defaults to the number of CPUs')
+    parser.add_argument('--players', help='The players JSON file to read names from instead of signups/players.json')
+    args = parser.parse_args(args)
+
+    corpus = readManifest(args.manifest)
+    records, elapsed = runCorpus(corpus, args.workers, args.players)
+    summary = summarizeRun(records, elapsed)
+    printSummary(summary)
+    if args.output:
+        writeRun(args.output, records, summary)
+
+    if args.previous:
+        diff = diffRuns(records, readRun(args.previous))
+        printDiff(diff)
+        # Fail so that a script or CI job can reject a change that loses accuracy.
+        if hasAccuracyRegression(diff):
+            print('\nAccuracy regressed from the previous run')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    # Usage: python -m benchmarks.corpus manifest.json [-o run.json] [-p previous_run.json] [-w workers]
+    sys.exit(main())
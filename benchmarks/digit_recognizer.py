@@ -0,0 +1,77 @@
+import sys
+import time
+
+from src.scoreboard_reader.scoreboard import Scoreboard
+from src.scoreboard_reader.final_score import final_score_recognizer
+from src.scoreboard_reader.detailed_score import detailed_score_recognizer
+from src.utils.templates import getDigitTemplates
+from src.utils.matching_point import findBestMatchingPoints, findTemplateMatchingPoints
+
+
+def legacyFindDigits(image_gray, score_type, threshold):
+    # The previous digit reader which ran a separate template match and
+    # clustering pass for every digit template, kept here for comparison.
+    best_digit_points = {}
+    for template in getDigitTemplates(score_type):
+        matching_points_dict = findTemplateMatchingPoints(image_gray, template, threshold)
+        if matching_points_dict:
+            for point in findBestMatchingPoints(matching_points_dict):
+                best_digit_points[point] = (template.label, matching_points_dict[point].value)
+    return best_digit_points
+
+
+def getPlayerRows(filename):
+    # Run the scoreboard pipeline up to the digit reading stages and return
+    # the final score and detailed score images for each player row.
+    scoreboard = Scoreboard(None)
+    if not (scoreboard.readImage(filename) and scoreboard.findScoreboardRectangle()):
+        raise ValueError(f'Could not find a scoreboard in {filename}')
+    scoreboard.resizeScoreboard()
+    if not scoreboard.findScoreboardFeathers():
+        raise ValueError(f'Could not find the scoreboard feathers in {filename}')
+    scoreboard.findFinalScores()
+    scoreboard.decipherFinalScores()
+    scoreboard.findDetailedScores()
+
+    return [(player.final_score.image_gray, player.detailed_score.image_gray)
+            for player in scoreboard.players_dict.values()]
+
+
+def timePerRow(rows, read_row, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in rows:
+            read_row(*row)
+    return (time.perf_counter() - start) / (repeat * len(rows))
+
+
+def benchmark(filename, repeat=50):
+    rows = getPlayerRows(filename)
+
+    def readRowLegacy(final_image, detailed_image):
+        legacyFindDigits(final_image, 'final_score', final_score_recognizer.threshold)
+        legacyFindDigits(detailed_image, 'detailed_score', detailed_score_recognizer.threshold)
+
+    def readRow(final_image, detailed_image):
+        final_score_recognizer.findDigits(final_image)
+        detailed_score_recognizer.findDigits(detailed_image)
+
+    # Warm up both readers so template loading isn't part of the timing
+    readRowLegacy(*rows[0])
+    readRow(*rows[0])
+
+    legacy_time = timePerRow(rows, readRowLegacy, repeat)
+    recognizer_time = timePerRow(rows, readRow, repeat)
+
+    print(f'\n{filename}: {len(rows)} player rows, {repeat} repeats')
+    print(f'\tPer template loop:  {legacy_time * 1000:.3f} ms per player row')
+    print(f'\tDigit recognizer:   {recognizer_time * 1000:.3f} ms per player row')
+    print(f'\tSpeedup:            {legacy_time / recognizer_time:.2f}x')
+    return legacy_time, recognizer_time
+
+
+if __name__ == '__main__':
+    # Usage: python -m benchmarks.digit_recognizer [screenshot ...]
+    filenames = sys.argv[1:] or ['scoreboard_example1.png']
+    for filename in filenames:
+        benchmark(filename)
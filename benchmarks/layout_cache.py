@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import random
+import tempfile
+
+import cv2
+
+from src.utils.utils import Version
+from src.tournaments import configurePlayerRoster
+from src.utils.layout_cache import configureLayoutCache
+from src.scoreboard_reader.scorebird import scorebird
+from benchmarks.synthetic import createScoreboard, drawScoreboard, placeOnScreen, cropBoard, player_names, \
+    scoreboard_base_h, scoreboard_background_bgr
+
+# The scoreboard rows of a 3 player synthetic scoreboard start at these y values of the base sized scoreboard,
+# so covering everything below the second row leaves a 2 player scoreboard with the same size and rows.
+third_row_top = 540
+
+
+def createSameSizeScoreboards(version=Version.OE, resolution=(1920, 1080), seed=0):
+    # Draw a 3 player scoreboard and the same scoreboard with its third player covered up. Both have the
+    # same rectangle size and their first two feathers in the same places, like two screenshots from the
+    # same screen with a different number of players.
+    players = createScoreboard(3, version, seed=seed).truth['players']
+    winner = max(players[:2], key=lambda player: player['score'])['name']
+    board_3 = drawScoreboard(players, version, [winner])
+    board_2 = board_3.copy()
+    board_2[third_row_top:scoreboard_base_h] = scoreboard_background_bgr
+
+    images = {}
+    for num_players, board in ((2, board_2), (3, board_3)):
+        screen = placeOnScreen(board, resolution, 0.72, (40, 55, 45), random.Random(seed))
+        images[num_players] = cropBoard(screen, 0.0)
+    return images, players
+
+
+def checkPlayerCountChange(directory, seed=0):
+    # Read a 2 player scoreboard and then a 3 player scoreboard of the same size with the layout cache on
+    # (and the reverse order), checking that the cached layout of the first never drops or adds a player.
+    # Reading the same scoreboard twice checks that the cached layout is still used when it does fit.
+    images, players = createSameSizeScoreboards(seed=seed)
+    filenames = {}
+    for num_players, image in images.items():
+        filenames[num_players] = os.path.join(directory, f'scoreboard_{num_players}_players.png')
+        cv2.imwrite(filenames[num_players], image)
+
+    failures = []
+    for order in ((2, 3), (3, 2), (3, 3)):
+        layout_cache = configureLayoutCache()
+        for num_players in order:
+            results_dict = scorebird(filenames[num_players], use_cache=False)
+            scores = [player['score'] for player in results_dict.get('players', {}).values()]
+            expected_scores = [player['score'] for player in players[:num_players]]
+            print(f'{num_players} players after reading {order[0]}: final scores {scores} '
+                  f'(expected {expected_scores}), layout cache {layout_cache.getStats()}')
+            if sorted(scores) != sorted(expected_scores):
+                failures.append(f'The {num_players} player scoreboard read after the {order[0]} player one '
+                                f'found the final scores {scores}')
+
+        if order[0] == order[1] and layout_cache.getStats()['rejected']:
+            failures.append(f'The cached layout of a {order[0]} player scoreboard was rejected on the same scoreboard')
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        # Read player names from the synthetic players instead of the real signups.
+        player_file = os.path.join(directory, 'players.json')
+        with open(player_file, 'w') as f:
+            json.dump({str(i): {'wingspan name': name} for i, name in enumerate(player_names)}, f)
+        configurePlayerRoster(player_file)
+
+        try:
+            failures = checkPlayerCountChange(directory)
+        finally:
+            configurePlayerRoster()
+            configureLayoutCache(enabled=False)
+
+    for failure in failures:
+        print(f'Incorrect: {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    # Usage: python -m benchmarks.layout_cache
+    # Exits with 1 if a cached scoreboard layout changed the number of players that were read.
+    sys.exit(main())
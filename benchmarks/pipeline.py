@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import itertools
+
+import cv2
+
+from src.utils.utils import Version
+from src.tournaments import configurePlayerRoster
+from src.scoreboard_reader.scorebird import scorebird
+from src.gameboard_reader.boardbird import boardbird
+from benchmarks.synthetic import createScoreboard, createGameboard, player_names
+from benchmarks.corpus import checkScoreboard, checkGameboard
+
+# The variations the synthetic screenshots cycle through. Each is something that has broken a reader stage
+# in real screenshots, IE low resolutions shrink the templates and crops change the scoreboard ratio.
+scoreboard_versions = (Version.BASE_EE, Version.OE, Version.AE_DUET, Version.AE_DUET_OE)
+scoreboard_player_counts = (2, 3, 4, 5)
+scoreboard_resolutions = ((1920, 1080), (2560, 1440), (1366, 768), (1280, 720))
+scoreboard_crops = (0.0, 0.6, 0.95)
+gameboard_layouts = ((4, 3, 3), (5, 5, 5), (2, 4, 1), (3, 0, 5))
+gameboard_resolutions = ((1920, 1080), (2560, 1440), (1600, 900))
+
+
+def createScoreboards(count, seed=0):
+    variations = itertools.cycle(itertools.product(scoreboard_versions, scoreboard_player_counts,
+                                                   scoreboard_resolutions, scoreboard_crops))
+    # Step through the variations with a stride so that a small count still covers every version and player count.
+    variations = itertools.islice(variations, 0, None, 7)
+    return [createScoreboard(num_players, version, resolution, crop, seed=seed + i)
+            for i, (version, num_players, resolution, crop) in zip(range(count), variations)]
+
+
+def createGameboards(count, seed=0):
+    variations = itertools.cycle(itertools.product(gameboard_layouts, gameboard_resolutions))
+    return [createGameboard(layout, resolution, seed=seed + i)
+            for i, (layout, resolution) in zip(range(count), variations)]
+
+
+def writeImages(images, directory, prefix):
+    filenames = []
+    for i, image in enumerate(images):
+        filename = os.path.join(directory, f'{prefix}_{i}.png')
+        cv2.imwrite(filename, image.image_bgr)
+        filenames.append(filename)
+    return filenames
+
+
+def runPipeline(filenames, images, read_image, check_result):
+    # Read every image, returning the wall time, the summed stage timings and the summed accuracy checks.
+    span_totals = {}  # Stage name -> [ms, calls]
+    counter_totals = {}
+    check_totals = {}
+    failures = []
+
+    start = time.perf_counter()
+    for filename, image in zip(filenames, images):
+        result = read_image(filename)
+        timings = result.pop('timings', None) if isinstance(result, dict) else None
+        if timings is not None:
+            for name, span in timings['spans'].items():
+                span_total = span_totals.setdefault(name, [0.0, 0])
+                span_total[0] += span['ms']
+                span_total[1] += span['calls']
+            for name, count in timings['counters'].items():
+                counter_totals[name] = counter_totals.get(name, 0) + count
+
+        checks = check_result(result, image.truth)
+        for field, (correct, total) in checks.items():
+            check_total = check_totals.setdefault(field, [0, 0])
+            check_total[0] += correct
+            check_total[1] += total
+        if any(correct != total for correct, total in checks.values()):
+            failures.append(image.params)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, span_totals, counter_totals, check_totals, failures
+
+
+def printReport(name, num_images, elapsed, span_totals, counter_totals, check_totals, failures):
+    print(f'\n{name}: {num_images} synthetic images')
+    print(f'\tTotal time:         {elapsed:.3f} s')
+    print(f'\tImages per second:  {num_images / elapsed:.2f}')
+
+    print('\tStages (ms per image, calls):')
+    for stage, (ms, calls) in sorted(span_totals.items(), key=lambda item: item[1][0], reverse=True):
+        print(f'\t\t{stage:<32} {ms / num_images:9.2f}  {calls}')
+
+    if counter_totals:
+        print('\tCounters:')
+        for counter, count in sorted(counter_totals.items()):
+            print(f'\t\t{counter:<32} {count}')
+
+    print('\tAccuracy:')
+    for field, (correct, total) in check_totals.items():
+        accuracy = correct / total if total else 1.0
+        print(f'\t\t{field:<32} {correct}/{total} ({accuracy:.1%})')
+
+    for params in failures:
+        print(f'\tIncorrect: {params}')
+
+
+def benchmark(num_scoreboards=16, num_gameboards=8, seed=0):
+    with tempfile.TemporaryDirectory() as directory:
+        # Read player names from the synthetic players instead of the real signups.
+        player_file = os.path.join(directory, 'players.json')
+        with open(player_file, 'w') as f:
+            json.dump({str(i): {'wingspan name': name} for i, name in enumerate(player_names)}, f)
+        configurePlayerRoster(player_file)
+
+        try:
+            scoreboards = createScoreboards(num_scoreboards, seed)
+            gameboards = createGameboards(num_gameboards, seed)
+            scoreboard_files = writeImages(scoreboards, directory, 'scoreboard')
+            gameboard_files = writeImages(gameboards, directory, 'gameboard')
+
+            # Warm up the readers so template loading and OCR start up aren't part of the timing
+            scorebird(scoreboard_files[0], use_cache=False)
+            boardbird(gameboard_files[0])
+
+            results = runPipeline(scoreboard_files, scoreboards,
+                                  lambda filename: scorebird(filename, use_cache=False, timings=True),
+                                  checkScoreboard)
+            printReport('scorebird', len(scoreboards), *results)
+
+            results = runPipeline(gameboard_files, gameboards,
+                                  lambda filename: boardbird(filename, timings=True),
+                                  checkGameboard)
+            printReport('boardbird', len(gameboards), *results)
+        finally:
+            configurePlayerRoster()
+
+
+if __name__ == '__main__':
+    # Usage: python -m benchmarks.pipeline [scoreboards] [gameboards] [seed]
+    args = [int(arg) for arg in sys.argv[1:4]]
+    benchmark(*args)
@@ -0,0 +1,274 @@
+import cv2
+import random
+import numpy as np
+
+from src.utils.utils import Version
+from src.utils.templates import getTemplatesDir
+from src.gameboard_reader.image_reader import getMasterBirdDict
+
+# The synthetic scoreboards are drawn at the size the scoreboard templates were made at (the Scoreboard's
+# base width) and then scaled to the requested screen resolution, so every reader stage has to do the
+# same rescaling work as it does for a real screenshot.
+scoreboard_base_w = 1465
+scoreboard_base_h = 684
+gameboard_base_w = 1600
+gameboard_base_h = 689
+
+# Colors sampled from real screenshots (BGR), or HSV colors in the middle of the reader's color masks.
+scoreboard_background_bgr = (235, 240, 239)
+score_tile_bgr = (243, 247, 247)
+name_text_bgr = (40, 45, 50)
+gameboard_background_hsv = (8, 120, 120)
+bird_card_bgr = (228, 234, 236)
+
+detail_colors = {
+    Version.BASE_EE: {'bird_pts': ('bgr', (191, 195, 190)), 'bonus_pts': ('bgr', (162, 224, 208)),
+                      'eor_pts': ('bgr', (152, 211, 221)), 'egg_pts': ('bgr', (153, 196, 217)),
+                      'cache_pts': ('hsv', (11, 66, 217)), 'tuck_pts': ('bgr', (185, 181, 200))},
+    Version.OE: {'bird_pts': ('bgr', (191, 195, 190)), 'bonus_pts': ('bgr', (162, 224, 208)),
+                 'eor_pts': ('bgr', (152, 211, 221)), 'egg_pts': ('hsv', (19, 65, 220)),
+                 'cache_pts': ('hsv', (14, 80, 220)), 'tuck_pts': ('hsv', (140, 40, 200))},
+}
+nectar_color = ('hsv', (168, 100, 220))
+duet_token_color = ('hsv', (7, 76, 230))
+
+base_detail_names = ['bird_pts', 'bonus_pts', 'eor_pts', 'egg_pts', 'cache_pts', 'tuck_pts']
+
+player_names = ['Foxjoke', 'Groovenphone', 'ElSapoGuapo', 'Jesseeekah', 'Kestrelle', 'Wrenegade',
+                'Plovergirl', 'Tuckmaster', 'Eggbert', 'Nectarine', 'Corvidae', 'Shrikey']
+
+
+class SyntheticImage:
+    def __init__(self, image_bgr, truth, params):
+        # A synthetic screenshot and what the readers should find in it.
+        self.image_bgr = image_bgr
+        self.truth = truth
+        self.params = params  # The options the image was drawn with, IE the resolution and player count
+
+
+def toBgr(color):
+    kind, value = color
+    if kind == 'bgr':
+        return value
+    return tuple(int(c) for c in cv2.cvtColor(np.uint8([[value]]), cv2.COLOR_HSV2BGR)[0, 0])
+
+
+def getDetailNames(version):
+    detail_names = list(base_detail_names)
+    if version in (Version.OE, Version.AE_DUET_OE):
+        detail_names.append('nectar_pts')
+    if version in (Version.AE_DUET, Version.AE_DUET_OE):
+        detail_names.append('duet_token_pts')
+    return detail_names
+
+
+def getDetailColor(version, detail_name):
+    if detail_name == 'nectar_pts':
+        return toBgr(nectar_color)
+    if detail_name == 'duet_token_pts':
+        return toBgr(duet_token_color)
+    # AE Duet boards use the base game colors and the OE colors with nectar.
+    colors = detail_colors[Version.OE if version in (Version.OE, Version.AE_DUET_OE) else Version.BASE_EE]
+    return toBgr(colors[detail_name])
+
+
+def randomDetails(version, rng: random.Random):
+    # Random detailed scores that look like a real game. Nectar and duet tokens are always big enough
+    # for their colors to be noticed since that is how the scoreboard version is detected.
+    details = {'bird_pts': rng.randint(20, 50), 'bonus_pts': rng.randint(0, 15), 'eor_pts': rng.randint(3, 20),
+               'egg_pts': rng.randint(5, 28), 'cache_pts': rng.randint(0, 12), 'tuck_pts': rng.randint(0, 15)}
+    if version in (Version.OE, Version.AE_DUET_OE):
+        details['nectar_pts'] = rng.randint(3, 10)
+    if version in (Version.AE_DUET, Version.AE_DUET_OE):
+        details['duet_token_pts'] = rng.randint(3, 10)
+    return details
+
+
+def readTemplate(name):
+    image = cv2.imread(str(getTemplatesDir() / name))
+    if image is None:
+        raise FileNotFoundError(f'Template image could not be read: {name}')
+    return image
+
+
+def pasteImage(canvas, image, x, y):
+    h, w = image.shape[:2]
+    canvas[y:y + h, x:x + w] = image
+
+
+def fitText(text, max_w, max_h):
+    # Get the font scale and stroke thickness of text that fits within max_w x max_h, and its width.
+    font = cv2.FONT_HERSHEY_DUPLEX
+    (text_w, text_h), baseline = cv2.getTextSize(text, font, 1.0, 2)
+    scale = min(max_w / text_w, max_h / (text_h + baseline), 1.2)
+    # Thick strokes run together in small text, which OCR can't read.
+    thickness = 2 if scale >= 0.65 else 1
+    (text_w, text_h), baseline = cv2.getTextSize(text, font, scale, thickness)
+    return scale, thickness, text_w, text_h
+
+
+def drawText(canvas, text, x, y, max_w, max_h, color=name_text_bgr):
+    # Draw text with its top left at x, y, scaled down to fit within max_w x max_h.
+    scale, thickness, text_w, text_h = fitText(text, max_w, max_h)
+    cv2.putText(canvas, text, (x, y + text_h), cv2.FONT_HERSHEY_DUPLEX, scale, color, thickness, cv2.LINE_AA)
+
+
+def drawNumber(canvas, number, center_x, y, score_type):
+    # Paste the digit templates of a number centered on center_x, returning the drawn width.
+    digits = [readTemplate(f'scoreboard/digits/{score_type}/{digit}.png') for digit in str(number)]
+    total_w = sum(digit.shape[1] for digit in digits)
+    x = center_x - total_w // 2
+    for digit in digits:
+        pasteImage(canvas, digit, x, y)
+        x += digit.shape[1]
+    return total_w
+
+
+def drawScoreboard(players, version, winners):
+    # Draw a scoreboard at the base size. Each player is a dictionary of their name, score and details.
+    canvas = np.full((scoreboard_base_h, scoreboard_base_w, 3), scoreboard_background_bgr, dtype=np.uint8)
+    feather = readTemplate('scoreboard/scoreboard_feather_oe.png')
+    badge = readTemplate('scoreboard/winner_badge.png')
+    detail_names = getDetailNames(version)
+
+    # The winner badges are at the top of the scoreboard with the winner's name above each badge.
+    for i, winner in enumerate(winners):
+        badge_x = 530 + 340 * i
+        pasteImage(canvas, badge, badge_x, 50)
+        name_w = fitText(winner, 260, 30)[2]
+        drawText(canvas, winner, badge_x + badge.shape[1] // 2 - name_w // 2, 8, 260, 30)
+
+    row_spacing = 244 if len(players) <= 2 else 430 // (len(players) - 1)
+    for i, player in enumerate(players):
+        feather_y = 180 + i * row_spacing
+        line_y = feather_y + feather.shape[0] + 4
+
+        # The colored 'counting up' bar, one segment per detail sized by its points.
+        bar_x = 180
+        points_w = min(10.5, 960 / max(player['score'], 1))
+        tile_centers = []
+        for detail_name in detail_names:
+            points = player['details'][detail_name]
+            segment_w = int(round(points * points_w))
+            cv2.rectangle(canvas, (bar_x, line_y - 53), (bar_x + segment_w, line_y + 3),
+                          getDetailColor(version, detail_name), thickness=-1)
+            tile_centers.append(bar_x + segment_w // 2)
+            bar_x += segment_w
+
+        # Every detail has a white tile with its points under its segment, spaced out
+        # so that the numbers of neighboring details are never grouped together.
+        previous_center = None
+        for detail_name, center_x in zip(detail_names, tile_centers):
+            if previous_center is not None:
+                center_x = max(center_x, previous_center + 50)
+            cv2.rectangle(canvas, (center_x - 22, line_y - 16), (center_x + 22, line_y + 17), score_tile_bgr, -1)
+            drawNumber(canvas, player['details'][detail_name], center_x, line_y - 13, 'detailed_score')
+            previous_center = center_x
+
+        # The final score and feather are right of the bar.
+        feather_x = max(bar_x, previous_center + 25) + 100
+        pasteImage(canvas, feather, feather_x, feather_y)
+        drawNumber(canvas, player['score'], feather_x - 22, feather_y + 8, 'final_score')
+
+        # The player's name is left of the bar.
+        drawText(canvas, player['name'], 12, line_y - 45, 150, 30)
+
+    return canvas
+
+
+def placeOnScreen(board, resolution, board_width, background_bgr, rng: random.Random):
+    # Scale a drawn board to a fraction of the screen width and place it on a dark screen.
+    screen_w, screen_h = resolution
+    board_h, board_w = board.shape[:2]
+    new_w = int(screen_w * board_width)
+    new_h = int(board_h * new_w / board_w)
+    if new_h > screen_h:
+        new_h = screen_h
+        new_w = int(board_w * new_h / board_h)
+    board = cv2.resize(board, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    screen = np.full((screen_h, screen_w, 3), background_bgr, dtype=np.uint8)
+    x = (screen_w - new_w) // 2 + rng.randint(-4, 4) if screen_w - new_w > 8 else (screen_w - new_w) // 2
+    y = (screen_h - new_h) // 2
+    pasteImage(screen, board, x, y)
+    return screen
+
+
+def cropBoard(screen, crop):
+    # Crop the screen around the board. A crop of 0 keeps the whole screen and 1 crops right to the board.
+    mask = np.any(screen != screen[0, 0], axis=2)
+    ys, xs = np.nonzero(mask)
+    x1, x2, y1, y2 = xs.min(), xs.max() + 1, ys.min(), ys.max() + 1
+    screen_h, screen_w = screen.shape[:2]
+    x1, y1 = int(x1 * crop), int(y1 * crop)
+    x2, y2 = int(x2 + (screen_w - x2) * (1 - crop)), int(y2 + (screen_h - y2) * (1 - crop))
+    return screen[y1:y2, x1:x2].copy()
+
+
+def createScoreboard(num_players=2, version=Version.BASE_EE, resolution=(1920, 1080), crop=0.0,
+                     board_width=0.72, seed=None) -> SyntheticImage:
+    # Draw a synthetic end of game scoreboard screenshot with random names and scores.
+    #  resolution: The (width, height) of the screen the scoreboard is shown on
+    #  crop: How much of the screen around the scoreboard is cropped off, from 0 (none) to 1 (all)
+    #  board_width: How much of the screen's width the scoreboard takes up
+    rng = random.Random(seed)
+    names = rng.sample(player_names, num_players)
+    players = []
+    for name in names:
+        details = randomDetails(version, rng)
+        players.append({'name': name, 'score': sum(details.values()), 'details': details})
+
+    # Ties are broken by food in the game which the scoreboard can't show, so avoid them.
+    for i, player in enumerate(players):
+        while any(player['score'] == other['score'] for other in players[:i]):
+            player['details']['bird_pts'] += 1
+            player['score'] += 1
+    winner = max(players, key=lambda player: player['score'])['name']
+
+    board = drawScoreboard(players, version, [winner])
+    screen = placeOnScreen(board, resolution, board_width, (40, 55, 45), rng)
+    image = cropBoard(screen, crop)
+
+    truth = {'version': version, 'winner': winner, 'players': players}
+    params = {'num_players': num_players, 'version': version.name, 'resolution': resolution, 'crop': crop,
+              'board_width': board_width, 'seed': seed}
+    return SyntheticImage(image, truth, params)
+
+
+def drawGameboard(habitats):
+    # Draw a game board at the base size. Each habitat is a list of bird names.
+    background = toBgr(('hsv', gameboard_background_hsv))
+    canvas = np.full((gameboard_base_h, gameboard_base_w, 3), background, dtype=np.uint8)
+    air_icon = readTemplate('gameboard/board_air.png')
+    top_left = readTemplate('gameboard/bird_top_left.png')
+    top_right = readTemplate('gameboard/bird_top_right.png')
+
+    pasteImage(canvas, air_icon, 36, 24)
+    card_w, card_h = 258, 195
+    for row, birds in enumerate(habitats):
+        card_y = 40 + 205 * row
+        for column, bird in enumerate(birds):
+            card_x = 96 + 268 * column
+            # The corner templates include some of the board around the card, so the card is inset from them.
+            cv2.rectangle(canvas, (card_x + 4, card_y + 5), (card_x + card_w - 6, card_y + card_h), bird_card_bgr, -1)
+            pasteImage(canvas, top_left, card_x, card_y)
+            pasteImage(canvas, top_right, card_x + card_w - top_right.shape[1], card_y)
+            drawText(canvas, bird.upper(), card_x + top_left.shape[1] + 5, card_y + 18, card_w - 70, 18)
+    return canvas
+
+
+def createGameboard(birds_per_habitat=(4, 3, 3), resolution=(1920, 1080), crop=1.0, board_width=0.85,
+                    seed=None) -> SyntheticImage:
+    # Draw a synthetic end of game board screenshot with random birds played in each habitat.
+    rng = random.Random(seed)
+    bird_names = sorted(bird_dict['Common name'] for bird_dict in getMasterBirdDict().values())
+    habitats = [[rng.choice(bird_names) for _ in range(num_birds)] for num_birds in birds_per_habitat]
+
+    board = drawGameboard(habitats)
+    screen = placeOnScreen(board, resolution, board_width, (30, 30, 30), rng)
+    image = cropBoard(screen, crop)
+
+    truth = {'FOREST': habitats[0], 'GRASSLANDS': habitats[1], 'WETLANDS': habitats[2]}
+    params = {'birds_per_habitat': tuple(birds_per_habitat), 'resolution': resolution, 'crop': crop,
+              'board_width': board_width, 'seed': seed}
+    return SyntheticImage(image, truth, params)
@@ -0,0 +1,5 @@
+import logging
+
+# The readers log every detection step through the 'src' logger hierarchy, which is silent unless the
+# application configures logging, IE logging.basicConfig(level=logging.DEBUG) to see every step.
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -1,17 +1,23 @@
+import logging
 import os
 import cv2
-import copy
 import urllib
 import tesserocr
 from urllib import request
-import numpy as np
-from pathlib import Path
 from typing import List, Tuple
 
-from src.utils.utils import getImageSize
-from src.utils.matching_point import findBestMatchingPoints, findTemplateMatchingPoints
+from src.utils.templates import getTemplate
+from src.utils.annotations import Annotations
+from src.utils.image_source import isInMemoryImage, readImageSource, decodeImage
+from src.utils.rectangle_locator import RectangleLocator
+from src.utils.scale_estimator import estimateScale
+from src.utils.tesseract_pool import getTesseractPool
+from src.utils.instrumentation import timeStage
+from src.utils.matching_point import findBestMatchingPoints, findTemplateMatchingPoints, findTemplateMatchingPointsInRegion
 from src.gameboard_reader.image_reader import getBirdName, getMasterBirdDict
 
+logger = logging.getLogger(__name__)
+
 
 class BoardView:
     def __init__(self):
@@ -30,7 +36,10 @@ class BoardView:
         self.ratio = None
         self.original_ratio = None
 
-        self.first_pass = True
+        # The resizing scales to try if the air icon can't be found at the full scale, IE a zoomed in image.
+        self.board_scales = (1.0, 0.95)
+        self.air_icon_threshold = 0.70
+        self.scale_air_points_dict = None
 
         self.all_birds = []
 
@@ -47,37 +56,41 @@ class BoardView:
         self.img_bgr = None
         self.img_hsv = None
         self.img_mask = None
-        self.img_display = None
+        self.rectangle_locator = None
+        self.img_boardview_bgr = None
+        self.img_boardview_gray = None
+
+        # The rectangles around what was found on the resized board, drawn only when it's displayed.
+        self.annotations = Annotations()
 
+    @timeStage
     def readImage(self, filename):
-        # Read the image from a filename whether it's a saved file locally or a URL image
+        # Read the image from a filename whether it's a saved file locally or a URL image,
+        # or from an image that is already in memory (IE attachment bytes, a file object or an array).
 
-        if os.path.exists(filename):
+        if isInMemoryImage(filename):
+            self.img_bgr = readImageSource(filename)
+
+        elif os.path.exists(filename):
             # Read the local image file
-            self.img_bgr = cv2.imread(filename)
+            self.img_bgr = cv2.imread(os.fspath(filename))
 
         else:
             # Otherwise try reading the image's url path if it can be read
             try:
                 req = urllib.request.Request(filename, data=None, headers={'User-Agent': 'Mozilla/5.0'})
                 with urllib.request.urlopen(req, timeout=5) as response:
-                    # Read the response and convert the data to a numpy array used by opencv
-                    arr = np.asarray(bytearray(response.read()), dtype=np.uint8)
-                    img = cv2.imdecode(arr, cv2.IMREAD_UNCHANGED)
-
-                    # Some (likely mobile?) Discord upload images are higher definition, have more bits per pixel,
-                    # or have another (alpha?) channel which need to be converted to the standard format here.
-                    if np.max(img) > 255:
-                        print('Converting a 16+ bit image to 8 bits')
-                        img = (img / 256).astype('uint8')
-
-                    # Store the image data
-                    self.img_bgr = img
+                    # Decode the response's bytes directly into an image used by opencv
+                    self.img_bgr = decodeImage(response.read())
 
             except Exception as e:
-                print(e)
+                logger.warning('urllib Exception: %s', e)
                 return False
 
+        if self.img_bgr is None:
+            logger.warning('The image could not be read')
+            return False
+
         # Convert potential 4 BGRA channel images down to the 'standard' 3 BGR channels
         self.img_bgr = cv2.cvtColor(self.img_bgr, cv2.COLOR_BGRA2BGR)
 
@@ -85,13 +98,17 @@ class BoardView:
         # stand out making it easier to recognize the scoreboard rectangle.
         self.img_hsv = cv2.cvtColor(self.img_bgr, cv2.COLOR_BGR2HSV)
         self.img_mask = cv2.inRange(self.img_hsv, (0, 80, 25), (12, 170, 255))
+
+        # The row and column white pixel counts of the mask are computed once for finding the board rectangle.
+        self.rectangle_locator = RectangleLocator(self.img_mask)
         return True
 
+    @timeStage
     def findBoardRectangle(self):
         # Scans a black and white masked image of the board for white
         # pixel rows and columns that signify the placement of the board.
         img_w, img_h = self.img_mask.shape[::-1]
-        print('Shape', img_w, img_h)
+        logger.debug('Shape %s %s', img_w, img_h)
 
         # Create the required number of white or '1' valued pixels which
         # signifies the start of a white backed rectangle (the board).
@@ -103,55 +120,35 @@ class BoardView:
         req_pixels_w = int(threshold_percent_w * img_w)
         req_pixels_h = int(threshold_percent_h * img_h)
 
-        print('ROWS limit', req_pixels_w)
-        min_y = None
-        max_y = None
-        for i, row in enumerate(self.img_mask):
-            # If the uploaded image's ratio is above 2.3 - that means it was heavily cropped,
-            # and we don't want to essentially chop off the top 45 scoreboard pixels.
-            # if self.original_ratio > 2.3:
-            if np.count_nonzero(row) > req_pixels_w:
-                # The very first y meeting the criteria is the min/top most y,
-                # and the last y meeting the criteria is the max/bottom most y.
-                if not min_y:
-                    # Because the top 30 rows are ignored, apply a small upward
-                    # buffer in case of heavily zoomed in screenshots.
-                    min_y = i
-                else:
-                    max_y = i
-        print('Y coords', min_y, max_y)
-
-        print('COLS limit', req_pixels_h)
-        min_x = None
-        max_x = None
-        for i, col in enumerate(self.img_mask.T):
-            # One weird image situation was 141 where a white bar is on the left during a
-            # snip which should only be a one off but its possible the situation could occur again.
-            # On rare occasions (image 163) someone won't crop an image correctly
-            # and there will be a white bar at the right as well.
-            if np.count_nonzero(col) > req_pixels_h:# and i > 20 and i < img_w - 20:
-                # The very first x meeting the criteria is the min/left most x,
-                # and the last x meeting the criteria is the max/right most x.
-                if not min_x:
-                    min_x = i
-                else:
-                    max_x = i
-        print('X coords', min_x, max_x)
+        # The very first row/column meeting the criteria is the min/top/left most value,
+        # and the last row/column meeting the criteria is the max/bottom/right most value.
+        logger.debug('ROWS limit %s', req_pixels_w)
+        min_y, max_y = self.rectangle_locator.findRowEdges(req_pixels_w)
+        logger.debug('Y coords %s %s', min_y, max_y)
+
+        # One weird image situation was 141 where a white bar is on the left during a
+        # snip which should only be a one off but its possible the situation could occur again.
+        # On rare occasions (image 163) someone won't crop an image correctly
+        # and there will be a white bar at the right as well.
+        logger.debug('COLS limit %s', req_pixels_h)
+        min_x, max_x = self.rectangle_locator.findColumnEdges(req_pixels_h)
+        logger.debug('X coords %s %s', min_x, max_x)
 
         if None in [min_x, min_y, max_x, max_y]:
-            print('Could not find a board rectangle')
+            logger.debug('Could not find a board rectangle')
             return False
 
         self.board_x = x = min_x
         self.board_y = y = min_y
         self.board_w = w = max_x - min_x
         self.board_h = h = max_y - min_y
-        print(x, y, w, h)
+        logger.debug('Board X, Y, W, H: %s %s %s %s', x, y, w, h)
 
         # Crop the image to only include the scoreboard's bounding box
         self.img_boardview_bgr = self.img_bgr[y:y + h, x:x + w]
         return True
 
+    @timeStage
     def resizeBoard(self):
         # Resize the scoreboard so that the scale of all matching templates is
         # more consistent across inconsistently sized images.
@@ -160,46 +157,60 @@ class BoardView:
 
         # Create a ratio to scale all scoreboards to a better template matching size.
         self.ratio = self.board_w / self.board_h
-        print('Ratio: ', self.ratio)
+        logger.debug('Ratio: %s', self.ratio)
         scale_percent = self.base_w / self.board_w
         new_height = int(self.board_h * scale_percent)
 
-        if self.first_pass:
-            width = self.base_w
-        else:
-            # If it's a second pass, try scaling the image down some since the image was likely zoomed in.
-            print('Scaling image down since its a second pass')
-            width = int(self.base_w * 0.95)
-            new_height = int(new_height * 0.95)
-
-        print('New w/h:', width, new_height)
+        # Try the full scale first. If the air icon can't be found there, the image was likely zoomed in,
+        # so the smaller scales are tried in the same pass and the scale that finds the air icon is used.
+        sizes = [(scale, (int(self.base_w * scale), int(new_height * scale))) for scale in self.board_scales]
+        candidate = estimateScale(self.img_boardview_bgr, sizes, getTemplate('gameboard/board_air.png'),
+                                  self.air_icon_threshold)
+        width, new_height = sizes[self.board_scales.index(candidate.scale)][1]
+        logger.debug('New w/h: %s %s Scale: %s', width, new_height, candidate.scale)
 
         # Resize all images to work with the template images.
-        self.img_boardview_bgr = cv2.resize(self.img_boardview_bgr, (width, new_height))
-
-        # Create a copy of the board image used for placing rectangles on for display and debugging.
-        self.img_display = copy.deepcopy(self.img_boardview_bgr)
-
+        self.img_boardview_bgr = candidate.image_bgr
+
+        # Keep the grayscale view and the air icon matches that were found while estimating the scale.
+        self.img_boardview_gray = candidate.image_gray
+        self.scale_air_points_dict = candidate.matching_points_dict
+
+    def getAnnotatedBoard(self):
+        # Get a copy of the resized board with the rectangles around what was found drawn on it,
+        # or of the whole image if the board was never found.
+        if self.img_boardview_bgr is None:
+            return self.img_bgr.copy()
+        return self.annotations.render(self.img_boardview_bgr)
+
+    def getBoardGray(self):
+        # Get the grayscale view of the resized board used for template matching and OCR.
+        # It is converted once and shared by every template instead of converting it for each match.
+        if self.img_boardview_gray is None:
+            self.img_boardview_gray = cv2.cvtColor(self.img_boardview_bgr, cv2.COLOR_BGR2GRAY)
+        return self.img_boardview_gray
+
+    @timeStage
     def findBoardAirIcon(self):
         # Find the played bird 'air' icon on the game board.
         # This icon will point to the board's forest birds location and using the air icon
         # location then the forest, grassland, and wetland bird names can be extrapolated.
 
-        print('\nFinding board air icon')
-        reader_dir = os.path.dirname(os.path.abspath(__file__))
-        src_dir = os.path.dirname(reader_dir)
-        scorebird_dir = os.path.dirname(src_dir)
-        template = Path(os.path.join(scorebird_dir, 'templates/gameboard/board_air.png'))
-
-        w, h = getImageSize(template)
+        logger.debug('Finding board air icon')
+        template = getTemplate('gameboard/board_air.png')
+        w, h = template.w, template.h
         self.air_icon_w = w
         self.air_icon_h = h
 
         # Use a lower threshold because sometimes action cube pips or white selection borders
         # make their way into some screenshots in the forest region which can add extra pixels.
-        threshold = 0.70
+        threshold = self.air_icon_threshold
 
-        matching_points_dict = findTemplateMatchingPoints(self.img_boardview_bgr, template, threshold)
+        # The air icon was already matched at this scale while estimating the scale of the board.
+        # Otherwise, the air icon is in the top left of the board, so search there first.
+        matching_points_dict = self.scale_air_points_dict
+        if matching_points_dict is None:
+            matching_points_dict = findTemplateMatchingPointsInRegion(self.getBoardGray(), template, threshold)
 
         # At least one location matched the board air icon template
         if matching_points_dict:
@@ -207,34 +218,26 @@ class BoardView:
             self.air_icon_point = findBestMatchingPoints(matching_points_dict)[0]
             point = self.air_icon_point
             value = matching_points_dict[point].value
-            print('Air Icon Point:', point, 'Value:', value)
+            logger.debug('Air Icon Point: %s Value: %s', point, value)
 
             # Draw a rectangle around the matched region.
             color = (180, 70, 150)  # Purple
-            cv2.rectangle(self.img_boardview_bgr, point, (point[0] + w, point[1] + h), color, thickness=2)
+            self.annotations.addRectangle(point, (point[0] + w, point[1] + h), color)
             return True
         else:
-            print('ERROR - Board air icon not detected')
+            logger.debug('ERROR - Board air icon not detected')
             # TODO Handle zero template detections
 
-            # If the board air icon cannot be found, this means the image is invalid or there is
-            # extra cropping that prevents resizing the image properly, so scale down and try again.
-            if self.first_pass:
-                print('----------------Board air icon not detected, performing second pass')
-                self.first_pass = False
-                self.resizeBoard()
-                if self.findBoardAirIcon():
-                    return True
-                else:
-                    return False
-            else:
-                return False
+            # The air icon wasn't found at any of the board scales, so the image is likely invalid.
+            return False
 
+    @timeStage
     def findAllBirds(self):
         # Find all birds in their respective habitats within the game board image.
 
-        # This call makes a SIGNIFICANT improvement instead of having to initialize tesseract for every single image.
-        with tesserocr.PyTessBaseAPI() as api:
+        # Checking out an already initialized tesseract API makes a SIGNIFICANT improvement
+        # instead of having to initialize tesseract for every single image.
+        with getTesseractPool().checkout() as api:
             self.forest_birds = self.findHabitatBirds('Forest', api)
             self.all_birds.append(self.forest_birds)
 
@@ -265,13 +268,13 @@ class BoardView:
     def findHabitatBirds(self, habitat, api: tesserocr.PyTessBaseAPI):
         # Find the birds within a habitat.
 
-        print('\nFinding birds in', habitat)
+        logger.debug('Finding birds in %s', habitat)
         name_height_buffer = 50  # The height of a bird name
         habitat_distance = 205  # The approx distance between the forest, grasslands, and wetlands habitats
         wiggle_buffer = 10  # A buffer for how much some boards have varying habitat placement
         trim_row_right = self.air_icon_w + 30  # How much to remove from the right side of the board which is empty space
 
-        img_h, img_w, _ = self.img_boardview_bgr.shape
+        img_h, img_w = self.getBoardGray().shape
 
         w = img_w - trim_row_right
         h = name_height_buffer + 2 * wiggle_buffer  # Add back the wiggle_buffer that is for the bottom_y
@@ -296,8 +299,8 @@ class BoardView:
         self.habitat_offset_y = row_y1
 
         # Draw a rectangle around the created habitat region
-        cv2.rectangle(self.img_display, (row_x1, row_y1), (row_x2, row_y2), color, thickness=2)
-        row_image = self.img_boardview_bgr[row_y1: row_y1 + h, row_x1: row_x1 + w]
+        self.annotations.addRectangle((row_x1, row_y1), (row_x2, row_y2), color)
+        row_image = self.getBoardGray()[row_y1: row_y1 + h, row_x1: row_x1 + w]
 
         bird_list = self.findPlacedBirds(row_image, api)
         return bird_list
@@ -305,14 +308,11 @@ class BoardView:
     def findPlacedBirds(self, row_img, api: tesserocr.PyTessBaseAPI):
         # Find the placed birds within a habitat
 
-        reader_dir = os.path.dirname(os.path.abspath(__file__))
-        src_dir = os.path.dirname(reader_dir)
-        scorebird_dir = os.path.dirname(src_dir)
-        template_top_left = Path(os.path.join(scorebird_dir, 'templates/gameboard/bird_top_left.png'))
-        template_top_right = Path(os.path.join(scorebird_dir, 'templates/gameboard/bird_top_right.png'))
+        template_top_left = getTemplate('gameboard/bird_top_left.png')
+        template_top_right = getTemplate('gameboard/bird_top_right.png')
 
-        w, h = getImageSize(template_top_left)
-        w2, h2 = getImageSize(template_top_right)
+        w, h = template_top_left.w, template_top_left.h
+        w2, h2 = template_top_right.w, template_top_right.h
 
         self.card_top_left_w = w
         self.card_top_left_h = h
@@ -337,7 +337,7 @@ class BoardView:
             best_placed_bird_points_right = sorted(best_placed_bird_points_right, key=lambda pt: pt[0])
 
             if len(best_placed_bird_points_left) != len(best_placed_bird_points_right):
-                print('ERROR - Did not detect an equal number of bird markers')
+                logger.debug('ERROR - Did not detect an equal number of bird markers')
 
             # For each detected corner point, create a region containing only a bird name.
             for i, point_left in enumerate(best_placed_bird_points_left):
@@ -348,18 +348,19 @@ class BoardView:
                 # Subtract a small buffer to remove the alternating white/background on the far right of the template
                 width = point_right[0] - point_left[0] - 5
 
-                print('Point:', point_left, 'Value:', left_value, 'to Point', point_right, 'Value:', right_value, 'Width:', width)
+                logger.debug('Point: %s Value: %s to Point %s Value: %s Width: %s',
+                             point_left, left_value, point_right, right_value, width)
 
                 # For display purposes, place all rectangles on the display image with appropriate offsets
                 x1 = self.habitat_offset_x + point_left[0]
                 y1 = self.habitat_offset_y + point_left[1]
                 color1 = (0, 255, 0)  # Green
-                cv2.rectangle(self.img_display, (x1, y1), (x1 + w, y1 + h), color1, thickness=2)
+                self.annotations.addRectangle((x1, y1), (x1 + w, y1 + h), color1)
 
                 x2 = self.habitat_offset_x + point_right[0]
                 y2 = self.habitat_offset_y + point_right[1]
                 color2 = (255, 255, 0)  # Cyan
-                cv2.rectangle(self.img_display, (x2, y2), (x2 + w2, y2 + h2), color2, thickness=2)
+                self.annotations.addRectangle((x2, y2), (x2 + w2, y2 + h2), color2)
 
                 # Find the bird name in the habitat row image using a point and width
                 bird_name = self.findBirdName(row_img, point_left, width, api)
@@ -388,7 +389,7 @@ class BoardView:
         y1 = self.habitat_offset_y + point[1] + height_buffer
 
         color = (0, 0, 0)  # Black
-        cv2.rectangle(self.img_display, (x1, y1), (x1 + name_width, y1 + name_height), color, thickness=2)
+        self.annotations.addRectangle((x1, y1), (x1 + name_width, y1 + name_height), color)
 
         # Get the bird name from OCR in a heavily cropped image
         bird_name = getBirdName(row_img, x, y, name_width, name_height, api, showImage=False)
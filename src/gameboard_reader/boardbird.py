@@ -1,19 +1,49 @@
+import logging
 import re
 import os
 import cv2
 import time
+import asyncio
+import functools
 
 from src.utils.utils import timestamp, Mode
+from src.utils.instrumentation import collectTimings
+from src.utils.image_source import describeImageSource, isInMemoryImage
+from src.utils.image_download import downloadImageSource
 from src.gameboard_reader.board_view import BoardView
 
+logger = logging.getLogger(__name__)
 
-def boardbird(filename, mode=Mode.NO_DISPLAY):
+
+def boardbird(filename, mode=Mode.NO_DISPLAY, timings=False):
+    # Read the birds of a game board screenshot. The time spent in each stage is sent to the metrics sink
+    # (see configureMetricsSink) and, if timings is True, also added to a results dictionary as its 'timings' section.
+    with collectTimings('boardbird') as stage_timings:
+        result = readGameboard(filename, mode)
+
+    if timings and isinstance(result, dict):
+        result['timings'] = stage_timings.toDict()
+    return result
+
+
+async def boardbird_async(filename, timings=False, executor=None):
+    # Read the birds of a game board screenshot without blocking the running event loop, see scorebird_async.
+    image = await downloadImageSource(filename)
+    if image is None:
+        return 'The path or url is incorrect or the image does not exist'
+
+    read = functools.partial(boardbird, image, mode=Mode.NO_DISPLAY, timings=timings)
+    return await asyncio.get_running_loop().run_in_executor(executor, read)
+
+
+def readGameboard(filename, mode):
     start = time.time()
-    print(filename)
-    print(timestamp(), 'Starting BoardBird')
+    logger.debug('%s', describeImageSource(filename))
+    logger.info('%s Starting BoardBird', timestamp())
     boardview = BoardView()
 
-    if mode == Mode.TESTING:
+    # In memory images have no filename to number the results with, so they're numbered like the bot's are.
+    if mode == Mode.TESTING and not isInMemoryImage(filename):
         file_num = re.findall(r'\d+', os.path.basename(filename))[0]
     else:
         file_num = timestamp()
@@ -27,68 +57,68 @@ def boardbird(filename, mode=Mode.NO_DISPLAY):
         if boardview.findBoardAirIcon():
 
             bird_results = boardview.findAllBirds()
-            print()
-            print(bird_results)
+            logger.debug('%s', bird_results)
 
             result_dict['FOREST'] = [bird for bird in boardview.forest_birds if bird]
             result_dict['GRASSLANDS'] = [bird for bird in boardview.grasslands_birds if bird]
             result_dict['WETLANDS'] = [bird for bird in boardview.wetlands_birds if bird]
-            print(result_dict)
+            logger.debug('%s', result_dict)
 
             end = time.time()
-            print('\nTotal time:', end - start, 's')
+            logger.info('Total time: %s s', end - start)
 
 
         # TODO Update testing usage
         if mode == Mode.TESTING and boardview.gameboard_finished:
-            print('TESTING success')
+            logger.info('TESTING success')
             board_csv = []
 
             habitat_csv = str(file_num) + ',Forest,' + ','.join(bird for bird in boardview.forest_birds if bird)
-            print(habitat_csv)
+            logger.debug('%s', habitat_csv)
             board_csv.append(habitat_csv)
 
             habitat_csv = str(file_num) + ',Grasslands,' + ','.join(bird for bird in boardview.grasslands_birds if bird)
-            print(habitat_csv)
+            logger.debug('%s', habitat_csv)
             board_csv.append(habitat_csv)
 
             habitat_csv = str(file_num) + ',Wetlands,' + ','.join(bird for bird in boardview.wetlands_birds if bird)
-            print(habitat_csv)
+            logger.debug('%s', habitat_csv)
             board_csv.append(habitat_csv)
 
             return board_csv
         elif mode == Mode.TESTING and not boardview.gameboard_finished:
-            print('TESTING failure')
+            logger.info('TESTING failure')
             empty_csv = [str(file_num) + ',1,,,,,,,', str(file_num + ',2,,,,,,,')]
             return empty_csv
 
         elif mode == Mode.NO_DISPLAY and boardview.gameboard_finished:
-            print('NO_DISPLAY success')
+            logger.info('NO_DISPLAY success')
             return result_dict
 
         elif mode == Mode.NO_DISPLAY and not boardview.gameboard_finished:
-            print('NO_DISPLAY failure')
+            logger.info('NO_DISPLAY failure')
             return 'Did not find a valid scoreboard'
 
         elif mode == Mode.DISPLAY and boardview.gameboard_finished:
-            print('DISPLAY success')
-            cv2.imshow('img_display', boardview.img_display)
+            logger.info('DISPLAY success')
+            cv2.imshow('img_display', boardview.getAnnotatedBoard())
             cv2.waitKey()
             return result_dict
 
         elif mode == Mode.DISPLAY and not boardview.gameboard_finished:
-            print('DISPLAY failure')
-            cv2.imshow('img_display', boardview.img_display)
+            logger.info('DISPLAY failure')
+            cv2.imshow('img_display', boardview.getAnnotatedBoard())
             cv2.waitKey()
             return result_dict
 
     else:
-        print('The path or url is incorrect or the image does not exist')
+        logger.info('The path or url is incorrect or the image does not exist')
         return 'The path or url is incorrect or the image does not exist'
 
 
 if __name__ == '__main__':
-    # Example
+    # Example, showing every detection step
+    logging.basicConfig(level=logging.DEBUG, format='%(message)s')
     submissions_dir = 'C:\\submissions\\'
     filename = submissions_dir + '12.png'
 
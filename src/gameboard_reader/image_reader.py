@@ -1,18 +1,21 @@
+import logging
 import os
 import cv2
 import json
-import difflib
 import tesserocr
 from PIL import Image
 from pathlib import Path
 
+from src.utils.name_index import NameIndex
+
+logger = logging.getLogger(__name__)
+
 
 def getBirdName(image, x, y, w, h, api: tesserocr.PyTessBaseAPI, showImage=False):
     # Read the bird name within a zoomed in region of the image using OCR.
 
-    # Convert the image and crop it to the name's region.
-    image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    image_thresh = cv2.threshold(image_gray, 200, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    # Threshold the already grayscale image and crop it to the name's region.
+    image_thresh = cv2.threshold(image, 200, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
     name_image = image_thresh[y: y + h, x: x + w]
     pil_image = Image.fromarray(name_image)
 
@@ -34,33 +37,20 @@ def getBirdName(image, x, y, w, h, api: tesserocr.PyTessBaseAPI, showImage=False
 def checkBirdName(bird_name):
     # Spell checks the bird name detected through OCR against the list of all possible bird names
     # and returns the corrected bird name if detection errors occurred with OCR.
-    max_val = 0
-    best_bird = None
-    bird_name_clean = bird_name.strip().upper()
 
     # Use a letter sequence matcher to get a ratio for how far off each
     # letter is in the OCR detected words compared to all possible bird names.
     # This is useful for OCR names like WOOO DUCK where a few characters might be off.
-    for testing_bird in getBirdNameList():
-        ratio = difflib.SequenceMatcher(None, bird_name_clean, testing_bird).ratio()
-
-        # If there is a perfect match, then there is no need to try every other possible bird name.
-        if ratio == 1.0:
-            max_val = ratio
-            best_bird = testing_bird
-            break
-        elif ratio > max_val:
-            max_val = ratio
-            best_bird = testing_bird
-
-    print('\tCorrected', repr(bird_name), 'into', best_bird, round(max_val, 4))
+    best_bird, max_val = getBirdNameIndex().findBestMatch(bird_name)
+
+    logger.debug('\tCorrected %r into %s %.4f', bird_name, best_bird, max_val)
     return best_bird
 
 
 def readMasterBirdDict():
     # Read the master bird dictionary and create an easier to parse
     # dictionary and list based on the bird names.
-    print('--- Reading the master bird JSON file ---')
+    logger.debug('--- Reading the master bird JSON file ---')
 
     reader_dir = os.path.dirname(os.path.abspath(__file__))
     json_file = Path(os.path.join(reader_dir, 'master.json'))
@@ -76,6 +66,10 @@ def readMasterBirdDict():
         bird_list.append(bird_name)
         bird_list_normal.append(bird_data['Common name'])
 
+    # Index the bird names once for spell checking OCR bird names.
+    global bird_name_index
+    bird_name_index = NameIndex(bird_list)
+
 
 def getMasterBirdDict():
     return bird_dict
@@ -88,7 +82,12 @@ def getBirdNameListNormal():
     return bird_list_normal
 
 
+def getBirdNameIndex():
+    return bird_name_index
+
+
 bird_list = []
 bird_list_normal = []
 bird_dict = {}
+bird_name_index = None
 readMasterBirdDict()
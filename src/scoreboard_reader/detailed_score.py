@@ -1,10 +1,9 @@
-import os
+import logging
 import copy
-from pathlib import Path
 
-from src.scoreboard_reader.digit import Digit
-from src.utils.matching_point import findBestMatchingPoints, findTemplateMatchingPoints
-from src.utils.utils import getImageSize
+from src.scoreboard_reader.digit_recognizer import DigitRecognizer
+
+logger = logging.getLogger(__name__)
 
 
 class DetailedScore:
@@ -13,61 +12,18 @@ class DetailedScore:
         self.player_name = str(player_id + 1)
         self.score_x = x  # The coordinates are the DetailedScore's position in the scoreboard image
         self.score_y = y
-        self.image_bgr = image
+        self.image_gray = image  # A grayscale view into the scoreboard image
         self.scores = None
         self.best_digit_points = {}
-        self.matching_points_dict = {}
 
     def decipherDetailedScore(self):
         # Use template matching to find the individual digits in the detailed scores
 
-        print('\nPlayer', self.player_name, 'detailed score deciphering...')
-
-        reader_dir = os.path.dirname(os.path.abspath(__file__))
-        src_dir = os.path.dirname(reader_dir)
-        scorebird_dir = os.path.dirname(src_dir)
-        directory = Path(os.path.join(scorebird_dir, 'templates/scoreboard/digits/detailed_score'))
-
-        all_matching_points_dict = {}
-
-        # Find all digits in the image using every digit template image
-        for filename in sorted(os.listdir(directory)):
-            digit = filename[:-4]
-            template = os.path.join(directory, filename)
-            w, h = getImageSize(template)
-
-            # Use a lower threshold to try and let in some partially covered detailed digits,
-            # but not low enough to add too many random digits or detected 'border 1s'.
-            threshold = 0.72
-
-            matching_points_dict = findTemplateMatchingPoints(self.image_bgr, template, threshold)
-
-            # At least one location matched the digit template
-            if matching_points_dict:
-                #print('\tDigit:', digit)
-
-                all_matching_points_dict.update(matching_points_dict)
+        logger.debug('Player %s detailed score deciphering...', self.player_name)
 
-                # Get the highest matching value digit points
-                best_digit_points = findBestMatchingPoints(matching_points_dict)
-
-                # Create the Digit
-                for point in best_digit_points:
-                    value = matching_points_dict[point].value
-                    #print('\t\tPoint:', point, 'Value:', value)
-
-                    # If multiple digits are detected at the same point, remove the worse digit.
-                    if point in self.best_digit_points:
-                        existing_value = self.best_digit_points[point].value
-
-                        # If the existing digit has a higher matching value than the new digit
-                        # at the same point, don't replace the digit.
-                        if value < existing_value:
-                            break
-
-                    self.best_digit_points[point] = Digit(digit, point[0], point[1], w, h, value)
-
-        self.matching_points_dict = all_matching_points_dict
+        # Find all digits in the image in a single pass over every digit template.
+        # If multiple digits are detected at the same point, only the better matching digit is kept.
+        self.best_digit_points = detailed_score_recognizer.findDigits(self.image_gray)
 
         # After finding the best digits, group them together depending on how close they are.
         self.groupDigitsTogether()
@@ -75,7 +31,7 @@ class DetailedScore:
     def groupDigitsTogether(self):
         # Individual digits needs to be grouped with their neighbors to form numbers if applicable.
 
-        print('\tGrouping digits together...')
+        logger.debug('\tGrouping digits together...')
 
         # Sort the x value keys so that the digits are in order of appearance left to right
         sorted_points = sorted(self.best_digit_points, key=lambda pt: pt[0])
@@ -139,40 +95,48 @@ class DetailedScore:
         worst_one_value = 1.0
         for point in self.best_digit_points:
             if int(self.best_digit_points[point].digit) == 1:
-                value = self.matching_points_dict[point].value
+                value = self.best_digit_points[point].value
                 if value < worst_one_value:
                     worst_one_value = value
                     worst_point = point
-        print('\t\tWorst 1 if it exists value:', worst_one_value)
+        logger.debug('\t\tWorst 1 if it exists value: %s', worst_one_value)
 
         # Remove the worst '1' if it made its way in unless all '1's matched well.
         # This threshold is between the cutoff for example incorrect and correct '1's.
         threshold = 0.80
         if '1' in all_digits and worst_one_value < threshold:
-            print('\t\tRemoving the worst 1')
+            logger.debug('\t\tRemoving the worst 1')
             for point in self.best_digit_points:
                 if int(self.best_digit_points[point].digit) == 1:
-                    value = self.matching_points_dict[point].value
+                    value = self.best_digit_points[point].value
                     if value < lowest_matching_value:
                         lowest_matching_value = value
                         worst_point = point
-            print('\t\tWorst digit', self.best_digit_points[worst_point].digit, 'at point:', worst_point, lowest_matching_value)
+            logger.debug('\t\tWorst digit %s at point: %s %s',
+                         self.best_digit_points[worst_point].digit, worst_point, lowest_matching_value)
             del self.best_digit_points[worst_point]
             return True
         else:
             # If we're forcing removing '1', don't remove the next worst digit
             if not force_one:
-                print('\t\tRemoving the worst digit')
+                logger.debug('\t\tRemoving the worst digit')
                 for point in self.best_digit_points:
-                    value = self.matching_points_dict[point].value
+                    value = self.best_digit_points[point].value
                     if value < lowest_matching_value:
                         lowest_matching_value = value
                         worst_point = point
 
-                print('\t\tWorst digit', self.best_digit_points[worst_point].digit, 'at point:', worst_point, lowest_matching_value)
+                logger.debug('\t\tWorst digit %s at point: %s %s',
+                             self.best_digit_points[worst_point].digit, worst_point, lowest_matching_value)
                 del self.best_digit_points[worst_point]
                 return True
 
             else:
-                print('\t\tNot removing the worst 1 because it doesnt meet the criteria')
+                logger.debug('\t\tNot removing the worst 1 because it doesnt meet the criteria')
                 return False
+
+
+# Use a lower threshold to try and let in some partially covered detailed digits,
+# but not low enough to add too many random digits or detected 'border 1s'.
+# The detailed scores are a single line of digits, so two digits can never be stacked on top of each other.
+detailed_score_recognizer = DigitRecognizer('detailed_score', threshold=0.72, min_horizontal_distance=2)
@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+from typing import Dict, Tuple
+
+from src.scoreboard_reader.digit import Digit
+from src.utils.templates import getDigitTemplates
+
+
+class DigitRecognizer:
+    def __init__(self, score_type, threshold, peak_distance=6, min_distance=6, min_horizontal_distance=0):
+        self.score_type = score_type  # The digit templates are only read the first time they are used
+        self.threshold = threshold
+
+        # A digit point must be the best matching point of any digit within the peak distance.
+        # Kept digit points must then be at least the min distance (and min horizontal distance) apart,
+        # otherwise only the better matching digit is kept.
+        self.peak_distance = peak_distance
+        self.min_distance = min_distance
+        self.min_horizontal_distance = min_horizontal_distance
+
+        size = 2 * peak_distance + 1
+        self.peak_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size))
+
+    def matchDigits(self, image_gray) -> np.ndarray:
+        # Match every digit template onto the image and stack the response maps into a single
+        # (digit, y, x) array. The digit templates are slightly different sizes, so any position a
+        # template cannot be placed at is filled with the lowest possible matching value.
+        templates = getDigitTemplates(self.score_type)
+        img_h, img_w = image_gray.shape
+        responses = np.full((len(templates), img_h, img_w), -1.0, dtype=np.float32)
+
+        for i, template in enumerate(templates):
+            if template.h > img_h or template.w > img_w:
+                continue
+            res = cv2.matchTemplate(image_gray, template.image, cv2.TM_CCOEFF_NORMED)
+            responses[i, :res.shape[0], :res.shape[1]] = res
+
+        return responses
+
+    def findDigits(self, image_gray) -> Dict[Tuple, Digit]:
+        # Find the digits in an image in a single pass over all digit templates.
+        # Returns a dictionary of the top left digit points to their Digit.
+        # An empty image (IE a score region cropped off the edge of the scoreboard) has no digits.
+        if image_gray.size == 0:
+            return {}
+        responses = self.matchDigits(image_gray)
+
+        # For every pixel keep only the value of the digit that matches best.
+        # If nothing matches above the threshold (or no template fits in the image), there are no peaks to find.
+        best_values = responses.max(axis=0)
+        if best_values.max() < self.threshold:
+            return {}
+
+        # Peaks are points above the threshold that are the maximum within the peak distance,
+        # which replaces clustering the matching points of every digit separately.
+        neighborhood_max = cv2.dilate(best_values, self.peak_kernel)
+        peak_mask = (best_values >= self.threshold) & (best_values >= neighborhood_max)
+        ys, xs = np.nonzero(peak_mask)
+        values = best_values[ys, xs]
+
+        # Non-maximum suppression: visit the peaks from the best match to the worst,
+        # and drop any peak too close to a better peak that has already been kept.
+        order = np.argsort(-values, kind='stable')
+        ys, xs, values = ys[order], xs[order], values[order]
+        dx = np.abs(xs[:, None] - xs[None, :])
+        dy = np.abs(ys[:, None] - ys[None, :])
+        conflicts = (dx * dx + dy * dy < self.min_distance ** 2) | (dx < self.min_horizontal_distance)
+
+        keep = np.ones(len(values), dtype=bool)
+        for i in range(len(values)):
+            if keep[i]:
+                keep[i + 1:] &= ~conflicts[i, i + 1:]
+
+        # Only the kept points need to know which digit matched best there.
+        xs, ys, values = xs[keep], ys[keep], values[keep]
+        best_digits = responses[:, ys, xs].argmax(axis=0)
+
+        templates = getDigitTemplates(self.score_type)
+        digits = {}
+        for x, y, value, best_digit in zip(xs, ys, values, best_digits):
+            template = templates[best_digit]
+            point = (int(x), int(y))
+            digits[point] = Digit(template.label, point[0], point[1], template.w, template.h, float(value))
+
+        return digits
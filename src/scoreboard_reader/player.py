@@ -1,10 +1,13 @@
+import logging
 from src.scoreboard_reader.final_score import FinalScore
 from src.scoreboard_reader.detailed_score import DetailedScore
 from src.utils.utils import Version
 
+logger = logging.getLogger(__name__)
+
 class Player:
     def __init__(self, player_id):
-        print('\tCreating player', player_id)
+        logger.debug('\tCreating player %s', player_id)
         self.name = str(player_id)
         self.player_name = None #'default_player' + str(player_id)
         self.feather_point = None
@@ -73,7 +76,7 @@ class Player:
         # in order to make sure the individual detailed scores are correct.
         # Any needed updates to correct digit template matching will be performed.
         # This also acts as a checksum between the two.
-        print('Player', self.name, 'comparing final and detailed scores...')
+        logger.debug('Player %s comparing final and detailed scores...', self.name)
 
         self.comparison_count += 1
 
@@ -82,7 +85,7 @@ class Player:
             # To prevent recursion issues where the final score is likely incorrect,
             # stop trying to fix details to add up to a bad final score.
             if self.comparison_count > 4:
-                print('\t---- Details appear to be broken ---- ')
+                logger.debug('\t---- Details appear to be broken ----')
                 self.detailed_score.scores = []
                 self.detailed_score.scores_str = []
                 return
@@ -90,17 +93,18 @@ class Player:
             detailed_scores_sum = sum(self.detailed_score.scores)
             diff = abs(detailed_scores_sum - self.final_score.score)
 
-            print('\tFinal detailed_scores:', self.detailed_score.scores, self.detailed_score.scores_str)
-            print('\tFinal game score vs detailed_scores sum:', self.final_score.score, detailed_scores_sum, 'Diff:', diff)
+            logger.debug('\tFinal detailed_scores: %s %s', self.detailed_score.scores, self.detailed_score.scores_str)
+            logger.debug('\tFinal game score vs detailed_scores sum: %s %s Diff: %s',
+                         self.final_score.score, detailed_scores_sum, diff)
 
             # Begin checking the detailed score sums against the final score.
             if self.final_score.score == detailed_scores_sum and len(self.detailed_score.scores) == self.num_details: #6: default
                 # Everything appears to be correct, no further correction is needed
-                print('\t----- HUZZAH!!! Player', self.name, 'final score is:', self.final_score.score)
+                logger.debug('\t----- HUZZAH!!! Player %s final score is: %s', self.name, self.final_score.score)
 
             elif not self.detailed_score.scores:
                 # If no detailed scores were found, then they likely weren't displayed
-                print('\t-----No details were displayed')
+                logger.debug('\t-----No details were displayed')
 
             elif self.final_score.score >= detailed_scores_sum and len(self.detailed_score.scores) != self.num_details: #6: default
                 # If the final score equals the sum of the detailed scores but there are
@@ -110,7 +114,7 @@ class Player:
                 # Scenario 2: The other case is there was a 0 that was not detected (most likely caches or tucks)
                 # because it was partially covered by another nearby point's digit.
 
-                print('\t----- Case 1 Fixing missing', diff, 'digit (likely caches or tucks)')
+                logger.debug('\t----- Case 1 Fixing missing %s digit (likely caches or tucks)', diff)
 
                 if not self.fixLeadingZeros():
                     # Use the two potential index lists for this scenario and
@@ -120,11 +124,11 @@ class Player:
                     potential_approx_indexes = self.getPotentialApproxIndexes()
 
                     potentially_correct_indexes = list(set(potential_small_score_indexes).intersection(potential_approx_indexes))
-                    print('\t\tPotentially correct indexes:', potentially_correct_indexes)
+                    logger.debug('\t\tPotentially correct indexes: %s', potentially_correct_indexes)
 
                     # Sometimes the wingspan details are broken and do not display all of them, so just ignore details
                     if not potentially_correct_indexes:
-                        print('\t---- Details appear to be broken ---- ')
+                        logger.debug('\t---- Details appear to be broken ----')
                         self.detailed_score.scores = []
                         self.detailed_score.scores_str = []
                         return
@@ -133,26 +137,26 @@ class Player:
 
                     if len(potentially_correct_indexes) == 0:
                         # In case this happens, use an index of the most likely incorrect digit.
-                        print('\t\tLength of potentially_correct_indexes is zero, panic adding index 4')
+                        logger.debug('\t\tLength of potentially_correct_indexes is zero, panic adding index 4')
                         potentially_correct_index = 4
 
                     if len(potentially_correct_indexes) >= 2:
                         # The two most common scenarios are 3,4 or 4,5 which means the second
                         # index is the issue because the first index covers the second digit.
                         if 3 in potentially_correct_indexes and 4 in potentially_correct_indexes:
-                            print('\t\tSince both neighboring indexes 3 and 4 are in the list, add digit at index 4')
+                            logger.debug('\t\tSince both neighboring indexes 3 and 4 are in the list, add digit at index 4')
                             potentially_correct_index = 4
                         if 4 in potentially_correct_indexes and 5 in potentially_correct_indexes:
-                            print('\t\tSince both neighboring indexes 4 and 5 are in the list, add digit at index 5')
+                            logger.debug('\t\tSince both neighboring indexes 4 and 5 are in the list, add digit at index 5')
                             potentially_correct_index = 5
 
                     # Insert the missing digit at the correct index
                     self.detailed_score.scores_str.insert(potentially_correct_index, str(diff))
 
                     if potentially_correct_index == 4:
-                        print('\t\tAdding', diff, 'missing caches')
+                        logger.debug('\t\tAdding %s missing caches', diff)
                     elif potentially_correct_index == 5:
-                        print('\t\tAdding', diff, 'missing tucks')
+                        logger.debug('\t\tAdding %s missing tucks', diff)
 
                 self.updateScores()
 
@@ -161,7 +165,7 @@ class Player:
 
             elif self.final_score.score < detailed_scores_sum and len(self.detailed_score.scores) >= self.num_details: #6: default
                 # This is a rare case where
-                print('\t----- Case 2 An extra digit (likely a 1) was added to the details list')
+                logger.debug('\t----- Case 2 An extra digit (likely a 1) was added to the details list')
                 digit_removed = self.removeWorstDigit()
 
             elif self.final_score.score < detailed_scores_sum and len(self.detailed_score.scores) < self.num_details: #6: default
@@ -170,7 +174,7 @@ class Player:
                 # In this case it's likely a '1' was falsely detected as a detail border between scores.
                 # IE '171' instead of '17' or '213' instead of 2,1,3
                 if diff >= 90:
-                    print('\t----- Case 3 An extra digit (likely a 1) was added BETWEEN two scores')
+                    logger.debug('\t----- Case 3 An extra digit (likely a 1) was added BETWEEN two scores')
 
                     # Ensure that the worst '1' is removed.
                     if not self.removeWorstDigit(force_one=True):
@@ -184,13 +188,13 @@ class Player:
 
                             # Split the three digit score into individual digits
                             score_to_split = self.detailed_score.scores_str[index]
-                            print('\t\tSplitting number', score_to_split, 'at index', index)
+                            logger.debug('\t\tSplitting number %s at index %s', score_to_split, index)
                             self.detailed_score.scores_str[index] = score_to_split[0]
                             self.detailed_score.scores_str.insert(index + 1, score_to_split[1:])
 
                             index += 1
                             score_to_split = self.detailed_score.scores_str[index]
-                            print('\t\tSplitting number', score_to_split, 'at index', index)
+                            logger.debug('\t\tSplitting number %s at index %s', score_to_split, index)
                             self.detailed_score.scores_str[index] = score_to_split[0]
                             self.detailed_score.scores_str.insert(index + 1, score_to_split[1:])
 
@@ -204,7 +208,7 @@ class Player:
                     # close together and got merged together IE '1' and '0' turned into '10'.
                     # These need to be split at the index using two difference methods to verify the incorrect score.
 
-                    print('\t----- Case 4 Two numbers were likely too close together and got merged so they need to be split up')
+                    logger.debug('\t----- Case 4 Two numbers were likely too close together and got merged so they need to be split up')
 
                     if not self.fixLeadingZeros():
                         # Use the two potential index lists for this scenario using various methods and
@@ -215,11 +219,11 @@ class Player:
                         potential_approx_indexes = self.getPotentialApproxIndexes()
 
                         potentially_correct_indexes = list(set(potential_diff_indexes).intersection(potential_approx_indexes))
-                        print('\t\tPotentially correct indexes:', potentially_correct_indexes)
+                        logger.debug('\t\tPotentially correct indexes: %s', potentially_correct_indexes)
 
                         # Sometimes the wingspan details are broken and do not display all of them, so just ignore details
                         if not potentially_correct_indexes:
-                            print('\t---- Details appear to be broken ---- ')
+                            logger.debug('\t---- Details appear to be broken ----')
                             self.detailed_score.scores = []
                             self.detailed_score.scores_str = []
                             return
@@ -229,7 +233,7 @@ class Player:
 
                         # If there are zero potentially correct indexes, panic add an index from one of the methods.
                         if len(potentially_correct_indexes) == 0:
-                            print('\t\tThere were 0 potentially correct indexes')
+                            logger.debug('\t\tThere were 0 potentially correct indexes')
 
                             # In case this happens, use an index from one of the methods above.
                             panic_index = None
@@ -238,7 +242,7 @@ class Player:
                             elif potential_approx_indexes:
                                 panic_index = potential_approx_indexes[0]
 
-                            print('\t\tPanic added index', panic_index)
+                            logger.debug('\t\tPanic added index %s', panic_index)
                             potentially_correct_indexes.append(panic_index)
 
                         # This doesn't seem to loop anymore, but just in case keep trying to narrow down the indexes.
@@ -247,22 +251,23 @@ class Player:
                             # so big_digits probably will not be next to each other in this situation.
                             big_digits = ['5', '6', '7', '8', '9']
 
-                            print('\t\tLooping to correct more than two potentially correct indexes ', potentially_correct_indexes)
+                            logger.debug('\t\tLooping to correct more than two potentially correct indexes %s',
+                                         potentially_correct_indexes)
                             for i in potentially_correct_indexes:
                                 score = self.detailed_score.scores_str[i]
                                 big_digit_exists = any(score_digit in big_digits for score_digit in score)
                                 if big_digit_exists:
-                                    print('\t\tRemoving potential index', i, 'of score', score,
-                                          'because it contains digits that should not be close together')
+                                    logger.debug('\t\tRemoving potential index %s of score %s because it contains '
+                                                 'digits that should not be close together', i, score)
                                     potentially_correct_indexes.remove(i)
 
                             # The two most common scenarios are 3,4 or 4,5 which means the first
                             # index is the issue which causes the second index to be wrong.
                             if 3 in potentially_correct_indexes and 4 in potentially_correct_indexes:
-                                print('\t\tSince both neighboring indexes 3 and 4 are in the list, use 3 as the origin to split')
+                                logger.debug('\t\tSince both neighboring indexes 3 and 4 are in the list, use 3 as the origin to split')
                                 potentially_correct_indexes = [3]
                             if 4 in potentially_correct_indexes and 5 in potentially_correct_indexes:
-                                print('\t\tSince both neighboring indexes 4 and 5 are in the list, use 4 as the origin to split')
+                                logger.debug('\t\tSince both neighboring indexes 4 and 5 are in the list, use 4 as the origin to split')
                                 potentially_correct_indexes = [4]
 
                             # If nothing is removed yet, that likely means there could have been two or more
@@ -273,7 +278,7 @@ class Player:
                                 for i in potentially_correct_indexes:
                                     score = self.detailed_score.scores_str[i]
                                     if score != '10':
-                                        print('\t\tFallback option removing index not containing number 10')
+                                        logger.debug('\t\tFallback option removing index not containing number 10')
                                         potentially_correct_indexes.remove(i)
                                         break
 
@@ -281,7 +286,7 @@ class Player:
                                         # This means that these two indexes were not 10 in the approx method
                                         # which means the digits are '1' and '0' which would make both
                                         # indexes be 'incorrect' so remove the last index in the list.
-                                        print('\t\tBoth numbers at potential indexes are 10, removing the last index')
+                                        logger.debug('\t\tBoth numbers at potential indexes are 10, removing the last index')
                                         potentially_correct_indexes = potentially_correct_indexes[:-1]
                                         break
 
@@ -290,7 +295,7 @@ class Player:
 
                         # Split up the number using the found index
                         score_to_split = self.detailed_score.scores_str[correct_index]
-                        print('\t\tSplitting number', score_to_split, 'at index', correct_index)
+                        logger.debug('\t\tSplitting number %s at index %s', score_to_split, correct_index)
                         self.detailed_score.scores_str[correct_index] = score_to_split[0]
                         self.detailed_score.scores_str.insert(correct_index + 1, score_to_split[1:])
 
@@ -302,7 +307,7 @@ class Player:
             else:
                 # This is a catch-all case where there are self.num_details values for the
                 # detailed score, but they do not add up to the final game score.
-                print('\t----- Case 5 An extra digit (likely a 1) was added TO a score (middle or after most likely)')
+                logger.debug('\t----- Case 5 An extra digit (likely a 1) was added TO a score (middle or after most likely)')
 
                 self.removeWorstDigit()
 
@@ -320,7 +325,7 @@ class Player:
                 # This means that the index of the digit is actually one to the right of any potential small score.
                 potential_small_score_indexes.append(i + 1)
 
-        print('\t\tPotential indexes using small scores:', potential_small_score_indexes)
+        logger.debug('\t\tPotential indexes using small scores: %s', potential_small_score_indexes)
         return potential_small_score_indexes
 
     def getPotentialApproxIndexes(self):
@@ -342,12 +347,12 @@ class Player:
                         potential_approx_indexes.append(i)
 
         potential_approx_indexes = sorted(potential_approx_indexes)
-        print('\t\tPotential indexes using approximate scores:', potential_approx_indexes)
+        logger.debug('\t\tPotential indexes using approximate scores: %s', potential_approx_indexes)
         return potential_approx_indexes
 
     def removeWorstDigit(self, force_one=False):
         # Remove the worst point in the detailed score and regroup the digits
-        print('\t\tRemoving worst point and regrouping digits...')
+        logger.debug('\t\tRemoving worst point and regrouping digits...')
         digit_removed = self.detailed_score.removeWorstPoint(force_one)
 
         if digit_removed:
@@ -371,7 +376,7 @@ class Player:
 
         if leading_zero_index:
             # Don't try to fix just a '0', only update incorrect scores like '01'.
-            print('\t\tFixing leading 0 in a number')
+            logger.debug('\t\tFixing leading 0 in a number')
             self.detailed_score.scores_str[leading_zero_index] = '0'
             self.detailed_score.scores_str.insert(leading_zero_index + 1, str(leading_zero_score[1:]))
             return True
@@ -404,5 +409,5 @@ class Player:
                 if int(score) - int(score[0]) - int(score[1]) - int(score[2]) - int(score[3]) == diff:
                     potential_diff_indexes.append(i)
 
-        print('\t\tPotential indexes using difference math:', potential_diff_indexes)
+        logger.debug('\t\tPotential indexes using difference math: %s', potential_diff_indexes)
         return potential_diff_indexes
@@ -1,27 +1,84 @@
+import logging
 import re
 import os
 import cv2
+import copy
 import time
-import tesserocr
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
 from src.utils.utils import timestamp, Mode, Version
+from src.utils.templates import loadAllTemplates, getTemplateVersion
+from src.utils.tesseract_pool import getTesseractPool
+from src.utils.result_cache import getResultCache, createCacheKey, hashImage
+from src.utils.near_duplicates import getNearDuplicateIndex, ImageFingerprint
+from src.utils.instrumentation import collectTimings, countEvent
+from src.utils.image_source import describeImageSource, isInMemoryImage
+from src.utils.image_download import downloadImageSource
 from src.scoreboard_reader.scoreboard import Scoreboard
-from src.tournaments import getDiscordUserFromWingspanName, getWingspanNameFromDiscordUser
+from src.tournaments import getDiscordUserFromWingspanName, getWingspanNameFromDiscordUser, getPlayerRoster
 
-def scorebird(filename, mentioned_players=None, get_details=True, mode=Mode.NO_DISPLAY):
+logger = logging.getLogger(__name__)
+
+def scorebird(filename, mentioned_players=None, get_details=True, mode=Mode.NO_DISPLAY, api=None, use_cache=True,
+              timings=False):
+    # Read a scoreboard screenshot. The time spent in each stage and the number of fallbacks and retries
+    # are sent to the metrics sink (see configureMetricsSink) and, if timings is True, also added to
+    # the results dictionary as its 'timings' section.
+    with collectTimings('scorebird') as stage_timings:
+        results_dict = readScoreboard(filename, mentioned_players, get_details, mode, api, use_cache)
+
+    if timings:
+        results_dict['timings'] = stage_timings.toDict()
+    return results_dict
+
+
+def readScoreboard(filename, mentioned_players, get_details, mode, api, use_cache):
     start = time.time()
-    print(filename)
-    print(timestamp(), 'Starting ScoreBird')
+    logger.debug('%s', describeImageSource(filename))
+    logger.info('%s Starting ScoreBird', timestamp())
     scoreboard = Scoreboard(mentioned_players)
 
     results_dict = {}
 
     if scoreboard.readImage(filename):
+        # If result caching is enabled, a screenshot that was already read returns its previous result
+        # without reading the scoreboard again. Displayed images are always read so they can be shown.
+        result_cache = getResultCache() if use_cache and mode != Mode.DISPLAY else None
+        cache_key = None
+        if result_cache is not None:
+            cache_key = getResultCacheKey(scoreboard, mentioned_players, get_details)
+            cached_results_dict = result_cache.get(cache_key)
+            if cached_results_dict is not None:
+                logger.debug('Using the cached result for this scoreboard')
+                countEvent('result_cache_hits')
+                if mode == Mode.TESTING and 'players' in cached_results_dict and not isInMemoryImage(filename):
+                    cached_results_dict['file_num'] = re.findall(r'\d+', os.path.basename(filename))[0]
+                return cached_results_dict
+
         if scoreboard.findScoreboardRectangle():
             scoreboard.resizeScoreboard()
 
             if scoreboard.findScoreboardFeathers():
 
+                # If near duplicate detection is enabled, a recompressed copy of a scoreboard that was already
+                # read returns the earlier result (flagged as a near duplicate) before any digits or names are read.
+                near_duplicate_index = getNearDuplicateIndex() if use_cache and mode != Mode.DISPLAY else None
+                fingerprint = None
+                if near_duplicate_index is not None:
+                    fingerprint = ImageFingerprint(scoreboard.getScoreboardGray())
+                    context = getResultContext(mentioned_players, get_details)
+                    earlier_results_dict, distance = near_duplicate_index.find(context, fingerprint)
+                    if earlier_results_dict is not None:
+                        logger.debug('Using the result of a near duplicate scoreboard, hash distance: %s', distance)
+                        countEvent('near_duplicate_hits')
+                        results_dict = copy.deepcopy(earlier_results_dict)
+                        results_dict['near_duplicate'] = True
+                        if mode == Mode.TESTING and not isInMemoryImage(filename):
+                            results_dict['file_num'] = re.findall(r'\d+', os.path.basename(filename))[0]
+                        return results_dict
+
                 scoreboard.findFinalScores()
 
                 if scoreboard.decipherFinalScores():
@@ -33,11 +90,16 @@ def scorebird(filename, mentioned_players=None, get_details=True, mode=Mode.NO_D
                         scoreboard.decipherDetailedScores()
                         scoreboard.drawDetailedScores()
                     else:
-                        print('\nDetails were skipped')
+                        logger.debug('Details were skipped')
 
-                    with tesserocr.PyTessBaseAPI() as api:
+                    # Use the given tesseract API, otherwise check out an already initialized one from the pool
+                    if api is not None:
                         scoreboard.findPlayerNames(api)
                         scoreboard.findMatchWinner(api)
+                    else:
+                        with getTesseractPool().checkout() as pool_api:
+                            scoreboard.findPlayerNames(pool_api)
+                            scoreboard.findMatchWinner(pool_api)
                     #else:
                     #    scoreboard.findMatchWinnerByScore()
                     #     # If a tournament isn't being used to get Wingspan player names,
@@ -54,11 +116,15 @@ def scorebird(filename, mentioned_players=None, get_details=True, mode=Mode.NO_D
                         scoreboard.drawDetailedScores(first_pass=False)  # Update colors for quick view of fixes made
 
                     end = time.time()
-                    print('Total time:', end - start, 's')
+                    logger.info('Total time: %s s', end - start)
 
                     results_dict = createResultsDict(scoreboard, get_details)
 
-                    if mode == Mode.TESTING:
+                    if fingerprint is not None:
+                        near_duplicate_index.add(context, fingerprint, copy.deepcopy(results_dict))
+
+                    # In memory images have no filename to number the result with.
+                    if mode == Mode.TESTING and not isInMemoryImage(filename):
                         results_dict['file_num'] = re.findall(r'\d+', os.path.basename(filename))[0]
 
                 else:
@@ -71,26 +137,107 @@ def scorebird(filename, mentioned_players=None, get_details=True, mode=Mode.NO_D
 
         correct_result = 'success' if scoreboard.scoreboard_correct else 'failure'
         overall_result = str(mode.name) + ' ' + correct_result
-        print(overall_result)
+        logger.info('%s', overall_result)
 
         if mode == Mode.NO_DISPLAY and not scoreboard.scoreboard_correct:
-            print('ScoreBird did not find a valid scoreboard')
+            logger.info('ScoreBird did not find a valid scoreboard')
             #results_dict['error'] = 'ScoreBird did not find a valid scoreboard'
 
         elif mode == Mode.DISPLAY and scoreboard.scoreboard_correct:
-            cv2.imshow('img_scoreboard_bgr', scoreboard.img_scoreboard_bgr)
+            cv2.imshow('img_scoreboard_bgr', scoreboard.getAnnotatedScoreboard())
             cv2.waitKey()
         elif mode == Mode.DISPLAY and not scoreboard.scoreboard_correct:
             cv2.imshow('img_bgr', scoreboard.img_bgr)
             cv2.waitKey()
 
+        # The testing file number depends on the filename and not the image, so it isn't cached.
+        if cache_key is not None:
+            result_cache.put(cache_key, {key: value for key, value in results_dict.items() if key != 'file_num'})
+
     else:
-        print('The path or url is incorrect')
+        logger.info('The path or url is incorrect')
         results_dict['error'] = 'Invalid scoreboard: The path or url is incorrect'
 
     return results_dict
 
 
+def getResultContext(mentioned_players, get_details):
+    # Other than its pixels, the result of a scoreboard depends on the reader options, the templates,
+    # and the signed up players (the order of the mentioned players can break name ties).
+    if mentioned_players:
+        mentioned_players = tuple(str(user_id) for user_id in mentioned_players)
+    return bool(get_details), getTemplateVersion(), getPlayerRoster().content_hash, mentioned_players
+
+
+def getResultCacheKey(scoreboard, mentioned_players, get_details):
+    return createCacheKey('scoreboard', hashImage(scoreboard.img_bgr), *getResultContext(mentioned_players, get_details))
+
+
+def scorebird_batch(filenames, mentioned_players=None, get_details=True, workers=None, mode=Mode.NO_DISPLAY, use_cache=True,
+                    timings=False):
+    # Score many screenshots across a pool of worker processes.
+    # Each item in filenames is either a filename/url or a (filename, mentioned_players) tuple
+    # for submissions that mention their own players, otherwise mentioned_players is used for every image.
+    # Yields (filename, results_dict) tuples as soon as each image finishes, not in submission order.
+    if mode == Mode.DISPLAY:
+        raise ValueError('Batch scoring cannot display images, use Mode.NO_DISPLAY or Mode.TESTING')
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initBatchWorker) as executor:
+        # Only keep a few images per worker in flight so a large backlog isn't all queued up front.
+        max_pending = 2 * (workers or os.cpu_count() or 1)
+        items = iter(filenames)
+        pending = {}
+
+        while True:
+            for item in items:
+                if isinstance(item, tuple):
+                    filename, players = item
+                else:
+                    filename, players = item, mentioned_players
+                future = executor.submit(scoreBatchImage, filename, players, get_details, mode, use_cache, timings)
+                pending[future] = filename
+                if len(pending) >= max_pending:
+                    break
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                filename = pending.pop(future)
+                try:
+                    results_dict = future.result()
+                except Exception as e:
+                    logger.warning('Batch scoring exception: %s %s', filename, e)
+                    results_dict = {'error': f'Invalid scoreboard: ScoreBird failed with {e!r}'}
+                yield filename, results_dict
+
+
+def initBatchWorker():
+    # Each batch worker process loads the templates and initializes its tesseract pool once for its whole life.
+    loadAllTemplates()
+    getTesseractPool().warmUp()
+
+
+def scoreBatchImage(filename, mentioned_players, get_details, mode, use_cache, timings):
+    return scorebird(filename, mentioned_players=mentioned_players, get_details=get_details, mode=mode,
+                     use_cache=use_cache, timings=timings)
+
+
+async def scorebird_async(filename, mentioned_players=None, get_details=True, use_cache=True, timings=False,
+                          executor=None):
+    # Read a scoreboard screenshot without blocking the running event loop, IE from a discord bot's command.
+    # A url is downloaded asynchronously (see ImageDownloader) and then the image is read in Mode.NO_DISPLAY
+    # in the executor, which is the event loop's default thread pool if it is None.
+    image = await downloadImageSource(filename)
+    if image is None:
+        return {'error': 'Invalid scoreboard: The path or url is incorrect'}
+
+    read = functools.partial(scorebird, image, mentioned_players=mentioned_players, get_details=get_details,
+                             mode=Mode.NO_DISPLAY, use_cache=use_cache, timings=timings)
+    return await asyncio.get_running_loop().run_in_executor(executor, read)
+
+
 def createResultsDict(scoreboard, get_details):
     # Create the result dictionary containing the winner, player scores, and details if applicable.
 
@@ -165,7 +312,7 @@ def createResultsDict(scoreboard, get_details):
 def fixMultipleWingspanNames(results_dict):
     # This consolidates any wingspan name mismatches for players that have multiple wingspan names.
     #  IE 'ronster77' may be detected for the name, but 'ronster' was detected for the badge winner
-    print('\nConsolidating any player name detection issues')
+    logger.debug('Consolidating any player name detection issues')
     for i, player in enumerate(results_dict['players']):
         player_key = 'player' + str(i+1)
         name = results_dict['players'][player_key]['name']
@@ -174,9 +321,9 @@ def fixMultipleWingspanNames(results_dict):
 
         if isinstance(wingspan_name, list):
             if len(wingspan_name) > 1:
-                print('\tPlayer has multiple Wingspan names:', wingspan_name)
+                logger.debug('\tPlayer has multiple Wingspan names: %s', wingspan_name)
             wingspan_name = wingspan_name[0]
-            print('\tGrabbing the first name out of the wingspan name list:', wingspan_name)
+            logger.debug('\tGrabbing the first name out of the wingspan name list: %s', wingspan_name)
 
         results_dict['players'][player_key]['name'] = wingspan_name
 
@@ -186,9 +333,9 @@ def fixMultipleWingspanNames(results_dict):
         wingspan_name = getWingspanNameFromDiscordUser(discord_user)
         if isinstance(wingspan_name, list):
             if len(wingspan_name) > 1:
-                print('\tWinner has multiple Wingspan names:', wingspan_name)
+                logger.debug('\tWinner has multiple Wingspan names: %s', wingspan_name)
             wingspan_name = wingspan_name[0]
-            print('\tGrabbing the first name out of the wingspan name list:', wingspan_name)
+            logger.debug('\tGrabbing the first name out of the wingspan name list: %s', wingspan_name)
 
         winner_list.append(wingspan_name)
 
@@ -198,7 +345,8 @@ def fixMultipleWingspanNames(results_dict):
 
 
 if __name__ == '__main__':
-    # Example
+    # Example, showing every detection step
+    logging.basicConfig(level=logging.DEBUG, format='%(message)s')
     submissions_dir = 'C:\\submissions\\'
     filename = submissions_dir + '12.png'
     mentioned_users = None
@@ -1,23 +1,33 @@
+import logging
 import cv2
 import os
 import re
-import copy
 import math
 import time
 import urllib
-import difflib
 import tesserocr
 import numpy as np
 from PIL import Image
-from pathlib import Path
 from urllib import request
 from typing import List, Tuple, Dict
 from http.client import IncompleteRead
 
-from src.tournaments import getWingspanPlayerList
+from src.tournaments import getWingspanPlayerList, getWingspanPlayerNameIndex
 from src.scoreboard_reader.player import Player
-from src.utils.utils import getImageSize, Version, timestamp
-from src.utils.matching_point import findBestMatchingPoints, findTemplateMatchingPoints
+from src.utils.utils import Version, timestamp
+from src.utils.templates import getTemplate
+from src.utils.annotations import Annotations
+from src.utils.image_source import isInMemoryImage, readImageSource, decodeImage
+from src.utils.name_index import NameIndex
+from src.utils.rectangle_locator import RectangleLocator
+from src.utils.scale_estimator import estimateScale, ScaleCandidate
+from src.utils.color_classifier import getDetailClassifier
+from src.utils.layout_cache import getLayoutCache, ScoreboardLayout
+from src.utils.instrumentation import timeStage, countEvent, countMaxEvent
+from src.utils.matching_point import findBestMatchingPoints, findTemplateMatchingPointsInRegion, \
+    findTemplateMatchingPointsPyramid
+
+logger = logging.getLogger(__name__)
 
 
 class Scoreboard:
@@ -25,6 +35,7 @@ class Scoreboard:
 
         self.mentioned_players = mentioned_players
         self.valid_players = getWingspanPlayerList(mentioned_players)
+        self.valid_player_index = NameIndex(self.valid_players)
         self.num_players = None
 
         self.version = Version.BASE_EE
@@ -57,11 +68,29 @@ class Scoreboard:
         self.img_gray = None
         self.img_mask = None
         self.img_hsv = None
+        self.rectangle_locator = None
         self.img_scoreboard_bgr = None
-        self.img_scoreboard_bgr_clean = None
+        self.img_scoreboard_gray = None
+        self.img_scoreboard_hsv = None
+        self.img_scoreboard_otsu = None
+        self.img_scoreboard_adaptive = None
+        self.name_thresholds_rectangles = 0
+
+        # The rectangles around what was found on the resized scoreboard, drawn only when it's displayed.
+        self.annotations = Annotations()
 
         self.likely_zoomed = False
 
+        # The resizing scales to try if the feathers can't be found at the scale expected from the scoreboard ratio.
+        self.scoreboard_scales = (1.0, 0.975, 0.95, 0.925, 0.90)
+        self.feather_threshold = 0.73
+        self.scale_feather_points_dict = None
+        self.scale = None
+
+        # The key and layout of this scoreboard in the layout cache, if layout caching is enabled.
+        self.layout_key = None
+        self.layout = None
+
         self.scoreboard_correct = False
         self.winning_player_by_badge = []
         self.winning_player_by_score = []
@@ -76,71 +105,76 @@ class Scoreboard:
             self.players_dict[player] = Player(player+1)
             self.players_dict[player].setVersion(version)
 
+    @timeStage
     def readImage(self, filename):
-        # Read the image from a filename whether it's a saved file locally or a URL image
+        # Read the image from a filename whether it's a saved file locally or a URL image,
+        # or from an image that is already in memory (IE attachment bytes, a file object or an array).
 
-        if os.path.exists(filename):
+        if isInMemoryImage(filename):
+            self.img_bgr = readImageSource(filename)
+            if self.img_bgr is None:
+                logger.warning('The in memory image could not be read')
+                return False
+
+        elif os.path.exists(filename):
             # Read the local image file
-            self.img_bgr = cv2.imread(filename)
+            self.img_bgr = cv2.imread(os.fspath(filename))
 
         else:
             # Otherwise try reading the image's url path if it can be read
             for i in range(3):
-                print('Opening URL attempt', i + 1)
+                logger.debug('Opening URL attempt %s', i + 1)
                 try:
                     req = urllib.request.Request(filename, data=None, headers={'User-Agent': 'Mozilla/5.0'})
                     with urllib.request.urlopen(req, timeout=10) as response:
-                        # Read the response and convert the data to a numpy array used by opencv
-                        arr = np.asarray(bytearray(response.read()), dtype=np.uint8)
-                        img = cv2.imdecode(arr, cv2.IMREAD_UNCHANGED)
-
-                        # Some (likely mobile?) Discord upload images are higher definition, have more bits per pixel,
-                        # or have another (alpha?) channel which need to be converted to the standard format here.
-                        if np.max(img) > 255:
-                            print('Converting a 16+ bit image to 8 bits')
-                            img = (img / 256).astype('uint8')
-
-                        # Store the image data
-                        self.img_bgr = img
+                        # Decode the response's bytes directly into an image used by opencv
+                        self.img_bgr = decodeImage(response.read())
                         break
 
                 except IncompleteRead as e:
-                    print('urllib Exception:', e)
+                    logger.warning('urllib Exception: %s', e)
                     time.sleep(5)
-                    print('Retrying...')
+                    logger.debug('Retrying...')
                     continue
 
                 except Exception as e:
-                    print('urllib Exception:', e)
+                    logger.warning('urllib Exception: %s', e)
                     return False
 
         try:
             # Convert potential 4 BGRA channel images down to the 'standard' 3 BGR channels
             self.img_bgr = cv2.cvtColor(self.img_bgr, cv2.COLOR_BGRA2BGR)
-
-            # This black and white mask should make the beige colored scoreboard
-            # stand out making it easier to recognize the scoreboard rectangle.
-            self.img_hsv = cv2.cvtColor(self.img_bgr, cv2.COLOR_BGR2HSV)
-            self.img_mask = cv2.inRange(self.img_hsv, (0, 0, 208), (53, 29, 254))  # Was 255 until white bars at edge of image caused problems
             return True
 
         except Exception as e:
-            print('Exception with cv2 conversions:', e)
+            logger.warning('Exception with cv2 conversions: %s', e)
             return False
 
+    def createScoreboardMask(self):
+        # This black and white mask should make the beige colored scoreboard
+        # stand out making it easier to recognize the scoreboard rectangle.
+        self.img_hsv = cv2.cvtColor(self.img_bgr, cv2.COLOR_BGR2HSV)
+        self.img_mask = cv2.inRange(self.img_hsv, (0, 0, 208), (53, 29, 254))  # Was 255 until white bars at edge of image caused problems
+
+        # The row and column white pixel counts of the mask are computed once and shared by every rectangle pass.
+        self.rectangle_locator = RectangleLocator(self.img_mask)
+
+    @timeStage
     def findScoreboardRectangle(self, remove_border=False):
         # Scans a black and white masked image of the scoreboard for white pixel rows
         # and columns that signify the placement and rectangular shape of the scoreboard.
-        print('\nFinding the scoreboard rectangle')
+        logger.debug('Finding the scoreboard rectangle')
+        if self.img_mask is None:
+            self.createScoreboardMask()
         buffer_vertical = 35  # Pixels
         buffer_horizontal = 45  # Pixels
 
         img_h, img_w, c = self.img_bgr.shape
         self.img_ratio = img_w/img_h
-        print('\tImage size W, H:', img_w, img_h)
-        print('\tImage ratio:', self.img_ratio)
+        logger.debug('\tImage size W, H: %s %s', img_w, img_h)
+        logger.debug('\tImage ratio: %s', self.img_ratio)
         if self.img_ratio > 2.4:
-            print('\t\tWider image than normal!')
+            logger.debug('\t\tWider image than normal!')
 
         # Create the required number of white or '1' valued pixels which
         # signify the start of a white backed rectangle (the scoreboard).
@@ -152,72 +186,32 @@ class Scoreboard:
         # The origin point (0,0) of a cv2 image is the top-left corner, hence the top of the image
         # has smaller x values than the bottom and the left-hand side has smaller y values than the right.
 
-        print('\tScoreboard rows limit:', required_pixels_w)
-        min_y = None
-        max_y = None
-        for i, row in enumerate(self.img_mask):
+        # The very first row/column meeting the criteria is the min/top/left most value,
+        # and the last row/column meeting the criteria is the max/bottom/right most value.
+        logger.debug('\tScoreboard rows limit: %s', required_pixels_w)
+        if not remove_border:
             # The first pass of rectangle detection should not remove the border from the image.
-            if not remove_border:
-                if np.count_nonzero(row) > required_pixels_w:
-                    # The very first y meeting the criteria is the min/top most y,
-                    # and the last y meeting the criteria is the max/bottom most y.
-                    if not min_y:
-                        min_y = i
-                    else:
-                        max_y = i
-            else:
-                # If the scoreboard feathers cannot be found, this means the image is invalid or there is extra
-                # white bordering (from a windows tab bar or MS paint) that prevents resizing the image properly.
-                # So a second pass must be performed which crops the edges a little to remove
-                # the white border which is detected in the scoreboard background mask.
-                if np.count_nonzero(row) > required_pixels_w and buffer_horizontal < i < (img_h - buffer_horizontal):
-                    # The very first y value meeting the criteria is the min/topmost y,
-                    # and the last y value meeting the criteria is the max/bottommost y.
-                    if not min_y:
-                        min_y = i
-                    else:
-                        max_y = i
-        print('\tRectangle edge Y values:', min_y, max_y)
-
-        print('\tScoreboard cols limit:', required_pixels_h)
-        min_x = None
-        max_x = None
-        last_white_x = 0
-        # Transpose the numpy array to get the columns
-        for i, col in enumerate(self.img_mask.T):
-            # The first pass of rectangle detection should not remove the border from the image.
-            #print(i, np.count_nonzero(col))
-            if not remove_border:
-                if np.count_nonzero(col) > required_pixels_h:
-                    # If the distance between the current x white column over the threshold
-                    # and the last white column is larger than the buffer, use the current
-                    # x value to move away from the leftmost white border or tab.
-                    if i - last_white_x > buffer_vertical and last_white_x < buffer_vertical:
-                        min_x = i
-                    last_white_x = i
-
-                    # The very first x value meeting the criteria is the min/leftmost x,
-                    # and the last x value meeting the criteria is the max/rightmost x.
-                    if not min_x:
-                        min_x = i
-                    else:
-                        max_x = i
-            else:
-                # If the scoreboard feathers cannot be found, this means the image is invalid or there is extra
-                # white bordering (from a windows tab or MS paint) that prevents resizing the image properly.
-                # So a second pass must be performed which crops the edges a little to remove
-                # the white border which is detected in the scoreboard background mask.
-                if np.count_nonzero(col) > required_pixels_h and buffer_vertical < i < (img_w - buffer_vertical):
-                    # The very first y meeting the criteria is the min/top most y,
-                    # and the last y meeting the criteria is the max/bottom most y.
-                    if not min_x:
-                        min_x = i
-                    else:
-                        max_x = i
-        print('\tRectangle edge X values:', min_x, max_x)
+            min_y, max_y = self.rectangle_locator.findRowEdges(required_pixels_w)
+        else:
+            # If the scoreboard feathers cannot be found, this means the image is invalid or there is extra
+            # white bordering (from a windows tab bar or MS paint) that prevents resizing the image properly.
+            # So a second pass must be performed which crops the edges a little to remove
+            # the white border which is detected in the scoreboard background mask.
+            min_y, max_y = self.rectangle_locator.findRowEdges(required_pixels_w, border=buffer_horizontal)
+        logger.debug('\tRectangle edge Y values: %s %s', min_y, max_y)
+
+        logger.debug('\tScoreboard cols limit: %s', required_pixels_h)
+        if not remove_border:
+            # If the distance between a white column over the threshold and the last white column
+            # is larger than the buffer, use that column to move away from the leftmost white border or tab.
+            min_x, max_x = self.rectangle_locator.findColumnEdges(required_pixels_h, left_border_gap=buffer_vertical)
+        else:
+            # The second pass crops the edges a little to remove the white border like the rows.
+            min_x, max_x = self.rectangle_locator.findColumnEdges(required_pixels_h, border=buffer_vertical)
+        logger.debug('\tRectangle edge X values: %s %s', min_x, max_x)
 
         if None in [min_x, min_y, max_x, max_y]:
-            print('\nCould not find a scoreboard rectangle')
+            logger.debug('Could not find a scoreboard rectangle')
             return False
 
         # New dimensions in order to crop and include just the scoreboard from the original image
@@ -225,11 +219,11 @@ class Scoreboard:
         y = min_y
         w = max_x - min_x
         h = max_y - min_y
-        print('\tNew dimension for X, Y, W, H', x, y, w, h)
+        logger.debug('\tNew dimension for X, Y, W, H %s %s %s %s', x, y, w, h)
 
         # If any dimension is too small, that likely means the image is a phone picture and should be invalid.
         if any(d < 100 for d in [w, h]):
-            print('\nImage dimensions are invalid')
+            logger.debug('Image dimensions are invalid')
             return False
 
         # Crop the image to only include the scoreboard's bounding box
@@ -243,13 +237,15 @@ class Scoreboard:
 
         # Pink mask to find Nectar for OE
         lower_hsv, upper_hsv = (160, 48, 180), (176, 150, 255)  # Lower was (160, 55, 180) until some 24 bit images broke nectar
-        nectar_pixels = self.findNectarPixelCount(self.img_scoreboard_bgr, lower_hsv, upper_hsv)
-        print('Nectar pixels total:', nectar_pixels)
+        # The whole image was already converted to HSV for the scoreboard mask, so its scoreboard region is reused.
+        img_scoreboard_hsv = self.img_hsv[y:y + h, x:x + w]
+        nectar_pixels = self.findNectarPixelCount(img_scoreboard_hsv, lower_hsv, upper_hsv)
+        logger.debug('Nectar pixels total: %s', nectar_pixels)
 
         # Reddish mask to find Duet Tokens for AE
         lower_hsv, upper_hsv = (5, 62, 210), (10, 90, 255)  # (5, 70, 212), (10, 90, 255)
-        duet_token_pixels = self.findDetailedScorePixelCount(self.img_scoreboard_bgr, lower_hsv, upper_hsv)
-        print('Duet Tokens pixels total:', duet_token_pixels)
+        duet_token_pixels = self.findDetailedScorePixelCount(img_scoreboard_hsv, lower_hsv, upper_hsv)
+        logger.debug('Duet Tokens pixels total: %s', duet_token_pixels)
 
         version_list = []
         # An OE submission should have well over 4000 pink nectar colored pixels
@@ -267,7 +263,7 @@ class Scoreboard:
             self.version = Version.OE
         elif Version.AE_DUET in version_list:
             self.version = Version.AE_DUET
-        print('Game version:', self.version)
+        logger.debug('Game version: %s', self.version)
 
         # Some people crop the scoreboard with the background art fully removed while others partially zoom
         # in on the scoreboard leaving just the top's winner section and some background art in the image.
@@ -275,24 +271,25 @@ class Scoreboard:
         # applied with resizing the image since the scoreboard ratio in these cases is generally 'normal'.
         zoom_buffer = 8  # Pixels
         if min_x < zoom_buffer and max_x > img_w - zoom_buffer and max_y > img_h - zoom_buffer:
-            print('\tScreenshot is likely zoomed in')
+            logger.debug('\tScreenshot is likely zoomed in')
             self.likely_zoomed = True
 
         img_h, img_w, c = self.img_scoreboard_bgr.shape
-        print('\tScoreboard rectangle size W, H:', img_w, img_h)
+        logger.debug('\tScoreboard rectangle size W, H: %s %s', img_w, img_h)
         return True
 
+    @timeStage
     def resizeScoreboard(self):
         # Resize the scoreboard so that the scale of all matching templates is
         # more consistent across inconsistently sized images.
-        print('\nResizing the scoreboard')
+        logger.debug('Resizing the scoreboard')
 
         # Create a ratio to scale all scoreboards to a better template matching size.
         scrbrd_h, scrbrd_w, _ = self.img_scoreboard_bgr.shape
         self.ratio = scrbrd_w / scrbrd_h
         scale_percent = self.base_w / scrbrd_w
         new_height = int(scrbrd_h * scale_percent)
-        print('\tRatio:', self.ratio)
+        logger.debug('\tRatio: %s', self.ratio)
 
         # Keep the scoreboard aspect ratio the same, resize all scoreboard widths to the base image width,
         # but rescale the scoreboard as necessary to keep the ratio of the feather and other digits consistent.
@@ -307,92 +304,231 @@ class Scoreboard:
         if self.ratio >= 3.5:
             # If the image is heavily cropped removing everything but the two scores,
             # do a bit more rescaling so the digits to match are generally the same size.
-            print('\tHeavily cropped image... scaling resizing by 90%')
-            width = int(self.base_w * 0.90)
-            new_height = int(new_height * 0.90)
+            logger.debug('\tHeavily cropped image... expecting a resizing scale of 90%')
+            expected_scale = 0.90
         elif 3.5 > self.ratio >= 2.15 and self.img_ratio < 2.4:
-            print('\tModerately cropped image... scaling resizing by 95%')
+            logger.debug('\tModerately cropped image... expecting a resizing scale of 95%')
             # If the cropping of the image removes most of the board but keeps
             # the winner name visible, rescale less than an extreme crop.
             # If the original image's ratio was over 2.4, then it's likely the screen
             # was a wider screen and for some reason added some additional pixels
             # width-wise to the scoreboard, increasing the scoreboard ratio to ~2.3.
             # Don't resize in this case and see how it performs.
-            width = int(self.base_w * 0.95)
-            new_height = int(new_height * 0.95)
+            expected_scale = 0.95
         elif self.likely_zoomed and not (2.12 > self.ratio > 2.05):
             # If the scoreboard has a normal ratio, but it is likely zoomed in, reduce the
             # scale of the image a little since the far left and right whitespace may be removed
             # which would appear to zoom in the scoreboard when resizing using a normal full rectangle.
-            print('\tZoomed in image... scaling resizing by 92.5%')
-            width = int(self.base_w * 0.925)
-            new_height = int(new_height * 0.925)
+            logger.debug('\tZoomed in image... expecting a resizing scale of 92.5%')
+            expected_scale = 0.925
         else:
             # An average scoreboard ratio is about 2.05 - 2.12
-            width = self.base_w
+            expected_scale = 1.0
+
+        # The ratio only gives the expected scale. If the feathers can't be found at that scale,
+        # the other scales are tried in the same pass and the scale that finds the feathers is used.
+        scales = [expected_scale] + [scale for scale in self.scoreboard_scales if scale != expected_scale]
+
+        # A border removal retry only tries the best scale of the previous pass again. Every scale was
+        # already tried on the previous pass, so trying them all again would mostly repeat failed matches.
+        if self.scale is not None:
+            scales = [self.scale]
+        sizes = [(scale, (int(self.base_w * scale), int(new_height * scale))) for scale in scales]
+        template = getTemplate('scoreboard/scoreboard_feather_oe.png')
+
+        # If a scoreboard with the same size and version was read before, only verify its feathers.
+        candidate = self.findCachedLayout(scrbrd_w, scrbrd_h, expected_scale, new_height, template)
+        if candidate is None:
+            candidate = estimateScale(self.img_scoreboard_bgr, sizes, template, self.feather_threshold, min_matches=2)
+        self.scale = candidate.scale
+        new_height, width, _ = candidate.image_bgr.shape
+        logger.debug('\tNew W, H: %s %s Scale: %s', width, new_height, candidate.scale)
+
+        # Use the resized image. Rectangles are never drawn on it, so it's used for image processing as it is.
+        self.img_scoreboard_bgr = candidate.image_bgr
+
+        # Rectangles found on a previous pass's scoreboard image don't belong on this one.
+        self.annotations.clear()
+
+        # Any converted views of a previous pass's scoreboard image are no longer valid,
+        # except the grayscale view and the feather matches that were found while estimating the scale.
+        self.img_scoreboard_gray = candidate.image_gray
+        self.img_scoreboard_hsv = None
+        self.img_scoreboard_otsu = None
+        self.img_scoreboard_adaptive = None
+        self.scale_feather_points_dict = candidate.matching_points_dict
+
+    def findCachedLayout(self, scrbrd_w, scrbrd_h, expected_scale, new_height, template):
+        # Resize the scoreboard to the scale of a cached layout and match the feathers only around the
+        # cached feather points. Returns the scale candidate, or None if there is no cached layout
+        # or its feathers could not all be found, in which case the whole scoreboard is searched.
+        self.layout_key = None
+        self.layout = None
+        layout_cache = getLayoutCache()
+        if layout_cache is None:
+            return None
+
+        # The expected scale is part of the key because it also depends on the image around the scoreboard.
+        self.layout_key = (scrbrd_w, scrbrd_h, self.version, expected_scale)
+        layout = layout_cache.get(self.layout_key)
+        if layout is None:
+            return None
+
+        width, height = int(self.base_w * layout.scale), int(new_height * layout.scale)
+        regions = layout.getFeatherRegions(width, height, layout_cache.verify_radius)
+        candidate = ScaleCandidate(layout.scale, cv2.resize(self.img_scoreboard_bgr, (width, height)),
+                                   template, self.feather_threshold, regions)
+        if candidate.num_matches != len(layout.feather_points) \
+                or self.findExtraFeathers(candidate, layout, template, layout_cache.verify_radius):
+            logger.debug('\tThe cached layout does not match this scoreboard, searching the whole scoreboard')
+            countEvent('layout_cache_rejections')
+            layout_cache.reject(self.layout_key)
+            return None
+
+        logger.debug('\tUsing the cached layout of a %s x %s scoreboard', scrbrd_w, scrbrd_h)
+        countEvent('layout_cache_hits')
+        self.layout = layout
+        return candidate
+
+    def findExtraFeathers(self, candidate, layout, template, verify_radius):
+        # Scoreboards of the same size can have a different number of players. Fewer players than the
+        # cached layout leaves a cached feather missing, but the feathers of extra players are outside
+        # the cached regions, so the rest of the feather column is searched for them too.
+        img_h, img_w = candidate.image_gray.shape
+        left_x = template.region_prior.getSearchRegion(img_w, img_h, template.w, template.h)[0]
+
+        matching_points_dict = {}
+        for band in layout.getFeatherBands(img_w, img_h, verify_radius, left_x):
+            if band[3] - band[1] >= template.h:
+                matching_points_dict.update(findTemplateMatchingPointsPyramid(candidate.image_gray, template,
+                                                                              self.feather_threshold, band))
+        if not matching_points_dict:
+            return False
 
-        print('\tNew W, H:', width, new_height)
+        # The bands overlap the cached regions, so the cached feathers themselves can be matched again.
+        regions = layout.getFeatherRegions(img_w, img_h, verify_radius)
+        extra_points = [(x, y) for x, y in findBestMatchingPoints(matching_points_dict)
+                        if not any(x1 <= x <= x2 and y1 <= y <= y2 for x1, y1, x2, y2 in regions)]
+        logger.debug('\tFeathers outside the cached layout: %s', extra_points)
+        return bool(extra_points)
+
+    def cacheLayout(self, feather_w, feather_h):
+        # Store the layout of a scoreboard whose feathers were found by searching the whole scoreboard.
+        layout_cache = getLayoutCache()
+        if layout_cache is None or self.layout_key is None or self.layout is not None:
+            return
+        if len(self.best_feather_points) < 2:
+            return
+        self.layout = ScoreboardLayout(self.scale, self.best_feather_points, (feather_w, feather_h))
+        layout_cache.put(self.layout_key, self.layout)
+
+    def findWinnerBadgePoints(self, template, threshold):
+        # Find the winner badge matching points, searching the winner badge band of the cached layout first.
+        layout_cache = getLayoutCache()
+        if layout_cache is not None and self.layout is not None and self.layout.badge_band is not None:
+            img_h, img_w = self.getScoreboardGray().shape
+            top, bottom = self.layout.badge_band
+            region = (0, top, img_w, min(bottom, img_h))
+            matching_points_dict = findTemplateMatchingPointsPyramid(self.getScoreboardGray(), template, threshold, region)
+            layout_cache.countBadgeSearch(bool(matching_points_dict))
+            if matching_points_dict:
+                return matching_points_dict
+
+        # The badge is near the top of the scoreboard, so search there first.
+        matching_points_dict = findTemplateMatchingPointsInRegion(self.getScoreboardGray(), template, threshold)
+        if layout_cache is not None and self.layout is not None and matching_points_dict:
+            layout_cache.setBadgeBand(self.layout_key, findBestMatchingPoints(matching_points_dict), template.h)
+        return matching_points_dict
+
+    def getAnnotatedScoreboard(self):
+        # Get a copy of the resized scoreboard with the rectangles around what was found drawn on it.
+        return self.annotations.render(self.img_scoreboard_bgr)
+
+    def getScoreboardGray(self):
+        # Get the grayscale view of the clean resized scoreboard used for template matching.
+        # It is converted once and shared by every template instead of converting it for each match.
+        if self.img_scoreboard_gray is None:
+            self.img_scoreboard_gray = cv2.cvtColor(self.img_scoreboard_bgr, cv2.COLOR_BGR2GRAY)
+        return self.img_scoreboard_gray
+
+    def getScoreboardHsv(self):
+        # Get the HSV view of the clean resized scoreboard used for color masks.
+        if self.img_scoreboard_hsv is None:
+            self.img_scoreboard_hsv = cv2.cvtColor(self.img_scoreboard_bgr, cv2.COLOR_BGR2HSV)
+        return self.img_scoreboard_hsv
+
+    def getScoreboardNameThresholds(self):
+        # Get the OTSU and adaptive thresholded views of the scoreboard used for reading player names.
+        # Names have always been read with the rectangles around what was already found drawn on the scoreboard,
+        # and they change the OTSU threshold of the whole scoreboard and the adaptive threshold next to them,
+        # so the annotated scoreboard is thresholded. It's only thresholded again once a rectangle was added
+        # instead of each time a name region is shrunk and retried.
+        num_rectangles = len(self.annotations.rectangles)
+        if self.img_scoreboard_otsu is None or self.name_thresholds_rectangles != num_rectangles:
+            image_gray = cv2.cvtColor(self.getAnnotatedScoreboard(), cv2.COLOR_BGR2GRAY)
+            ret, self.img_scoreboard_otsu = cv2.threshold(image_gray, 200, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
 
-        # TODO Double check with new blocks for invalid sizes
-        # try:
-        # Resize the image and make a clean copy of it to use for image processing without drawn rectangles.
-        self.img_scoreboard_bgr = cv2.resize(self.img_scoreboard_bgr, (width, new_height))
-        self.img_scoreboard_bgr_clean = copy.deepcopy(self.img_scoreboard_bgr)
-        # except cv2.error:
-        #     print('---------------CANT RESIZE FOUND SCOREBOARD')
+            # OTSU being weird solution?
+            # https://docs.opencv.org/4.x/d7/d4d/tutorial_py_thresholding.html
+            # Alternate method to try getting lower quality image names
+            self.img_scoreboard_adaptive = cv2.adaptiveThreshold(image_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                                 cv2.THRESH_BINARY, 15, 7)
+            self.name_thresholds_rectangles = num_rectangles
+        return self.img_scoreboard_otsu, self.img_scoreboard_adaptive
 
+    @timeStage
     def findScoreboardFeathers(self):
         # Find the large feathers on the scoreboard.
         # These feathers will point to a player's final score location and
         # using the feather location the detailed score locations can be extrapolated.
 
         # Using the feather template, find the feathers' point locations
-        print('\nFinding scoreboard feathers')
-        reader_dir = os.path.dirname(os.path.abspath(__file__))
-        src_dir = os.path.dirname(reader_dir)
-        scorebird_dir = os.path.dirname(src_dir)
+        logger.debug('Finding scoreboard feathers')
 
         # Use a moderate threshold
-        threshold = 0.73
+        threshold = self.feather_threshold
 
         ### Automarazzi ###
         # Automarazzi games have a red VS graphic in the scoreboard.
         # But we are using the avatar picture for the automarazzi just in case players crop the image.
-        template_avatar = Path(os.path.join(scorebird_dir, 'templates/scoreboard/automarazzi_avatar.png'))
-        matching_points_dict_avatar = findTemplateMatchingPoints(self.img_scoreboard_bgr, template_avatar, threshold)
+        template_avatar = getTemplate('scoreboard/automarazzi_avatar.png')
+        matching_points_dict_avatar = findTemplateMatchingPointsInRegion(self.getScoreboardGray(), template_avatar, threshold)
 
         if matching_points_dict_avatar:
             self.automarazzi = True
             avatar_point = findBestMatchingPoints(matching_points_dict_avatar)[0]  # There can be only one
             avatar_value = matching_points_dict_avatar[avatar_point].value
-            w, h = getImageSize(template_avatar)
+            w, h = template_avatar.w, template_avatar.h
 
-            print('\tAutomarazzi VS Point:', avatar_point, 'Value:', avatar_value)
+            logger.debug('\tAutomarazzi VS Point: %s Value: %s', avatar_point, avatar_value)
             self.automarazzi_banner_y = avatar_point[1] + h + 20  # Some buffer
 
             # Draw a rectangle around the Automarazzi picture
             color = (0, 0, 255)  # Red
-            cv2.rectangle(self.img_scoreboard_bgr,
-                          pt1=avatar_point,
-                          pt2=(avatar_point[0] + w, avatar_point[1] + h),
-                          color=color, thickness=2)
+            self.annotations.addRectangle(pt1=avatar_point,
+                                          pt2=(avatar_point[0] + w, avatar_point[1] + h),
+                                          color=color, thickness=2)
 
         # For whatever reason, Monster Couch made the OE scoreboard feather about 10 pixels shorter.
         # In case the normal feather cannot be found, try the OE feather instead.
-        # template_ee = Path(os.path.join(scorebird_dir, 'templates/scoreboard/scoreboard_feather.png'))
-        template_oe = Path(os.path.join(scorebird_dir, 'templates/scoreboard/scoreboard_feather_oe.png'))
+        # template_ee = getTemplate('scoreboard/scoreboard_feather.png')
+        template_oe = getTemplate('scoreboard/scoreboard_feather_oe.png')
 
         # Try to find both types of scoreboard feathers but use the first version with matching points.
-        # matching_points_dict_ee = findTemplateMatchingPoints(self.img_scoreboard_bgr, template_ee, threshold)
-        matching_points_dict_oe = findTemplateMatchingPoints(self.img_scoreboard_bgr, template_oe, threshold)
+        # The feathers are searched for right of the player names first (see the template's region prior).
+        # matching_points_dict_ee = findTemplateMatchingPoints(self.getScoreboardGray(), template_ee, threshold)
+        # The feathers were already matched at this scale while estimating the scale of the scoreboard.
+        matching_points_dict_oe = self.scale_feather_points_dict
+        if matching_points_dict_oe is None:
+            matching_points_dict_oe = findTemplateMatchingPointsInRegion(self.getScoreboardGray(), template_oe, threshold)
 
         if matching_points_dict_oe and self.version == Version.BASE_EE:
-            print('A base game or EE era scoreboard feather has been found')
-            w, h = getImageSize(template_oe)
+            logger.debug('A base game or EE era scoreboard feather has been found')
+            w, h = template_oe.w, template_oe.h
             matching_points_dict = matching_points_dict_oe
         elif matching_points_dict_oe and self.version != Version.BASE_EE:
-            print('An OE era scoreboard feather has been found')
-            w, h = getImageSize(template_oe)
+            logger.debug('An OE era scoreboard feather has been found')
+            w, h = template_oe.w, template_oe.h
             matching_points_dict = matching_points_dict_oe
         else:
             matching_points_dict = {}
@@ -409,7 +545,8 @@ class Scoreboard:
             self.best_feather_points = best_feather_points
 
             if len(self.best_feather_points) < 2:
-                print('\nFewer than 2 feathers detected, performing second pass')
+                logger.debug('Fewer than 2 feathers detected, performing second pass')
+                countEvent('feather_second_passes')
                 # If the scoreboard feathers cannot be found (or fewer than two), this means the image
                 # is invalid or there is extra white bordering (from a windows tab or MS paint) that
                 # prevents resizing the image properly, so remove the border and try again.
@@ -428,13 +565,12 @@ class Scoreboard:
             for i, point in enumerate(self.best_feather_points):
                 if point in matching_points_dict:
                     value = matching_points_dict[point].value
-                    print('\tPlayer', self.players_dict[i].name, 'Feather Point:', point, 'Value:', value)
+                    logger.debug('\tPlayer %s Feather Point: %s Value: %s', self.players_dict[i].name, point, value)
                     self.players_dict[i].feather_point = point
                     color = (0, 0, 255)  # Red
-                    cv2.rectangle(self.img_scoreboard_bgr,
-                                  pt1=point,
-                                  pt2=(point[0] + w, point[1] + h),
-                                  color=color, thickness=2)
+                    self.annotations.addRectangle(pt1=point,
+                                                  pt2=(point[0] + w, point[1] + h),
+                                                  color=color, thickness=2)
 
                     # Add the height of the feather template to the top left point of the
                     # feather to get the bottom of the feather (y values ascend top to bottom)
@@ -445,17 +581,20 @@ class Scoreboard:
                 else:
                     return False
 
+            # Scoreboards of the same size can verify these feathers instead of searching for them.
+            self.cacheLayout(w, h)
             return True
 
         else:
-            print('ERROR - No scoreboard feathers detected')
+            logger.debug('ERROR - No scoreboard feathers detected')
             # TODO Handle zero template detections
 
             # If the scoreboard feathers cannot be found (or fewer than two), this means the image
             # is invalid or there is extra white bordering (from a windows tab or MS paint) that
             # prevents resizing the image properly, so remove the border and try again.
             if self.first_pass:
-                print('----------------No feathers detected, performing second pass')
+                logger.debug('----------------No feathers detected, performing second pass')
+                countEvent('feather_second_passes')
                 self.first_pass = False
                 if self.findScoreboardRectangle(remove_border=True):
                     self.resizeScoreboard()
@@ -469,12 +608,13 @@ class Scoreboard:
                 return False
 
     #TODO Rearrange order
+    @timeStage
     def findMatchWinner(self, api: tesserocr.PyTessBaseAPI):
         # Find the lower badge winner template on the scoreboard.
         # These badge winner marker will point to a winning player's name location
 
         # Using the feather template, find the feathers' point locations
-        print('\nFinding match winner(s)')
+        logger.debug('Finding match winner(s)')
 
         # Find the winner according to the scores (food tiebreakers determined by winner badge if it exists)
 
@@ -494,29 +634,26 @@ class Scoreboard:
             if player_name is None:
                 player_name = 'UNKNOWN_PLAYER'
 
-            print(player_name, player_final)
+            logger.debug('%s %s', player_name, player_final)
 
             if player_final > score_max:
                 self.winning_player_by_score.clear()
                 self.winning_player_by_score.append(player_name)
                 score_max = player_final
             elif player_final == score_max:
-                print('TIE GAME!?!?!')
+                logger.debug('TIE GAME!?!?!')
                 self.winning_player_by_score.append(player_name)
 
         self.valid_players = new_valid_players
+        self.valid_player_index = NameIndex(self.valid_players)
 
-        reader_dir = os.path.dirname(os.path.abspath(__file__))
-        src_dir = os.path.dirname(reader_dir)
-        scorebird_dir = os.path.dirname(src_dir)
-        template = Path(os.path.join(scorebird_dir, 'templates/scoreboard/winner_badge.png'))
-
-        w, h = getImageSize(template)
+        template = getTemplate('scoreboard/winner_badge.png')
+        w, h = template.w, template.h
 
         # Use a moderate threshold
         threshold = 0.75
 
-        matching_points_dict = findTemplateMatchingPoints(self.img_scoreboard_bgr, template, threshold)
+        matching_points_dict = self.findWinnerBadgePoints(template, threshold)
 
         badge_h = 32
 
@@ -528,14 +665,14 @@ class Scoreboard:
             #TODO Handle multiplayer games and ties use image .....
             max_player_length = len(max(self.winning_player_by_score, key=len))
 
-            print('\tMax player name length', max_player_length)
+            logger.debug('\tMax player name length %s', max_player_length)
             cw = 10  # Character width (approx)
             badge_buffer_w = int((max_player_length * cw) / 2)  # This buffer is to either side of the template
 
             winning_player = []
             for i, point in enumerate(self.best_winner_points):
                 value = matching_points_dict[point].value
-                print('\tPlayer', self.players_dict[i].name, 'Winner Badge Point:', point, 'Value:', value)
+                logger.debug('\tPlayer %s Winner Badge Point: %s Value: %s', self.players_dict[i].name, point, value)
                 self.players_dict[i].winner_badge_point = point
 
                 # Minus 2 is to move above the template rectangle and reduce OCR issues
@@ -547,8 +684,7 @@ class Scoreboard:
                     name_start_y = 0
 
                 # Get the winners
-                player_name, _, _, _ = self.getPlayerName(self.img_scoreboard_bgr,
-                                                          x=name_start_x, y=name_start_y,
+                player_name, _, _, _ = self.getPlayerName(x=name_start_x, y=name_start_y,
                                                           w=w + 2 * badge_buffer_w, h=badge_h,
                                                           api=api, matchWinner=True,
                                                           expand=False, showImage=False)
@@ -556,26 +692,23 @@ class Scoreboard:
 
                 # Template
                 color = (150, 150, 150)  # Gray
-                cv2.rectangle(self.img_scoreboard_bgr,
-                              pt1=point,
-                              pt2=(point[0] + w, point[1] + h),
-                              color=color, thickness=2)
+                self.annotations.addRectangle(pt1=point,
+                                              pt2=(point[0] + w, point[1] + h),
+                                              color=color, thickness=2)
 
                 # Winner badge player name
                 color = (50, 100, 255)  # Orange
-                cv2.rectangle(self.img_scoreboard_bgr,
-                              pt1=(name_start_x, name_start_y),
-                              pt2=(point[0] + w + badge_buffer_w, point_y),
-                              color=color, thickness=2)
-                print()
+                self.annotations.addRectangle(pt1=(name_start_x, name_start_y),
+                                              pt2=(point[0] + w + badge_buffer_w, point_y),
+                                              color=color, thickness=2)
 
             self.winning_player_by_badge = winning_player
-            print('\tWinning players from badge:', winning_player)
+            logger.debug('\tWinning players from badge: %s', winning_player)
 
             if self.winning_player_by_badge:
                 # TODO Handle multiple players
                 if len(self.winning_player_by_badge) == 1 and self.winning_player_by_badge[0] is None:
-                    print('Badge detection failed, we will get em next time')
+                    logger.debug('Badge detection failed, we will get em next time')
                     self.winner = self.winning_player_by_score
                 else:
                     # winner = ['None' if p is None else p for p in scoreboard.winning_player_by_badge]
@@ -584,12 +717,12 @@ class Scoreboard:
                 # winner = ['None' if p is None else p for p in scoreboard.winning_player_by_score]
                 self.winner = self.winning_player_by_score
 
-            print('* WINNER *', self.winner)
+            logger.debug('* WINNER * %s', self.winner)
 
             return True
 
         else:
-            print('\tDid not find a match winner badge, using winner based on final score only')
+            logger.debug('\tDid not find a match winner badge, using winner based on final score only')
             self.winner = self.winning_player_by_score
             return False
 
@@ -600,7 +733,7 @@ class Scoreboard:
         for player in self.players_dict:
             player_name = self.players_dict[player].player_name
             player_final = self.players_dict[player].final_score.score
-            print('PLAYER', player, player_name)
+            logger.debug('PLAYER %s %s', player, player_name)
 
             # If the player's wingspan name could not be detected (too long, low res, etc)
             # Have a temp name for them other than None
@@ -612,17 +745,18 @@ class Scoreboard:
                 self.winning_player_by_score.append(player_name)
                 score_max = player_final
             elif player_final == score_max:
-                print('TIE GAME!?!?!')
+                logger.debug('TIE GAME!?!?!')
                 self.winning_player_by_score.append(player_name)
 
         self.winner = self.winning_player_by_score
-        print('* WINNER *', self.winner)
+        logger.debug('* WINNER * %s', self.winner)
 
+    @timeStage
     def findFinalScores(self):
         # Each feather is next to a player's final score. Use that location to
         # extrapolate the final score's approximate location.
 
-        print('\nFinding final scores')
+        logger.debug('Finding final scores')
 
         w = self.final_score_w
         h = self.final_score_h
@@ -631,16 +765,19 @@ class Scoreboard:
         for i, point in enumerate(self.best_feather_points):
             x = point[0]
             y = point[1]
-            score_x = x - w
+            # A feather near the left edge of the scoreboard leaves less room for the score left of it.
+            score_x = max(x - w, 0)
             score_y = y
 
-            img_final_score_bgr = copy.deepcopy(self.img_scoreboard_bgr_clean[y:y + h, x - w:x])
+            # The final score image is a view into the grayscale scoreboard rather than a copy.
+            img_final_score_gray = self.getScoreboardGray()[y:y + h, score_x:x]
 
-            # cv2.imshow('img_final_score_bgr', img_final_score_bgr)
+            # cv2.imshow('img_final_score_gray', img_final_score_gray)
             # cv2.waitKey()
 
-            self.players_dict[i].createFinalScore(i, score_x, score_y, img_final_score_bgr)
+            self.players_dict[i].createFinalScore(i, score_x, score_y, img_final_score_gray)
 
+    @timeStage
     def decipherFinalScores(self):
         # Figure out each player's final scores within the final score region next to the feather.
         # Use template matching to find the individual digits in the final scores.
@@ -648,7 +785,7 @@ class Scoreboard:
         for player in self.players_dict:
             total_digits = self.players_dict[player].decipherFinalScore()
             if total_digits == 0:
-                print('ERROR - Player', self.players_dict[player].name, 'No final score digits detected')
+                logger.debug('ERROR - Player %s No final score digits detected', self.players_dict[player].name)
                 return False
         return True
 
@@ -669,14 +806,14 @@ class Scoreboard:
                 new_y = score_y + digit_y
 
                 color = (0, 255, 0)  # Green
-                cv2.rectangle(self.img_scoreboard_bgr,
-                              pt1=(new_x, new_y),
-                              pt2=(new_x + digit_w, new_y + digit_h),
-                              color=color, thickness=2)
+                self.annotations.addRectangle(pt1=(new_x, new_y),
+                                              pt2=(new_x + digit_w, new_y + digit_h),
+                                              color=color, thickness=2)
 
+    @timeStage
     def findDetailedScores(self):
         # Using the y location of the detailed score line, get a cropped detailed score image.
-        print('\nFinding detailed scores')
+        logger.debug('Finding detailed scores')
 
         # This is half the height of the detailed score region.  It will be used to go above and below the
         # middle of the score line for creating a cropped rectangle containing just the detailed scores line
@@ -696,8 +833,8 @@ class Scoreboard:
             self.players_dict[player].detailed_scores_end_x = detailed_scores_end_x
 
             # Create the img where detailed scores are being looked at for the first pass.
-            img_detailed_score = self.img_scoreboard_bgr_clean[(y - line_buffer):(y + line_buffer),
-                                 self.player_name_w:detailed_scores_end_x]
+            img_detailed_score_hsv = self.getScoreboardHsv()[(y - line_buffer):(y + line_buffer),
+                                     self.player_name_w:detailed_scores_end_x]
 
             # cv2.imshow('img_detailed_score', img_detailed_score)
             # cv2.waitKey()
@@ -708,10 +845,9 @@ class Scoreboard:
             # To avoid dealing with images with white bars on the left hand side and a loose detailed_scores_end_x
             # value, use a grayish mask to find leftmost x value for the bird points based off of this loose
             # estimate to then get a good end x value instead of a static player_name_w.
-            img_hsv = cv2.cvtColor(img_detailed_score, cv2.COLOR_BGR2HSV)
-            img_mask = cv2.inRange(img_hsv, lower_hsv, upper_hsv)
+            img_mask = cv2.inRange(img_detailed_score_hsv, lower_hsv, upper_hsv)
             img_h, img_w = img_mask.shape
-            print('\tDetails image size W, H:', img_w, img_h)
+            logger.debug('\tDetails image size W, H: %s %s', img_w, img_h)
 
             # cv2.imshow('img_mask', img_mask)
             # cv2.waitKey()
@@ -722,20 +858,11 @@ class Scoreboard:
 
             # The origin point (0,0) of a cv2 image is the top-left corner, hence the top of the image
             # has smaller x values than the bottom and the left-hand side has smaller y values than the right.
-            print('\tScoreboard cols limit:', required_pixels_h)
-            min_x = None
-            max_x = None
-            # Transpose the numpy array to get the columns
-            for i, col in enumerate(img_mask.T):
-                #print(i, np.count_nonzero(col))
-                if np.count_nonzero(col) > required_pixels_h:
-                    # The very first x value meeting the criteria is the min/leftmost x,
-                    # and the last x value meeting the criteria is the max/rightmost x.
-                    if not min_x:
-                        min_x = i
-                    else:
-                        max_x = i
-            print('\tRectangle edge X values:', min_x, max_x)
+            # The very first x value meeting the criteria is the min/leftmost x,
+            # and the last x value meeting the criteria is the max/rightmost x.
+            logger.debug('\tScoreboard cols limit: %s', required_pixels_h)
+            min_x, max_x = RectangleLocator(img_mask).findColumnEdges(required_pixels_h)
+            logger.debug('\tRectangle edge X values: %s %s', min_x, max_x)
 
             # Create the updated details starting x which essentially replaces the player name width so
             # more of the name area is viewed.  This may run into OCR problems where there is a white bar
@@ -745,27 +872,27 @@ class Scoreboard:
             else:
                 start_x = self.player_name_w
             self.details_start_x = start_x
-            print('\tDetails start x:', start_x)
+            logger.debug('\tDetails start x: %s', start_x)
 
             # Draw a rectangle around the zone where detailed scores are being looked at
             color = (255, 0, 0)  # Blue
-            cv2.rectangle(self.img_scoreboard_bgr,
-                          pt1=(start_x, y - line_buffer),
-                          pt2=(detailed_scores_end_x, y + line_buffer),
-                          color=color, thickness=2)
+            self.annotations.addRectangle(pt1=(start_x, y - line_buffer),
+                                          pt2=(detailed_scores_end_x, y + line_buffer),
+                                          color=color, thickness=2)
 
-            # Create the img where detailed scores are being looked at
-            img_detailed_score = self.img_scoreboard_bgr_clean[(y - line_buffer):(y + line_buffer),
-                                 start_x:detailed_scores_end_x]
+            # Create the img where detailed scores are being looked at as a view into the grayscale scoreboard
+            img_detailed_score_gray = self.getScoreboardGray()[(y - line_buffer):(y + line_buffer),
+                                      start_x:detailed_scores_end_x]
 
-            self.players_dict[player].createDetailedScore(player, start_x, y - line_buffer, img_detailed_score)
+            self.players_dict[player].createDetailedScore(player, start_x, y - line_buffer, img_detailed_score_gray)
 
+    @timeStage
     def findPlayerNames(self, api: tesserocr.PyTessBaseAPI):
         # Using the y location of the detailed score line, get a cropped detailed score image.
-        print('\nFinding player names')
+        logger.debug('Finding player names')
 
         for player in self.players_dict:
-            print('\nPlayer', player)
+            logger.debug('Player %s', player)
             # Given the score line, go up some and down some for the rectangle of interest
             y = self.players_dict[player].detailed_score_line_y
 
@@ -776,17 +903,15 @@ class Scoreboard:
             name_start_y = y - h
             name_width = self.details_start_x - 2  # Minus 2 for moving past the detailed rectangle line
 
-            player_name, tried_detection, good_mention, new_x = self.getPlayerName(self.img_scoreboard_bgr,
-                                                                                   x=0, y=name_start_y,
+            player_name, tried_detection, good_mention, new_x = self.getPlayerName(x=0, y=name_start_y,
                                                                                    w=name_width, h=h,
                                                                                    api=api, matchWinner=False,
                                                                                    expand=True, showImage=False)
 
             color = (200, 0, 150)  # Purple
-            cv2.rectangle(self.img_scoreboard_bgr,
-                          pt1=(new_x, name_start_y),
-                          pt2=(name_width, y),
-                          color=color, thickness=2)
+            self.annotations.addRectangle(pt1=(new_x, name_start_y),
+                                          pt2=(name_width, y),
+                                          color=color, thickness=2)
 
             # If the player appears to have been mentioned incorrectly (meaning their name was found in
             # the master player list but not the mentioned player list), set a flag.
@@ -802,19 +927,32 @@ class Scoreboard:
             if player_name:
                 self.players_dict[player].player_name = player_name
 
-    def getPlayerName(self, image, x, y, w, h, api: tesserocr.PyTessBaseAPI, matchWinner=False, expand=False, showImage=False):
+    def getPlayerName(self, x, y, w, h, api: tesserocr.PyTessBaseAPI, matchWinner=False, expand=False, showImage=False):
         # Read the player name within a zoomed in region of the image using OCR.
 
         # Returns: player_name, tried_detection, good_mention, new_x
 
         corrected_player_name = None
         new_x = x
+        tries = 0
+
+        # A name region without any width has no name in it (the widths and ratios below divide by it).
+        if w <= 0 or h <= 0:
+            logger.debug('\tName location has no area: W, H %s %s', w, h)
+            return None, False, None, x
+
         # If a player's name cannot be found the first time then the area we search (width-wise) will get smaller
         # until background noise is removed and a player's name is found.
         while not corrected_player_name:
-            # Convert the image and crop it to the name's region.
-            image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            ret, image_thresh_otsu = cv2.threshold(image_gray, 200, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            tries += 1
+            logger.debug('\tPlayer name attempt: %s', tries)
+            countEvent('player_name_attempts')
+            if tries > 1:
+                countEvent('player_name_shrinks')
+
+            # Crop the thresholded images to the name's region. They're only thresholded again when a rectangle
+            # was drawn since the last attempt, IE around the match winner's name.
+            image_thresh_otsu, image_thresh_adaptive = self.getScoreboardNameThresholds()
             name_image_otsu = image_thresh_otsu[y: y + h, x: x + w]
 
             # pil_image = Image.fromarray(name_image_otsu)
@@ -823,12 +961,6 @@ class Scoreboard:
             # api.SetImage(pil_image)
             # player_name = api.GetUTF8Text()
 
-            # OTSU being weird solution?
-            # https://docs.opencv.org/4.x/d7/d4d/tutorial_py_thresholding.html
-
-
-            # Alternate method to try getting lower quality image names
-            image_thresh_adaptive = cv2.adaptiveThreshold(image_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 15, 7)
             name_image_adaptive = image_thresh_adaptive[y: y + h, x: x + w]
 
             # pil_image = Image.fromarray(name_image_adaptive)
@@ -839,7 +971,7 @@ class Scoreboard:
 
             # Attempt to crop the name_image to remove any black bars on the left side of the name box.
             img_h, img_w = name_image_adaptive.shape
-            print('\tName image size W, H:', img_w, img_h)
+            logger.debug('\tName image size W, H: %s %s', img_w, img_h)
 
             #cv2.imshow('name_image', name_image)
             #cv2.waitKey()
@@ -849,7 +981,7 @@ class Scoreboard:
 
             # TODO Make function for duplicate?
             if matchWinner:
-                print('Reducing size of match winner image')
+                logger.debug('Reducing size of match winner image')
                 # Create the required number of black or '0' valued pixels which
                 # signify the black bars in potential name images on the edge of a scoreboard.
                 threshold_percent_h = 0.3
@@ -857,7 +989,7 @@ class Scoreboard:
 
                 # The origin point (0,0) of a cv2 image is the top-left corner, hence the top of the image
                 # has smaller x values than the bottom and the left-hand side has smaller y values than the right.
-                print('\tScoreboard cols limit:', required_pixels_h)
+                logger.debug('\tScoreboard cols limit: %s', required_pixels_h)
                 max_x = None
                 # Transpose the numpy array to get the columns
 
@@ -894,12 +1026,12 @@ class Scoreboard:
                 if max_x is None:
                     max_x = img_w - 1
 
-                print('\tRectangle edge X values:', max_x, middle_x)
+                logger.debug('\tRectangle edge X values: %s %s', max_x, middle_x)
 
                 half_width = max_x - middle_x
                 name_left_x = middle_x - half_width
                 name_right_x = middle_x + half_width
-                print('\tRectangle edge X values:', name_left_x, name_right_x)
+                logger.debug('\tRectangle edge X values: %s %s', name_left_x, name_right_x)
 
                 # Crop the name image to be the area where the name appears to be
                 name_image_adaptive = name_image_adaptive[:, name_left_x:name_right_x]
@@ -908,10 +1040,9 @@ class Scoreboard:
 
                 # Winner badge player name
                 color = (50, 0, 255)  # Red Orange
-                cv2.rectangle(self.img_scoreboard_bgr,
-                              pt1=(x + name_left_x, y + 2),
-                              pt2=(x + name_right_x, y + h - 2),
-                              color=color, thickness=2)
+                self.annotations.addRectangle(pt1=(x + name_left_x, y + 2),
+                                              pt2=(x + name_right_x, y + h - 2),
+                                              color=color, thickness=2)
 
             else:
                 # Create the required number of black or '0' valued pixels which
@@ -921,7 +1052,7 @@ class Scoreboard:
 
                 # The origin point (0,0) of a cv2 image is the top-left corner, hence the top of the image
                 # has smaller x values than the bottom and the left-hand side has smaller y values than the right.
-                print('\tScoreboard cols limit:', required_pixels_h)
+                logger.debug('\tScoreboard cols limit: %s', required_pixels_h)
                 min_x = None
                 max_x = None
                 # Transpose the numpy array to get the columns
@@ -934,7 +1065,7 @@ class Scoreboard:
                             min_x = i
                         else:
                             max_x = i
-                print('\tRectangle edge X values:', min_x, max_x)
+                logger.debug('\tRectangle edge X values: %s %s', min_x, max_x)
 
                 # Crop out the leftmost black bars if they exist
                 if max_x and max_x < 0.2 * img_w:
@@ -950,13 +1081,13 @@ class Scoreboard:
 
             img_white_pixels = np.count_nonzero(name_image_adaptive)
             percent_white = img_white_pixels / (w * h)
-            print('Player name space % white:', percent_white)
-            print('Player name space w/h', w, h, 'at x/y', x, y)
+            logger.debug('Player name space %% white: %s', percent_white)
+            logger.debug('Player name space w/h %s %s at x/y %s %s', w, h, x, y)
 
             # If the name image contains a small percentage of black text pixels, assume the name is empty
             # For longer names which get shrunk a little, this value was updated from 0.9 to 0.925
             if percent_white > 0.925:
-                print('\tName location appears to be empty')
+                logger.debug('\tName location appears to be empty after %s attempt(s)', tries)
                 # Return no player name, and name detection failure
                 return None, False, None, x
 
@@ -984,10 +1115,10 @@ class Scoreboard:
             #print('Player name approx:', player_name.strip())
 
             player_name_clean_adaptive = re.sub('[^0-9a-zA-Z]+', ' ', player_name_adaptive)
-            print('\tPlayer name (adaptive) approx clean:', repr(player_name_clean_adaptive))
+            logger.debug('\tPlayer name (adaptive) approx clean: %r', player_name_clean_adaptive)
 
             player_name_clean_otsu = re.sub('[^0-9a-zA-Z]+', ' ', player_name_otsu)
-            print('\tPlayer name (otsu) approx clean:', repr(player_name_clean_otsu))
+            logger.debug('\tPlayer name (otsu) approx clean: %r', player_name_clean_otsu)
 
             # If no player name was detected, assume the game is a player vs bot/ai game
             # if not player_name_clean:
@@ -998,14 +1129,15 @@ class Scoreboard:
             corrected_player_name_otsu, good_mention_otsu, max_val_otsu = self.checkPlayerName(player_name_clean_otsu)
 
             if max_val_adaptive > max_val_otsu:
-                print('Using corrected player name through ADAPTIVE thresholding')
+                logger.debug('Using corrected player name through ADAPTIVE thresholding')
                 corrected_player_name = corrected_player_name_adaptive
             else:
-                print('Using corrected player name through OTSU thresholding')
+                logger.debug('Using corrected player name through OTSU thresholding')
                 corrected_player_name = corrected_player_name_otsu
 
 
             if not good_mention_adaptive and not good_mention_otsu:
+                logger.debug('\tBad player mention after %s attempt(s)', tries)
                 return None, True, False, x
 
             # Reduce the area that is being searched width-wise
@@ -1014,11 +1146,12 @@ class Scoreboard:
                 buff = 10
                 x += buff
                 w -= buff #* 2 # Time 2 was actually shrinking the right side too much in some cases
-                print('\tBadge width:', w)
+                logger.debug('\tBadge width: %s', w)
 
                 # If the badge width has been shrunk as far as it can without finding anything,
                 # assume the Wingspan name could not be found (it could be too blurry).
-                if w < 0:
+                if w <= 0:
+                    logger.debug('\tNo player name found after %s attempt(s)', tries)
                     # Return no player name, and name detection success since we tried finding it
                     return None, True, None, x
 
@@ -1028,63 +1161,33 @@ class Scoreboard:
                 cv2.imshow('Detected (otsu)', name_image_otsu)
                 cv2.waitKey()
 
+        logger.debug('\tPlayer name found after %s attempt(s)', tries)
         return corrected_player_name, True, True, new_x
 
     def checkPlayerName(self, player_name):
         # Spell checks the player name detected through OCR against the list of all possible player names
         # and returns the corrected player name if detection errors occurred with OCR.
-        max_val = 0
-        best_player = None
-        player_name_clean = player_name.strip().upper()
-
-        #print('Players', self.valid_players)
-        players_upper = [p.upper() for p in self.valid_players if p is not None]
-
-        # Create this list for checking against incorrectly mentioned players
-        all_players = getWingspanPlayerList()
-        players_upper_all = [p.upper() for p in all_players]
-
         # Use a letter sequence matcher to get a ratio for how far off each
         # letter is in the OCR detected words compared to all possible player names in a tournament.
         # This is useful for longer OCR names that pixelate a lot.
-        for i, testing_player in enumerate(players_upper):
-            ratio = difflib.SequenceMatcher(None, player_name_clean, testing_player).ratio()
-
-            # TODO Handle or use a flag if the best ratio is under 0.5 or so
-
-            # If there is a perfect match, then there is no need to try every other possible bird name.
-            if ratio == 1.0:
-                max_val = ratio
-                best_player = self.valid_players[i]
-                break
-            elif ratio > max_val:
-                max_val = ratio
-                best_player = self.valid_players[i]
-        print('\tCorrected', repr(player_name), 'into', best_player, round(max_val, 4))
-
-        # Check against the entire player for incorrectly mentioned players
-        max_val2 = 0
-        best_player2 = None
-        for j, testing_player2 in enumerate(players_upper_all):
-            ratio2 = difflib.SequenceMatcher(None, player_name_clean, testing_player2).ratio()
-            # If there is a perfect match, then there is no need to try every other possible bird name.
-            if ratio2 == 1.0:
-                max_val2 = ratio2
-                best_player2 = all_players[j]
-                break
-            elif ratio2 > max_val2:
-                max_val2 = ratio2
-                best_player2 = all_players[j]
-        print('\tCorrected2', repr(player_name), 'into', best_player2, round(max_val2, 4))
+        best_player, max_val = self.valid_player_index.findBestMatch(player_name)
+
+        # TODO Handle or use a flag if the best ratio is under 0.5 or so
+        logger.debug('\tCorrected %r into %s %.4f', player_name, best_player, max_val)
+
+        # Check against the entire player list for incorrectly mentioned players
+        best_player2, max_val2 = getWingspanPlayerNameIndex().findBestMatch(player_name)
+        logger.debug('\tCorrected2 %r into %s %.4f', player_name, best_player2, max_val2)
 
         # If the name appears to be in the list of all players and not the mentioned players,
         # return this info.
         if max_val2 > max_val and max_val < 0.6:
-            print('\t\tPlayer appears to have been mentioned incorrectly')
+            logger.debug('\t\tPlayer appears to have been mentioned incorrectly')
             return None, False, max_val
 
         return best_player, True, max_val
 
+    @timeStage
     def findApproximateDetailedScores(self):
         # Find the approximate detailed scores using the colored 'counting up' bar
         # because sometimes these are needed for detection correction and confirmation.
@@ -1097,70 +1200,30 @@ class Scoreboard:
         approx_lower_y = 20
 
         for player in self.players_dict:
-            print('\nPlayer', self.players_dict[player].name, 'approximate detailed scores')
+            logger.debug('Player %s approximate detailed scores', self.players_dict[player].name)
             y = self.players_dict[player].detailed_score_line_y
 
             # Create a slice of the detailed scoreboard to include the upper part of the scores.
             # This is then masked for each detail in order to count how many of
             # those colored pixels there are as an approximate size which can be
             # used for detailed score verification on hidden/combined scores.
-            img_detailed_scores = self.img_scoreboard_bgr_clean[(y - approx_upper_y):(y - approx_lower_y),
-                                  self.player_name_w:self.players_dict[player].detailed_scores_end_x]
-
-            # Gray mask to find Bird Points
-            lower_hsv, upper_hsv = (47, 4, 0), (100, 70, 225)
-            detail_birdpts_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-            # Green mask to find Bonus Cards
-            lower_hsv, upper_hsv = (30, 40, 165), (50, 140, 255)
-            detail_bonus_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-            # Yellow mask to find EOR Goals
-            lower_hsv, upper_hsv = (23, 50, 170), (35, 135, 255)
-            detail_eor_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-            if self.version == Version.BASE_EE:
-                # Base/EE colorations
-
-                # Orange mask to find Eggs
-                lower_hsv, upper_hsv = (14, 72, 170), (22, 255, 255)
-                detail_eggs_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-                # Red mask to find Caches for
-                lower_hsv, upper_hsv = (8, 40, 170), (13, 95, 255)
-                detail_caches_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-                # Purple mask to find Tucks
-                lower_hsv, upper_hsv = (145, 20, 140), (175, 50, 255)
-                detail_tucks_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-                detail_nectar_count = 0
-                detail_duet_token_count = 0
-
-            else:
-                # OE era colorations are slightly different, plus nectar is added
-
-                # Tan mask to find Eggs for OE
-                lower_hsv, upper_hsv = (16, 50, 175), (22, 80, 255)
-                detail_eggs_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-                # Red mask to find Caches for OE
-                lower_hsv, upper_hsv = (12, 72, 190), (16, 90, 255)
-                detail_caches_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-                # Purple mask to find Tucks for OE
-                lower_hsv, upper_hsv = (120, 10, 150), (164, 65, 255)
-                detail_tucks_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-                # Pink mask to find Nectar for OE
-                lower_hsv, upper_hsv = (160, 48, 180), (176, 150, 255)  # Lower was (160, 55, 180) until some 24 bit images broke nectar
-                detail_nectar_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-                # Reddish mask to find Duet Tokens for AE
-                lower_hsv, upper_hsv = (5, 62, 210), (10, 90, 255) #(5, 70, 212), (10, 90, 255)
-                detail_duet_token_count = self.findDetailedScorePixelCount(img_detailed_scores, lower_hsv, upper_hsv)
-
-            # Using the number of nonzero pixels available in the mask, create an
+            img_detailed_scores_hsv = self.getScoreboardHsv()[(y - approx_upper_y):(y - approx_lower_y),
+                                      self.player_name_w:self.players_dict[player].detailed_scores_end_x]
+
+            # Label every pixel with the detail colors it's in at once, instead of masking the slice for each color.
+            detail_counts = getDetailClassifier(self.version).countPixels(img_detailed_scores_hsv)
+
+            # BASE_EE scoreboards have no nectar or duet tokens
+            detail_birdpts_count = detail_counts['bird_pts']
+            detail_bonus_count = detail_counts['bonus']
+            detail_eor_count = detail_counts['eor']
+            detail_eggs_count = detail_counts['eggs']
+            detail_caches_count = detail_counts['caches']
+            detail_tucks_count = detail_counts['tucks']
+            detail_nectar_count = detail_counts.get('nectar', 0)
+            detail_duet_token_count = detail_counts.get('duet_tokens', 0)
+
+            # Using the number of pixels of each detail's color, create an
             # approximate sum which is used to calculate the approximate detailed score.
             # This is then used for verifying/placement of detailed scores that may not
             # be visible in the screenshot or digits that are too close together.
@@ -1183,34 +1246,34 @@ class Scoreboard:
                                                                    approx_egg_pts, approx_cache_pts, approx_tuck_pts,
                                                                    approx_nectar_pts, approx_duet_token_pts)
 
-            print('\tBird Points approx value:', approx_bird_pts)
-            print('\tBonus Cards approx value:', approx_bonus_pts)
-            print('\tEOR Goals approx value:', approx_eor_pts)
-            print('\tEggs approx value:', approx_egg_pts)
-            print('\tCaches approx value:', approx_cache_pts)
-            print('\tTucks approx value:', approx_tuck_pts)
-            print('\tNectar approx value:', approx_nectar_pts)
-            print('\tDuet Token approx value:', approx_duet_token_pts)
-
-    def findDetailedScorePixelCount(self, img_detailed_scores, lower_hsv, upper_hsv):
-        # Apply the mask to the detailed score image
-        img_hsv = cv2.cvtColor(img_detailed_scores, cv2.COLOR_BGR2HSV)
+            logger.debug('\tBird Points approx value: %s', approx_bird_pts)
+            logger.debug('\tBonus Cards approx value: %s', approx_bonus_pts)
+            logger.debug('\tEOR Goals approx value: %s', approx_eor_pts)
+            logger.debug('\tEggs approx value: %s', approx_egg_pts)
+            logger.debug('\tCaches approx value: %s', approx_cache_pts)
+            logger.debug('\tTucks approx value: %s', approx_tuck_pts)
+            logger.debug('\tNectar approx value: %s', approx_nectar_pts)
+            logger.debug('\tDuet Token approx value: %s', approx_duet_token_pts)
+
+    def findDetailedScorePixelCount(self, img_hsv, lower_hsv, upper_hsv):
+        # Apply the mask to the HSV image
         img_mask = cv2.inRange(img_hsv, lower_hsv, upper_hsv)
 
         # The white pixels are for the color of the score that we are looking for.
         img_white_pixels = np.count_nonzero(img_mask)
         return img_white_pixels
 
-    def findNectarPixelCount(self, img_detailed_scores, lower_hsv, upper_hsv):
+    def findNectarPixelCount(self, img_hsv, lower_hsv, upper_hsv):
         # Ignore the leftmost 10% of the image because if players use the sakura background then
         # there is a small chance that false nectar pixels could be detected on a BASE_EE board.
-        img_h, img_w, c = img_detailed_scores.shape
-        img_detailed_scores_trim = img_detailed_scores[:, int(img_w/10):]
+        img_h, img_w, c = img_hsv.shape
+        img_hsv_trim = img_hsv[:, int(img_w/10):]
 
-        img_white_pixels = self.findDetailedScorePixelCount(img_detailed_scores_trim, lower_hsv, upper_hsv)
+        img_white_pixels = self.findDetailedScorePixelCount(img_hsv_trim, lower_hsv, upper_hsv)
 
         return img_white_pixels
 
+    @timeStage
     def decipherDetailedScores(self):
         # Figure out each player's detailed scores within the detailed score region.
         # Use template matching to find the individual digits in the detailed scores.
@@ -1218,7 +1281,7 @@ class Scoreboard:
         for player in self.players_dict:
             total_digits = self.players_dict[player].decipherDetailedScore()
             if total_digits == 0:
-                print('ERROR - Player', self.players_dict[player].name, 'No final score digits detected')
+                logger.debug('ERROR - Player %s No final score digits detected', self.players_dict[player].name)
                 return False
         return True
 
@@ -1243,14 +1306,12 @@ class Scoreboard:
                 else:
                     color = (255, 0, 255)  # Magenta
 
-                cv2.rectangle(self.img_scoreboard_bgr,
-                              pt1=(new_x, new_y),
-                              pt2=(new_x + digit_w, new_y + digit_h),
-                              color=color, thickness=2)
+                self.annotations.addRectangle(pt1=(new_x, new_y),
+                                              pt2=(new_x + digit_w, new_y + digit_h),
+                                              color=color, thickness=2)
 
+    @timeStage
     def comparePlayerScores(self):
-        print('\n\n')
-
         # TODO returns????
         #self.scoreboard_correct = True # 11-11-23 This was commented out to ignore details for the bot, it should be re-added and improved later
         # TODO This is used for testing, results, output, and display
@@ -1258,3 +1319,8 @@ class Scoreboard:
 
         for player in self.players_dict:
             self.players_dict[player].compareFinalAndDetailedScores()
+
+            # Each comparison after the first is a recursive correction of the detailed scores.
+            comparison_count = self.players_dict[player].comparison_count
+            countEvent('score_comparisons', comparison_count)
+            countMaxEvent('score_comparison_depth', comparison_count)
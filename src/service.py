@@ -0,0 +1,239 @@
+import logging
+import os
+import time
+import json
+import uuid
+import argparse
+import threading
+from enum import Enum
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor, wait as waitFutures
+
+from src.utils.utils import Mode
+from src.scoreboard_reader.scorebird import scorebird, initBatchWorker
+from src.gameboard_reader.boardbird import boardbird
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, pipeline, image):
+        # A submitted screenshot and its result once a worker has read it.
+        self.job_id = job_id
+        self.pipeline = pipeline  # 'scorebird' or 'boardbird'
+        self.image = image
+        self.submitted = time.time()
+        self.finished = None
+        self.future = None
+
+    def getStatus(self):
+        if self.future.done():
+            return 'failed' if self.future.exception() is not None else 'done'
+        return 'running' if self.future.running() else 'queued'
+
+    def toDict(self):
+        job_dict = {'job_id': self.job_id, 'pipeline': self.pipeline, 'image': self.image, 'status': self.getStatus()}
+        if self.future.done():
+            exception = self.future.exception()
+            if exception is not None:
+                job_dict['error'] = f'{self.pipeline} failed with {exception!r}'
+            else:
+                job_dict['result'] = self.future.result()
+            job_dict['seconds'] = round(self.finished - self.submitted, 3) if self.finished else None
+        return job_dict
+
+
+class ScoringService:
+    def __init__(self, workers=None, max_queue=32, job_ttl=600):
+        # Reads screenshots in a pool of worker processes that keep their templates and tesseract APIs loaded.
+        # At most max_queue jobs can be waiting or running at once, more are refused so that a burst of
+        # submissions is pushed back to the caller instead of piling up. Finished jobs are kept for job_ttl
+        # seconds so their results can be fetched.
+        self.num_workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.job_ttl = job_ttl
+
+        self.lock = threading.Lock()
+        self.jobs = {}  # Job id -> Job
+        self.num_unfinished = 0
+        self.executor = ProcessPoolExecutor(max_workers=self.num_workers, initializer=initBatchWorker)
+
+    def warmUp(self):
+        # Start every worker process now so the first submissions don't wait for templates and tesseract to load.
+        waitFutures([self.executor.submit(time.sleep, 0.1) for _ in range(self.num_workers)])
+        return self.num_workers
+
+    def submit(self, pipeline, image, mentioned_players=None, get_details=True):
+        # Queue a screenshot (a filename or url) to be read, raising ServiceBusy if the queue is full.
+        if pipeline not in ('scorebird', 'boardbird'):
+            raise ValueError(f'Unknown pipeline {pipeline!r}')
+
+        with self.lock:
+            self.removeExpiredJobs()
+            if self.num_unfinished >= self.max_queue:
+                raise ServiceBusy(f'{self.num_unfinished} jobs are already queued')
+            self.num_unfinished += 1
+
+        job = Job(uuid.uuid4().hex, pipeline, image)
+        try:
+            job.future = self.executor.submit(readServiceImage, pipeline, image, mentioned_players, get_details)
+        except Exception:
+            with self.lock:
+                self.num_unfinished -= 1
+            raise
+
+        with self.lock:
+            self.jobs[job.job_id] = job
+        job.future.add_done_callback(lambda future: self.finishJob(job))
+        return job
+
+    def finishJob(self, job):
+        with self.lock:
+            job.finished = time.time()
+            self.num_unfinished -= 1
+        if job.future.exception() is not None:
+            logger.warning('Service job exception: %s %s', job.image, job.future.exception())
+
+    def removeExpiredJobs(self):
+        # Must be called with the lock held.
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished is not None and now - job.finished > self.job_ttl]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def getJob(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def waitJob(self, job_id, timeout=None):
+        # Wait for a job to finish, returning the job (finished or not after the timeout) or None if it is unknown.
+        job = self.getJob(job_id)
+        if job is not None:
+            waitFutures([job.future], timeout=timeout)
+        return job
+
+    def getStats(self):
+        with self.lock:
+            return {'workers': self.num_workers, 'max_queue': self.max_queue,
+                    'unfinished': self.num_unfinished, 'jobs': len(self.jobs)}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def readServiceImage(pipeline, image, mentioned_players, get_details):
+    # Run in a worker process. The result cache is used (if it's enabled) since resubmitted screenshots are common.
+    if pipeline == 'scorebird':
+        return scorebird(image, mentioned_players=mentioned_players, get_details=get_details, mode=Mode.NO_DISPLAY)
+
+    result = boardbird(image, mode=Mode.NO_DISPLAY)
+    # Boardbird returns an error message instead of a dictionary when the board isn't found.
+    return result if isinstance(result, dict) else {'error': result}
+
+
+def toJson(value):
+    # Results include Version enums, which are sent as their names.
+    return json.dumps(value, default=lambda o: o.name if isinstance(o, Enum) else str(o)).encode()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    # POST /scorebird or /boardbird with a JSON body of {"image": filename or url, "mentioned_players": [...],
+    #  "get_details": true} queues a job and returns its job id (202), or 503 if the queue is full.
+    # GET /jobs/<job id> returns the job's status ('queued', 'running', 'done' or 'failed') and its result once done.
+    # GET /jobs/<job id>/wait?timeout=30 waits up to the timeout for the job to finish before returning it.
+    # GET /health returns the number of workers and queued jobs.
+    service: ScoringService = None
+    max_wait = 120
+
+    def do_POST(self):
+        pipeline = urlparse(self.path).path.strip('/')
+        if pipeline not in ('scorebird', 'boardbird'):
+            return self.sendJson(404, {'error': f'Unknown path {self.path}'})
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            image = body['image']
+        except (ValueError, KeyError, TypeError):
+            return self.sendJson(400, {'error': 'The body must be a JSON object with an "image" filename or url'})
+
+        try:
+            job = self.service.submit(pipeline, image, body.get('mentioned_players'), body.get('get_details', True))
+        except ServiceBusy as e:
+            return self.sendJson(503, {'error': f'Busy: {e}'}, {'Retry-After': '5'})
+        self.sendJson(202, job.toDict(), {'Location': f'/jobs/{job.job_id}'})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+
+        if parts == ['health']:
+            return self.sendJson(200, self.service.getStats())
+
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = self.service.getJob(parts[1])
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'wait':
+            try:
+                timeout = min(float(parse_qs(url.query).get('timeout', [self.max_wait])[0]), self.max_wait)
+            except ValueError:
+                return self.sendJson(400, {'error': 'The timeout must be a number of seconds'})
+            job = self.service.waitJob(parts[1], timeout)
+        else:
+            return self.sendJson(404, {'error': f'Unknown path {self.path}'})
+
+        if job is None:
+            return self.sendJson(404, {'error': 'Unknown or expired job'})
+        self.sendJson(200, job.toDict())
+
+    def sendJson(self, status, value, headers=None):
+        body = toJson(value)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, header in (headers or {}).items():
+            self.send_header(name, header)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug('%s %s', self.address_string(), format % args)
+
+
+def createServer(service: ScoringService, host='127.0.0.1', port=8765):
+    # Create the HTTP server for a scoring service. Each request is handled in its own thread,
+    # so clients waiting on jobs don't block new submissions.
+    handler = type('BoundServiceRequestHandler', (ServiceRequestHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Serve scorebird and boardbird over a local HTTP API.')
+    parser.add_argument('--host', default='127.0.0.1', help='The address to listen on, only this machine by default')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-w', '--workers', type=int, help='The number of worker processes, defaults to the number of CPUs')
+    parser.add_argument('-q', '--max-queue', type=int, default=32, help='The number of jobs that can wait or run at once')
+    args = parser.parse_args(args)
+
+    service = ScoringService(args.workers, args.max_queue)
+    num_workers = service.warmUp()
+    server = createServer(service, args.host, args.port)
+    logger.info('Serving on %s:%s with %s workers', args.host, args.port, num_workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    # Usage: python -m src.service [--port 8765] [--workers 4] [--max-queue 32]
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    main()
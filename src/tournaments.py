@@ -1,19 +1,98 @@
+import logging
 import os
 import json
+import hashlib
+import threading
 from pathlib import Path
 
+from src.utils.name_index import NameIndex
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerRoster:
+    def __init__(self, player_file):
+        # The signed up players read from a players JSON file. The file is only read again
+        # when it changes on disk (IE new signups), otherwise every lookup uses the loaded roster.
+        self.player_file = player_file
+        self.file_signature = None
+        self.version = 0  # Increases every time the roster is reloaded
+        self.content_hash = None  # The hash of the players file contents, which stays the same between processes
+        self.lock = threading.Lock()
+
+        self.player_dict = {}  # Discord user id -> player data
+        self.wingspan_names_dict = {}  # Discord user id -> list of wingspan names
+        self.discord_user_dict = {}  # Wingspan name -> discord user id of the first player with that name
+        self.player_list = []  # Every wingspan name in file order
+        self.player_name_index = None
+
+    def getFileSignature(self):
+        stat = os.stat(self.player_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        # Reload the roster if the players file was modified since it was last read.
+        file_signature = self.getFileSignature()
+        if file_signature == self.file_signature:
+            return self
+
+        with self.lock:
+            if file_signature != self.file_signature:
+                with open(self.player_file, 'rb') as f:
+                    data = f.read()
+                self.load(json.loads(data), hashlib.sha256(data).hexdigest())
+                self.file_signature = file_signature
+        return self
+
+    def load(self, player_dict, content_hash=None):
+        wingspan_names_dict = {}
+        discord_user_dict = {}
+        player_list = []
+        for player in player_dict:
+            wingspan_names = player_dict[str(player)]['wingspan name']
+            if not isinstance(wingspan_names, list):
+                wingspan_names = [wingspan_names]
+
+            wingspan_names_dict[str(player)] = wingspan_names
+            for wingspan_name in wingspan_names:
+                discord_user_dict.setdefault(wingspan_name, str(player))
+                player_list.append(wingspan_name)
+
+        # Replace the lookup tables instead of modifying them so that other threads never see a half built table.
+        self.player_dict = player_dict
+        self.wingspan_names_dict = wingspan_names_dict
+        self.discord_user_dict = discord_user_dict
+        self.player_list = player_list
+        self.player_name_index = None
+        self.content_hash = content_hash
+        self.version += 1
+
+    def getNameIndex(self) -> NameIndex:
+        # Get the spell checking index of every wingspan name, created the first time it is needed.
+        player_name_index = self.player_name_index
+        if player_name_index is None:
+            player_name_index = NameIndex(self.player_list)
+            self.player_name_index = player_name_index
+        return player_name_index
 
-def getPlayerDict():
-    # Get the dictionary of player name aliases.
-    src_dir = os.path.dirname(os.path.abspath(__file__))
-    scorebird_dir = os.path.dirname(src_dir)
 
-    player_file = str(Path(os.path.join(scorebird_dir, 'signups/players.json')))
+def getPlayerRoster() -> PlayerRoster:
+    # Get the roster of signed up players, reloading it if signups/players.json has changed.
+    return player_roster.refresh()
 
-    with open(player_file) as f:
-        player_dict = json.load(f)
 
-    return player_dict
+def configurePlayerRoster(player_file=None):
+    # Read the signed up players from another players JSON file, IE for benchmarks with their own players.
+    # None goes back to signups/players.json.
+    global player_roster
+    player_roster = PlayerRoster(player_file if player_file is not None else getPlayerFile())
+    return player_roster
+
+
+def getPlayerDict():
+    # Get the dictionary of player name aliases.
+    # The dictionary is shared between callers, so it should not be modified.
+    return getPlayerRoster().player_dict
 
 
 def getWingspanNameFromDiscordUser(discord_user_id):
@@ -26,43 +105,40 @@ def getWingspanNameFromDiscordUser(discord_user_id):
     else:
         return None
 
+
 def getWingspanPlayerList(mentioned_players=None):
     # Get the wingspan names for all mentioned players
-    player_list = []
-    player_dict = getPlayerDict()
+    roster = getPlayerRoster()
 
     # If there are mentioned players, just use those players instead of the entire player_dict
     if mentioned_players:
+        player_list = []
         for user_id in mentioned_players:
             user_id = str(user_id)
-            if user_id in player_dict:
-                if isinstance(player_dict[user_id]['wingspan name'], list):
-                    for wingspan_name in player_dict[user_id]['wingspan name']:
-                        player_list.append(wingspan_name)
-                else:
-                    player_list.append(player_dict[user_id]['wingspan name'])
+            if user_id in roster.wingspan_names_dict:
+                player_list.extend(roster.wingspan_names_dict[user_id])
+        return player_list
 
-    else:
-        for player in player_dict:
-            if isinstance(player_dict[str(player)]['wingspan name'], list):
-                for wingspan_name in player_dict[str(player)]['wingspan name']:
-                    player_list.append(wingspan_name)
-            else:
-                player_list.append(player_dict[str(player)]['wingspan name'])
+    return list(roster.player_list)
+
+
+def getWingspanPlayerNameIndex() -> NameIndex:
+    # Get the spell checking index of every signed up player's wingspan names.
+    return getPlayerRoster().getNameIndex()
 
-    return player_list
 
 def getDiscordUserFromWingspanName(wingspan_name):
     # Get the discord user id given a wingspan name
-    player_dict = getPlayerDict()
+    discord_user = getPlayerRoster().discord_user_dict.get(wingspan_name)
+    if discord_user is None:
+        logger.debug('Discord user not found with wingspan name: %s', wingspan_name)
+    return discord_user
+
+
+def getPlayerFile():
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    scorebird_dir = os.path.dirname(src_dir)
+    return str(Path(os.path.join(scorebird_dir, 'signups/players.json')))
 
-    for player in player_dict:
-        if isinstance(player_dict[str(player)]['wingspan name'], list):
-            if wingspan_name in player_dict[str(player)]['wingspan name']:
-                return str(player)
-        else:
-            if player_dict[str(player)]['wingspan name'] == wingspan_name:
-                return str(player)
 
-    print('Discord user not found with wingspan name:', wingspan_name)
-    return None
+player_roster = PlayerRoster(getPlayerFile())
@@ -0,0 +1,32 @@
+import cv2
+from typing import List, Tuple
+
+
+class Rectangle:
+    def __init__(self, pt1, pt2, color, thickness=2):
+        self.pt1 = tuple(pt1)
+        self.pt2 = tuple(pt2)
+        self.color = color
+        self.thickness = thickness
+
+
+class Annotations:
+    def __init__(self):
+        # The rectangles drawn around what a reader found, IE matched templates, digits and names, for displaying
+        # and debugging. They are only recorded while reading and drawn onto a copy of the image when it's
+        # requested, so reading without displaying (IE the bot) never copies or draws on the image.
+        self.rectangles: List[Rectangle] = []
+
+    def addRectangle(self, pt1: Tuple[int, int], pt2: Tuple[int, int], color, thickness=2):
+        self.rectangles.append(Rectangle(pt1, pt2, color, thickness))
+
+    def clear(self):
+        self.rectangles.clear()
+
+    def render(self, image):
+        # Draw the rectangles in the order they were added onto a copy of the image, so later rectangles
+        # (IE the recolored digits of fixed detailed scores) are drawn over earlier ones.
+        img_annotated = image.copy()
+        for rectangle in self.rectangles:
+            cv2.rectangle(img_annotated, rectangle.pt1, rectangle.pt2, rectangle.color, thickness=rectangle.thickness)
+        return img_annotated
@@ -0,0 +1,76 @@
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+from src.utils.utils import Version
+
+HsvRange = Tuple[Tuple[int, int, int], Tuple[int, int, int]]
+
+
+class ColorClassifier:
+    def __init__(self, color_ranges: Dict[str, HsvRange]):
+        # Labels every pixel of an HSV image with the color classes its value is in, in one pass instead of
+        # masking the image once per class with cv2.inRange. The ranges are inclusive like cv2.inRange's.
+        # Some of the ranges overlap, so each label is a bit field of classes (one bit per class, up to 8)
+        # so that a pixel is counted for every range it's in, the same as the separate masks counted it.
+        if len(color_ranges) > 8:
+            raise ValueError('A color classifier can only have up to 8 color classes')
+        self.names = list(color_ranges)
+
+        # Every range is a box in HSV space, so the lookup table is split into one table per channel of the
+        # classes each channel value is in. A pixel's label is the classes all 3 of its channel values are in.
+        self.channel_luts = [np.zeros(256, dtype=np.uint8) for _ in range(3)]
+        for bit, (lower_hsv, upper_hsv) in enumerate(color_ranges.values()):
+            for lut, lower, upper in zip(self.channel_luts, lower_hsv, upper_hsv):
+                lut[lower:upper + 1] |= 1 << bit
+
+        # The labels which include each class, to sum that class's count out of the label counts.
+        labels = np.arange(256)
+        self.class_labels = [np.flatnonzero(labels & (1 << bit)) for bit in range(len(self.names))]
+
+    def labelPixels(self, img_hsv):
+        h, s, v = cv2.split(img_hsv)
+        h_labels, s_labels, v_labels = (cv2.LUT(channel, lut) for channel, lut in zip((h, s, v), self.channel_luts))
+        return cv2.bitwise_and(cv2.bitwise_and(h_labels, s_labels), v_labels)
+
+    def countLabels(self, labels) -> Dict[str, int]:
+        # Count the pixels of every class at once from the labels' histogram.
+        label_counts = np.bincount(labels.ravel(), minlength=256)
+        return {name: int(label_counts[class_labels].sum()) for name, class_labels in zip(self.names, self.class_labels)}
+
+    def countPixels(self, img_hsv) -> Dict[str, int]:
+        return self.countLabels(self.labelPixels(img_hsv))
+
+
+# The colors of each detailed score in the colored 'counting up' bar above the detailed scores.
+base_ee_detail_ranges: Dict[str, HsvRange] = {
+    'bird_pts': ((47, 4, 0), (100, 70, 225)),  # Gray
+    'bonus': ((30, 40, 165), (50, 140, 255)),  # Green
+    'eor': ((23, 50, 170), (35, 135, 255)),  # Yellow
+    'eggs': ((14, 72, 170), (22, 255, 255)),  # Orange
+    'caches': ((8, 40, 170), (13, 95, 255)),  # Red
+    'tucks': ((145, 20, 140), (175, 50, 255)),  # Purple
+}
+
+# OE era colorations are slightly different, plus nectar and duet tokens are added.
+oe_detail_ranges: Dict[str, HsvRange] = {
+    'bird_pts': ((47, 4, 0), (100, 70, 225)),  # Gray
+    'bonus': ((30, 40, 165), (50, 140, 255)),  # Green
+    'eor': ((23, 50, 170), (35, 135, 255)),  # Yellow
+    'eggs': ((16, 50, 175), (22, 80, 255)),  # Tan
+    'caches': ((12, 72, 190), (16, 90, 255)),  # Red
+    'tucks': ((120, 10, 150), (164, 65, 255)),  # Purple
+    'nectar': ((160, 48, 180), (176, 150, 255)),  # Pink, lower was (160, 55, 180) until some 24 bit images broke nectar
+    'duet_tokens': ((5, 62, 210), (10, 90, 255)),  # Reddish, was (5, 70, 212), (10, 90, 255)
+}
+
+
+def getDetailClassifier(version: Version) -> ColorClassifier:
+    # Get the classifier of a version's detailed score colors.
+    return base_ee_detail_classifier if version == Version.BASE_EE else oe_detail_classifier
+
+
+# The lookup tables are only 3 * 256 bytes, so they are built once when imported and shared.
+base_ee_detail_classifier = ColorClassifier(base_ee_detail_ranges)
+oe_detail_classifier = ColorClassifier(oe_detail_ranges)
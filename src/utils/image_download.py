@@ -0,0 +1,131 @@
+import logging
+import os
+import asyncio
+import threading
+import urllib.request
+import urllib.error
+from http.client import IncompleteRead
+
+from src.utils.image_source import isInMemoryImage
+
+# aiohttp is optional. It is imported here instead of on the first download so importing it doesn't stall the event loop.
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+user_agent = 'Mozilla/5.0'
+
+
+class ImageDownloader:
+    def __init__(self, timeout=10, attempts=3, backoff=0.5, max_backoff=8.0, max_connections=8):
+        # Downloads screenshots without blocking the event loop. With aiohttp installed (discord.py already
+        # requires it) one session is kept per event loop so connections to the same host (IE Discord's CDN)
+        # are kept alive and reused. Without aiohttp each download runs urllib in the loop's default executor.
+        # Failed downloads that may work if tried again (IE incomplete reads, timeouts or server errors) are
+        # retried after backoff, 2 * backoff, 4 * backoff ... seconds up to max_backoff, without blocking the loop.
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_connections = max_connections
+
+        self.lock = threading.Lock()
+        self.sessions = {}  # Event loop -> aiohttp session
+
+    async def download(self, url) -> bytes:
+        # Download an image's bytes, raising the last exception if every attempt failed.
+        for attempt in range(self.attempts):
+            try:
+                return await self.downloadOnce(url)
+            except Exception as e:
+                if not isRetryable(e) or attempt + 1 == self.attempts:
+                    raise
+                delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+                logger.warning('Download exception: %s, retrying in %s s', e, delay)
+                await asyncio.sleep(delay)
+
+    async def downloadOnce(self, url):
+        session = self.getSession()
+        if session is None:
+            return await asyncio.get_running_loop().run_in_executor(None, downloadBlocking, url, self.timeout)
+
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    def getSession(self):
+        # Get the aiohttp session of the running event loop, or None if aiohttp isn't installed.
+        if aiohttp is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            # Sessions of closed event loops can't be used or closed anymore, so they are dropped.
+            for closed_loop in [other for other in self.sessions if other.is_closed()]:
+                del self.sessions[closed_loop]
+
+            session = self.sessions.get(loop)
+            if session is None or session.closed:
+                session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=self.max_connections),
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    headers={'User-Agent': user_agent})
+                self.sessions[loop] = session
+            return session
+
+    async def close(self):
+        # Close the running event loop's session, IE when the bot shuts down.
+        with self.lock:
+            session = self.sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+async def downloadImageSource(source):
+    # Download a url image with the process wide downloader. Local files and in memory images are returned
+    # as they are to be read by the readers, and None is returned if the download failed.
+    if isInMemoryImage(source) or os.path.exists(source):
+        return source
+    try:
+        return await getImageDownloader().download(source)
+    except Exception as e:
+        logger.warning('Download exception: %s', e)
+        return None
+
+
+def downloadBlocking(url, timeout):
+    req = urllib.request.Request(url, data=None, headers={'User-Agent': user_agent})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.read()
+
+
+def isRetryable(e):
+    # Incomplete reads, dropped connections, timeouts and server errors may work when tried again,
+    # but other errors (IE a 404 or an invalid url) won't.
+    status = getattr(e, 'status', None) or getattr(e, 'code', None)
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    if isinstance(e, (IncompleteRead, ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(e, urllib.error.URLError):
+        return isinstance(e.reason, (ConnectionError, TimeoutError))
+    if aiohttp is None:
+        return False
+    return isinstance(e, (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError))
+
+
+def getImageDownloader():
+    return image_downloader
+
+
+def configureImageDownloader(**kwargs):
+    # Replace the process wide image downloader, IE to change its timeout, attempts or backoff.
+    global image_downloader
+    image_downloader = ImageDownloader(**kwargs)
+    return image_downloader
+
+
+image_downloader = ImageDownloader()
@@ -0,0 +1,66 @@
+import os
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def isInMemoryImage(source):
+    # Whether an image source is already in memory instead of being a filename or url to read.
+    return not isinstance(source, (str, os.PathLike))
+
+
+def readImageSource(source):
+    # Read an in memory image: the encoded bytes of an image (bytes, bytearray or memoryview), a binary
+    # file-like object, or an already decoded BGR, BGRA or grayscale numpy array. Returns None if it can't be read.
+    if isinstance(source, np.ndarray):
+        return normalizeImage(source)
+
+    if hasattr(source, 'getbuffer'):
+        # Decode an io.BytesIO from its own buffer instead of reading a copy of it.
+        with source.getbuffer() as buffer:
+            return decodeImage(buffer[source.tell():])
+
+    if hasattr(source, 'read'):
+        return decodeImage(source.read())
+    return decodeImage(source)
+
+
+def decodeImage(data):
+    # Decode an encoded image (IE a PNG or JPEG) from its bytes without copying them, or None if it can't be decoded.
+    try:
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    except (cv2.error, TypeError, ValueError) as e:
+        logger.warning('Image decoding exception: %s', e)
+        return None
+    return normalizeImage(img)
+
+
+def normalizeImage(img):
+    # Convert an image to the 8 bit, 3 or 4 channel format the readers expect.
+    if img is None or img.size == 0:
+        return None
+
+    # Some (likely mobile?) Discord upload images are higher definition, have more bits per pixel,
+    # or have another (alpha?) channel which need to be converted to the standard format here.
+    if img.dtype != np.uint8:
+        if np.max(img) > 255:
+            logger.debug('Converting a 16+ bit image to 8 bits')
+            img = img / 256
+        img = img.astype('uint8')
+
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img
+
+
+def describeImageSource(source):
+    # Describe where an image is from for logging, without logging an in memory image's contents.
+    if isinstance(source, np.ndarray):
+        return f'<{"x".join(map(str, source.shape))} image array>'
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f'<{memoryview(source).nbytes} image bytes>'
+    if isInMemoryImage(source):
+        return f'<image file {getattr(source, "name", type(source).__name__)}>'
+    return str(source)
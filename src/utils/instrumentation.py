@@ -0,0 +1,141 @@
+import logging
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class Timings:
+    def __init__(self, pipeline):
+        # The time spent in each stage of reading one image (IE 'findScoreboardFeathers') and counters
+        # of how often the readers had to fall back or retry (IE second passes or player name attempts).
+        self.pipeline = pipeline  # 'scorebird' or 'boardbird'
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = {}  # Stage name -> [total seconds, calls]
+        self.counters = {}  # Counter name -> count, or the largest value for maximum counters
+        self.active_spans = {}  # Stage name -> how many calls of it are running (IE recursive second passes)
+
+    @contextmanager
+    def span(self, name):
+        # Time a stage. A stage that calls itself (IE findScoreboardFeathers second passes)
+        # counts every call but only times the outermost call so its time isn't counted twice.
+        depth = self.active_spans.get(name, 0)
+        self.active_spans[name] = depth + 1
+        span_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active_spans[name] = depth
+            span = self.spans.setdefault(name, [0.0, 0])
+            span[1] += 1
+            if depth == 0:
+                span[0] += time.perf_counter() - span_start
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def countMax(self, name, value):
+        # Keep the largest value of a counter, IE the deepest score comparison recursion.
+        self.counters[name] = max(self.counters.get(name, value), value)
+
+    def stop(self):
+        self.end = time.perf_counter()
+
+    def toDict(self):
+        # The timings in milliseconds, as included in the results dictionary and sent to the metrics sink.
+        end = self.end if self.end is not None else time.perf_counter()
+        return {'total_ms': round((end - self.start) * 1000, 3),
+                'spans': {name: {'ms': round(total * 1000, 3), 'calls': calls}
+                          for name, (total, calls) in self.spans.items()},
+                'counters': dict(self.counters)}
+
+
+class MetricsSink:
+    # The interface for receiving the timings of every read image, IE to export them to a monitoring system.
+    # Subclasses override record, which is called in the reading thread (or batch worker process)
+    # after each image, so it should be quick and must not raise.
+    def record(self, pipeline, timings_dict):
+        pass
+
+
+class CallbackMetricsSink(MetricsSink):
+    def __init__(self, callback):
+        # A metrics sink that calls a function with the pipeline name and timings dictionary.
+        self.callback = callback
+
+    def record(self, pipeline, timings_dict):
+        self.callback(pipeline, timings_dict)
+
+
+@contextmanager
+def collectTimings(pipeline):
+    # Collect the timings of the stages run in this block (in this thread or async task),
+    # then send them to the metrics sink if there is one.
+    timings = Timings(pipeline)
+    token = current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        current_timings.reset(token)
+        timings.stop()
+        sink = getMetricsSink()
+        if sink is not None:
+            try:
+                sink.record(pipeline, timings.toDict())
+            except Exception as e:
+                logger.warning('Metrics sink exception: %s', e)
+
+
+def getCurrentTimings():
+    # Get the timings being collected for the image being read, or None outside of scorebird/boardbird.
+    return current_timings.get()
+
+
+def timeStage(func):
+    # Decorate a reader method so that each call is timed as a stage named after the method.
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = current_timings.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        with timings.span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def countEvent(name, n=1):
+    # Count a fallback or retry of the image being read, if timings are being collected.
+    timings = current_timings.get()
+    if timings is not None:
+        timings.count(name, n)
+
+
+def countMaxEvent(name, value):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.countMax(name, value)
+
+
+def getMetricsSink():
+    return metrics_sink
+
+
+def configureMetricsSink(sink: MetricsSink = None):
+    # Set the process wide metrics sink that receives the timings of every read image. None removes it.
+    # The sink is not shared with batch worker processes, which only have the timings in their results.
+    global metrics_sink
+    with metrics_sink_lock:
+        metrics_sink = sink
+    return metrics_sink
+
+
+current_timings = contextvars.ContextVar('current_timings', default=None)
+
+metrics_sink_lock = threading.Lock()
+metrics_sink = None
@@ -0,0 +1,137 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class ScoreboardLayout:
+    def __init__(self, scale, feather_points, feather_size):
+        # The anchor positions learned from a read scoreboard, in the resized scoreboard's coordinates.
+        # The detailed score lines are found from the feather points, so they are not stored separately.
+        self.scale = scale
+        self.feather_points = list(feather_points)
+        self.feather_w, self.feather_h = feather_size
+        self.badge_band = None  # The (top, bottom) y values that the winner badges were found between
+
+    def getFeatherRegions(self, img_w, img_h, radius):
+        # Get the (x1, y1, x2, y2) regions to verify the cached feathers in,
+        # the template size plus the radius around each cached feather point.
+        regions = []
+        for x, y in self.feather_points:
+            regions.append((max(x - radius, 0), max(y - radius, 0),
+                            min(x + self.feather_w + radius, img_w), min(y + self.feather_h + radius, img_h)))
+        return regions
+
+    def getFeatherBands(self, img_w, img_h, radius, left_x):
+        # Get the (x1, y1, x2, y2) regions of the feather column (right of left_x) above, between and below
+        # the cached feather regions. A scoreboard of the same size can have more players than the cached one,
+        # and the extra players' feathers are only outside the cached regions. Each band overlaps its
+        # neighboring feather regions by the feather's height so a feather partly in a cached region is found too.
+        bands = []
+        top = 0
+        for x1, y1, x2, y2 in sorted(self.getFeatherRegions(img_w, img_h, radius), key=lambda region: region[1]):
+            if y1 > top:
+                bands.append((left_x, max(top - self.feather_h, 0), img_w, min(y1 + self.feather_h, img_h)))
+            top = max(top, y2)
+        if top < img_h:
+            bands.append((left_x, max(top - self.feather_h, 0), img_w, img_h))
+        return bands
+
+
+class LayoutCache:
+    def __init__(self, max_entries=256, verify_radius=6, badge_margin=10):
+        # An in memory cache of scoreboard layouts. Most screenshots come from a small set of screen
+        # resolutions, and scoreboards of the same size and version have their feathers and winner badges
+        # in the same places. A cached layout is only a guess, the feathers are still matched in a small
+        # area around each cached point and the whole scoreboard is searched if any of them are missing,
+        # or if there are more feathers (IE more players) in the rest of the feather column.
+        self.max_entries = max_entries
+        self.verify_radius = verify_radius  # Pixels around a cached feather point to match the feather in
+        self.badge_margin = badge_margin  # Pixels above and below the cached winner badges to search
+
+        self.lock = threading.Lock()
+        self.layouts = OrderedDict()  # Layout key -> ScoreboardLayout from least to most recently used
+        self.stats = {'hits': 0, 'misses': 0, 'rejected': 0, 'badge_hits': 0, 'badge_misses': 0}
+
+    def get(self, key):
+        # Get the layout of a scoreboard, or None if no scoreboard with the same key was read yet.
+        with self.lock:
+            layout = self.layouts.get(key)
+            if layout is None:
+                self.stats['misses'] += 1
+                return None
+            self.layouts.move_to_end(key)
+            self.stats['hits'] += 1
+            return layout
+
+    def put(self, key, layout: ScoreboardLayout):
+        with self.lock:
+            self.layouts[key] = layout
+            self.layouts.move_to_end(key)
+            while len(self.layouts) > self.max_entries:
+                self.layouts.popitem(last=False)
+
+    def reject(self, key):
+        # Remove a layout that could not be verified on a scoreboard, so the full search result replaces it.
+        with self.lock:
+            self.stats['rejected'] += 1
+            self.layouts.pop(key, None)
+
+    def setBadgeBand(self, key, badge_points, badge_h):
+        # Store the band of y values that the winner badges were found in for a layout.
+        with self.lock:
+            layout = self.layouts.get(key)
+            if layout is not None and badge_points:
+                top = min(point[1] for point in badge_points) - self.badge_margin
+                bottom = max(point[1] for point in badge_points) + badge_h + self.badge_margin
+                layout.badge_band = (max(top, 0), bottom)
+
+    def countBadgeSearch(self, found):
+        with self.lock:
+            self.stats['badge_hits' if found else 'badge_misses'] += 1
+
+    def getStats(self):
+        # Get the number of layout hits, misses and rejected layouts, and how often the
+        # winner badges were found within a cached badge band.
+        with self.lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self.layouts)
+            return stats
+
+    def clear(self):
+        with self.lock:
+            self.layouts.clear()
+            for name in self.stats:
+                self.stats[name] = 0
+
+
+def getLayoutCache():
+    # Get the process wide layout cache, or None if layout caching is not enabled.
+    # It is enabled by setting the SCOREBIRD_LAYOUT_CACHE environment variable or by calling configureLayoutCache.
+    global layout_cache, layout_cache_checked
+    if not layout_cache_checked:
+        with layout_cache_lock:
+            if not layout_cache_checked:
+                if os.environ.get('SCOREBIRD_LAYOUT_CACHE'):
+                    layout_cache = LayoutCache()
+                layout_cache_checked = True
+    return layout_cache
+
+
+def configureLayoutCache(enabled=True, **kwargs):
+    # Replace the process wide layout cache, IE to change its size or to disable it.
+    global layout_cache, layout_cache_checked
+    with layout_cache_lock:
+        layout_cache = LayoutCache(**kwargs) if enabled else None
+        layout_cache_checked = True
+    return layout_cache
+
+
+def getLayoutCacheStats():
+    # Get the layout cache statistics of this process, or None if layout caching is not enabled.
+    cache = getLayoutCache()
+    return cache.getStats() if cache is not None else None
+
+
+layout_cache_lock = threading.Lock()
+layout_cache = None
+layout_cache_checked = False
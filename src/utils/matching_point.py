@@ -1,27 +1,40 @@
+import logging
+import os
 import cv2
+import threading
 import numpy as np
-from sklearn.cluster import DBSCAN
 from typing import List, Dict, Tuple, ByteString
 
 from src.utils.point import MatchingPoint, Point
+from src.utils.templates import Template
+from src.utils.instrumentation import countEvent
 
+logger = logging.getLogger(__name__)
 
-def findTemplateMatchingPoints(image_bgr: np.ndarray,
-                               template_filename,
-                               threshold: float) -> Dict[Tuple, MatchingPoint]:
-    # Find the points on an image that match the template image above some threshold.
+
+def findTemplateMatchingPoints(image_gray: np.ndarray,
+                               template: Template,
+                               threshold: float,
+                               region: Tuple = None) -> Dict[Tuple, MatchingPoint]:
+    # Find the points on a grayscale image that match the template image above some threshold.
+    # The caller converts the image to grayscale once and shares it between templates,
+    # and the preloaded template image is already grayscale.
+    # If an (x1, y1, x2, y2) region is given, only that region of the image is searched
+    # but the points are still the points of the whole image.
     matching_points_dict = {}
 
-    # Convert base image and template to grayscale in order to perform template matching
-    image_gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-    template = cv2.imread(str(template_filename), cv2.IMREAD_GRAYSCALE)
+    offset_x, offset_y = 0, 0
+    if region is not None:
+        offset_x, offset_y, x2, y2 = region
+        image_gray = image_gray[offset_y:y2, offset_x:x2]
 
     try:
         # Match the template onto the image into resulting points that can match the template
-        res = cv2.matchTemplate(image_gray, template, cv2.TM_CCOEFF_NORMED)
+        res = cv2.matchTemplate(image_gray, template.image, cv2.TM_CCOEFF_NORMED)
 
         # Find points (which are the top-leftmost of the template) where the template matches above the threshold
         loc = np.where(res >= threshold)
+        loc = (loc[0] + offset_y, loc[1] + offset_x)
 
         # The matching points are sorted by ascending y values (the smallest y value is first)
         matching_points = list(zip(*loc[::-1]))
@@ -36,39 +49,211 @@ def findTemplateMatchingPoints(image_bgr: np.ndarray,
     except cv2.error:
         return {}
 
+
+def findTemplateMatchingPointsPyramid(image_gray: np.ndarray,
+                                      template: Template,
+                                      threshold: float,
+                                      region: Tuple = None) -> Dict[Tuple, MatchingPoint]:
+    # Find the same matching points as findTemplateMatchingPoints, but coarse to fine.
+    # The template is first matched on a half sized image with a half sized template using a lower threshold,
+    # then only the full sized areas around those coarse candidates are matched with the full template.
+    # Templates that are too small to be halved (IE the bird card corners) are matched normally.
+    if min(template.w, template.h) < 2 * pyramid_min_template_size:
+        return findTemplateMatchingPoints(image_gray, template, threshold, region)
+
+    offset_x, offset_y = 0, 0
+    if region is not None:
+        offset_x, offset_y, x2, y2 = region
+        image_gray = image_gray[offset_y:y2, offset_x:x2]
+
+    img_h, img_w = image_gray.shape
+    res_h = img_h - template.h + 1
+    res_w = img_w - template.w + 1
+    if res_h <= 0 or res_w <= 0:
+        return {}
+
+    # Find the coarse candidates on the half sized image.
+    image_half = cv2.resize(image_gray, (img_w // 2, img_h // 2), interpolation=cv2.INTER_AREA)
+    try:
+        res_half = cv2.matchTemplate(image_half, template.getHalfImage(), cv2.TM_CCOEFF_NORMED)
+    except cv2.error:
+        return findTemplateMatchingPoints(image_gray, template, threshold, region)
+    candidate_ys, candidate_xs = np.nonzero(res_half >= threshold - pyramid_threshold_margin)
+    if len(candidate_ys) == 0:
+        return {}
+
+    # Mark the full sized points near each candidate, then match the full template
+    # over the bounding box of every connected group of marked points.
+    candidate_mask = np.zeros((res_h, res_w), dtype=np.uint8)
+    candidate_mask[np.minimum(candidate_ys * 2, res_h - 1), np.minimum(candidate_xs * 2, res_w - 1)] = 1
+    size = 2 * pyramid_refine_radius + 1
+    candidate_mask = cv2.dilate(candidate_mask, np.ones((size, size), dtype=np.uint8))
+
+    # Points that were never matched keep the lowest possible value.
+    res = np.full((res_h, res_w), -1.0, dtype=np.float32)
+    num_labels, _, stats, _ = cv2.connectedComponentsWithStats(candidate_mask, connectivity=8)
+    for x, y, w, h, _ in stats[1:num_labels]:
+        window = image_gray[y:y + h + template.h - 1, x:x + w + template.w - 1]
+        res[y:y + h, x:x + w] = cv2.matchTemplate(window, template.image, cv2.TM_CCOEFF_NORMED)
+
+    # The matching points are sorted by ascending y values (the smallest y value is first)
+    matching_points_dict = {}
+    loc = np.where(res >= threshold)
+    matching_value_list = res[loc]
+    loc = (loc[0] + offset_y, loc[1] + offset_x)
+    for point, value in zip(zip(*loc[::-1]), matching_value_list):
+        matching_points_dict[point] = MatchingPoint(point, value)
+
+    return matching_points_dict
+
+
+def findTemplateMatchingPointsInRegion(image_gray: np.ndarray,
+                                       template: Template,
+                                       threshold: float) -> Dict[Tuple, MatchingPoint]:
+    # Find the matching points of a template within the region it is expected to be in (its region prior),
+    # and only search the whole image if nothing matched there. Templates without a region prior
+    # always search the whole image. How often the whole image had to be searched is counted per
+    # template so that the region priors can be tuned (see getRegionSearchStats).
+    if template.region_prior is None:
+        return findTemplateMatchingPointsPyramid(image_gray, template, threshold)
+
+    img_h, img_w = image_gray.shape
+    region = template.region_prior.getSearchRegion(img_w, img_h, template.w, template.h)
+    matching_points_dict = findTemplateMatchingPointsPyramid(image_gray, template, threshold, region)
+
+    fallback = not matching_points_dict
+    with region_search_lock:
+        stats = region_search_stats.setdefault(template.name, {'searches': 0, 'fallbacks': 0})
+        stats['searches'] += 1
+        stats['fallbacks'] += fallback
+
+    if fallback:
+        logger.debug('\tNo matches for %s in its expected region, searching the whole image', template.name)
+        countEvent('region_search_fallbacks')
+        matching_points_dict = findTemplateMatchingPointsPyramid(image_gray, template, threshold)
+    return matching_points_dict
+
+
+def getRegionSearchStats() -> Dict[str, Dict[str, int]]:
+    # Get the number of region searches and whole image fallbacks of each template in this process.
+    with region_search_lock:
+        return {name: dict(stats) for name, stats in region_search_stats.items()}
+
+
+def resetRegionSearchStats():
+    with region_search_lock:
+        region_search_stats.clear()
+
+
+def setClusteringBackend(backend):
+    # Choose how matching points are grouped into clusters.
+    #  'components': Vectorized connected components of the matching points (default)
+    #  'dbscan': The original scikit-learn DBSCAN clustering, scikit-learn is only imported when this is used
+    global clustering_backend
+    if backend not in CLUSTERING_BACKENDS:
+        raise ValueError(f'Unknown clustering backend {backend!r}, expected one of {CLUSTERING_BACKENDS}')
+    clustering_backend = backend
+
+
+def getClusterOffsets(distance):
+    # Get every pixel offset within the cluster distance of a point, but only in one direction
+    # (below, or on the same row to the right) since a neighbor pair only needs to be found once.
+    offsets = cluster_offsets_dict.get(distance)
+    if offsets is None:
+        r = int(distance)
+        dy, dx = np.mgrid[0:r + 1, -r:r + 1]
+        dy, dx = dy.ravel(), dx.ravel()
+        keep = (dx * dx + dy * dy <= distance * distance) & ((dy > 0) | (dx > 0))
+        offsets = (dx[keep], dy[keep])
+        cluster_offsets_dict[distance] = offsets
+    return offsets
+
+
+def findConnectedClusterLabels(points: np.ndarray, distance) -> np.ndarray:
+    # Group integer (x, y) points into clusters where every point is within the distance of another point
+    # in its cluster. This gives the same clusters as DBSCAN(eps=distance, min_samples=1), including
+    # labelling the clusters in the order that their first point appears.
+    num_points = len(points)
+    xs = points[:, 0] - points[:, 0].min()
+    ys = points[:, 1] - points[:, 1].min()
+
+    # Place the index of every point in a grid so that neighboring points can be looked up by offset.
+    grid = np.full((ys.max() + 1, xs.max() + 1), -1, dtype=np.int64)
+    grid[ys, xs] = np.arange(num_points)
+    grid_h, grid_w = grid.shape
+
+    edges_from = []
+    edges_to = []
+    for dx, dy in zip(*getClusterOffsets(distance)):
+        nx = xs + dx
+        ny = ys + dy
+        inside = (nx >= 0) & (nx < grid_w) & (ny < grid_h)
+        neighbors = np.full(num_points, -1, dtype=np.int64)
+        neighbors[inside] = grid[ny[inside], nx[inside]]
+        found = neighbors >= 0
+        edges_from.append(np.nonzero(found)[0])
+        edges_to.append(neighbors[found])
+    edges_from = np.concatenate(edges_from)
+    edges_to = np.concatenate(edges_to)
+
+    # Spread the smallest point index through each cluster until every point in it shares the same label.
+    labels = np.arange(num_points)
+    while True:
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, edges_from, labels[edges_to])
+        np.minimum.at(new_labels, edges_to, labels[edges_from])
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    # Each label is now the index of the first point in its cluster, so sorting
+    # the labels numbers the clusters in the order their first point appears.
+    _, cluster_labels = np.unique(labels, return_inverse=True)
+    return cluster_labels.ravel()
+
+
 def findBestMatchingPoints(matching_points_dict: Dict[Tuple, MatchingPoint]) -> List[Tuple]:
     # Using a matching points dictionary, find the points with the
     # highest matching value within clusters of neighboring points.
     # Often, there will be a few to a dozen points that match a single template above a
     # threshold, but only one of those points in the cluster matches "the best".
 
-    # Use the DBSCAN clustering algorithm to group all matching points into clusters.
+    # Group all matching points into clusters of neighboring points.
     distance = 6
     matching_points_list = [point for point in matching_points_dict]
-    dbscan = DBSCAN(eps=distance, min_samples=1).fit(matching_points_list)
-    cluster_labels = dbscan.labels_
-    num_clusters = max(cluster_labels) + 1
-
-    # Initialize the point clusters list of lists as empty
-    point_clusters = []
-    for i in range(num_clusters):
-        point_clusters.append([])
-
-    # Add the matching points to their point cluster list
-    for i, point in enumerate(matching_points_list):
-        point_clusters[cluster_labels[i]].append(point)
-
-    # Find the point with the maximum matching value for verification and display purposes in each cluster
-    best_matching_points = []
-    for i, point_cluster in enumerate(point_clusters):
-        max_value = 0
-        best_point = None
-        for point in point_cluster:
-            matching_points_dict[point].setCluster(i)
-            point_value = matching_points_dict[point].value
-            if point_value > max_value:
-                max_value = point_value
-                best_point = point
-        best_matching_points.append(best_point)
+    if clustering_backend == 'dbscan':
+        from sklearn.cluster import DBSCAN
+        cluster_labels = DBSCAN(eps=distance, min_samples=1).fit(matching_points_list).labels_
+    else:
+        cluster_labels = findConnectedClusterLabels(np.array(matching_points_list, dtype=np.int64), distance)
+
+    # Find the point with the maximum matching value for verification and display purposes in each cluster.
+    # Sort by cluster, then by the highest value, then by the earliest point for ties so the
+    # first point of each cluster's group is its best point.
+    values = np.array([matching_points_dict[point].value for point in matching_points_list])
+    order = np.lexsort((np.arange(len(values)), -values, cluster_labels))
+    sorted_labels = cluster_labels[order]
+    first_in_cluster = np.ones(len(order), dtype=bool)
+    first_in_cluster[1:] = sorted_labels[1:] != sorted_labels[:-1]
 
+    for point, cluster in zip(matching_points_list, cluster_labels.tolist()):
+        matching_points_dict[point].setCluster(cluster)
+
+    best_matching_points = [matching_points_list[i] for i in order[first_in_cluster]]
     return best_matching_points
+
+
+# Coarse candidates use a lower threshold since half sized matches score a little differently,
+# and each candidate is refined within a few full sized pixels of where it was found.
+pyramid_threshold_margin = 0.1
+pyramid_refine_radius = 3
+pyramid_min_template_size = 10  # The smallest half sized template width or height
+
+region_search_lock = threading.Lock()
+region_search_stats = {}
+
+CLUSTERING_BACKENDS = ('components', 'dbscan')
+cluster_offsets_dict = {}
+clustering_backend = None
+setClusteringBackend(os.environ.get('SCOREBIRD_CLUSTERING', 'components'))
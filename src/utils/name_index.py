@@ -0,0 +1,86 @@
+import difflib
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+class NameIndex:
+    def __init__(self, names: List[str]):
+        # A spell checking index over a list of names (IE player or bird names) for correcting OCR text.
+        # The names are uppercased once and their letter counts are stored so that most names can be ruled
+        # out for a piece of OCR text without running a letter sequence matcher against every name.
+        self.names = [name for name in names if name is not None]
+        self.keys = [name.upper() for name in self.names]
+
+        # The first index of every key is kept for exact matches.
+        self.exact_dict = {}
+        for i, key in enumerate(self.keys):
+            self.exact_dict.setdefault(key, i)
+
+        # A (name, character) matrix of how many times each character appears in each name.
+        self.char_dict = {}
+        for key in self.keys:
+            for char in key:
+                self.char_dict.setdefault(char, len(self.char_dict))
+
+        self.char_counts = np.zeros((len(self.keys), len(self.char_dict)), dtype=np.int32)
+        for i, key in enumerate(self.keys):
+            for char in key:
+                self.char_counts[i, self.char_dict[char]] += 1
+        self.key_lengths = np.array([len(key) for key in self.keys], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def getUpperBounds(self, text):
+        # Get the highest ratio each name could possibly have with the text. A letter sequence matcher can
+        # never match more letters than the two strings have in common, which is the same bound as
+        # difflib's quick_ratio, but calculated for every name at once.
+        text_counts = np.zeros(len(self.char_dict), dtype=np.int32)
+        for char in text:
+            char_index = self.char_dict.get(char)
+            if char_index is not None:
+                text_counts[char_index] += 1
+
+        matches = np.minimum(self.char_counts, text_counts).sum(axis=1)
+        lengths = self.key_lengths + len(text)
+        return 2.0 * matches / np.maximum(lengths, 1)
+
+    def findBestMatch(self, text) -> Tuple[Optional[str], float]:
+        # Find the name with the best letter sequence matcher ratio to the text.
+        # Returns the same name and ratio as checking every name in order with difflib.SequenceMatcher
+        # and keeping the first name with the highest ratio above 0, but only checks the names
+        # that could still beat the best ratio found so far.
+        # Returns: best_name, max_val
+        text = text.strip().upper()
+
+        # If there is a perfect match, then there is no need to try every other possible name.
+        exact_index = self.exact_dict.get(text)
+        if exact_index is not None:
+            return self.names[exact_index], 1.0
+
+        if not self.keys:
+            return None, 0
+
+        # Check the names with the highest possible ratios first. Once a name's best possible ratio
+        # is below the best ratio found, none of the remaining names can be a better match either.
+        upper_bounds = self.getUpperBounds(text)
+        order = np.lexsort((np.arange(len(self.keys)), -upper_bounds))
+
+        max_val = 0
+        best_index = None
+        for i in order:
+            upper_bound = upper_bounds[i]
+            if upper_bound < max_val or upper_bound == 0:
+                break
+            # A tied ratio only wins if the name comes first in the list.
+            if upper_bound == max_val and i > best_index:
+                continue
+
+            ratio = difflib.SequenceMatcher(None, text, self.keys[i]).ratio()
+            if ratio > max_val or (ratio == max_val and best_index is not None and i < best_index):
+                max_val = ratio
+                best_index = i
+
+        if best_index is None:
+            return None, 0
+        return self.names[best_index], max_val
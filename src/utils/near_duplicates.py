@@ -0,0 +1,156 @@
+import os
+import cv2
+import threading
+import numpy as np
+from collections import OrderedDict
+
+
+class ImageFingerprint:
+    def __init__(self, image_gray):
+        # A small perceptual fingerprint of a grayscale image (IE a resized scoreboard).
+        # The thumbnail is a quarter sized copy of the image used to verify possible near duplicates,
+        # and the hash is a 64 bit difference hash of the thumbnail used to find them quickly.
+        self.shape = image_gray.shape
+        img_h, img_w = image_gray.shape
+        self.thumbnail = cv2.resize(image_gray, (max(img_w // 4, 9), max(img_h // 4, 8)), interpolation=cv2.INTER_AREA)
+        self.hash = differenceHash(self.thumbnail)
+
+
+def differenceHash(image_gray):
+    # Each bit is whether a pixel is brighter than its left neighbor in a 9x8 version of the image.
+    small = cv2.resize(image_gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def hammingDistance(hash1, hash2):
+    return bin(hash1 ^ hash2).count('1')
+
+
+class BKTree:
+    def __init__(self):
+        # A tree of hashes where every child is keyed by its hamming distance to its parent, so a search
+        # only has to visit the children whose distance could be within the search distance.
+        self.root = None  # [hash, values, children]
+
+    def add(self, key, value):
+        if self.root is None:
+            self.root = [key, [value], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hammingDistance(key, node[0])
+            if distance == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, [value], {}]
+                return
+            node = child
+
+    def search(self, key, max_distance):
+        # Get the (distance, value) of every value with a hash within the max distance of the key.
+        matches = []
+        if self.root is None:
+            return matches
+
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            distance = hammingDistance(key, node[0])
+            if distance <= max_distance:
+                matches.extend((distance, value) for value in node[1])
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    nodes.append(child)
+        return matches
+
+
+class NearDuplicateIndex:
+    def __init__(self, max_distance=10, max_difference=20, max_entries=512):
+        # An in memory index of recently read images and their results for finding near duplicates,
+        # IE a screenshot that was uploaded again and recompressed along the way.
+        # Possible near duplicates are images with a hash within max_distance bits. Those are only used if
+        # no block of their thumbnails (about the size of a detailed score digit) differs on average by
+        # more than max_difference, so a single changed digit is never treated as the same image.
+        self.max_distance = max_distance
+        self.max_difference = max_difference
+        self.max_entries = max_entries
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # Entry id -> (context, fingerprint, result) from oldest to newest
+        self.trees = {}  # Context -> BKTree of entry ids
+        self.next_entry_id = 0
+
+    def add(self, context, fingerprint: ImageFingerprint, result):
+        # Add the result of an image. The context is everything else that the result depends on
+        # (IE reader options) and only images with the same context can be near duplicates.
+        with self.lock:
+            entry_id = self.next_entry_id
+            self.next_entry_id += 1
+            self.entries[entry_id] = (context, fingerprint, result)
+            self.trees.setdefault(context, BKTree()).add(fingerprint.hash, entry_id)
+
+            # Entries can't be removed from a BK tree, so once the index is full
+            # the oldest half of the entries is dropped and the trees are rebuilt.
+            if len(self.entries) > self.max_entries:
+                for _ in range(len(self.entries) - self.max_entries // 2):
+                    self.entries.popitem(last=False)
+                self.trees = {}
+                for kept_id, (kept_context, kept_fingerprint, _) in self.entries.items():
+                    self.trees.setdefault(kept_context, BKTree()).add(kept_fingerprint.hash, kept_id)
+
+    def find(self, context, fingerprint: ImageFingerprint):
+        # Find the result of a near duplicate image.
+        # Returns: result, distance or None, None if there is no near duplicate
+        with self.lock:
+            tree = self.trees.get(context)
+            if tree is None:
+                return None, None
+            candidates = [(distance, self.entries[entry_id]) for distance, entry_id in
+                          tree.search(fingerprint.hash, self.max_distance)]
+
+        # Verify the closest candidates first.
+        for distance, (_, candidate, result) in sorted(candidates, key=lambda candidate: candidate[0]):
+            if self.isSameImage(fingerprint, candidate):
+                return result, distance
+        return None, None
+
+    def isSameImage(self, fingerprint1: ImageFingerprint, fingerprint2: ImageFingerprint):
+        # Differently sized images were cropped or scaled differently and are never treated as the same image.
+        if fingerprint1.shape != fingerprint2.shape or fingerprint1.thumbnail.shape != fingerprint2.thumbnail.shape:
+            return False
+
+        difference = cv2.absdiff(fingerprint1.thumbnail, fingerprint2.thumbnail).astype(np.float32)
+        block_difference = cv2.blur(difference, (3, 6))
+        return float(block_difference.max()) <= self.max_difference
+
+
+def getNearDuplicateIndex():
+    # Get the process wide near duplicate index, or None if near duplicate detection is not enabled.
+    # It is enabled by setting the SCOREBIRD_NEAR_DUPLICATES environment variable or by calling
+    # configureNearDuplicateIndex.
+    global near_duplicate_index, near_duplicate_index_checked
+    if not near_duplicate_index_checked:
+        with near_duplicate_index_lock:
+            if not near_duplicate_index_checked:
+                if os.environ.get('SCOREBIRD_NEAR_DUPLICATES'):
+                    near_duplicate_index = NearDuplicateIndex()
+                near_duplicate_index_checked = True
+    return near_duplicate_index
+
+
+def configureNearDuplicateIndex(enabled=True, **kwargs):
+    # Replace the process wide near duplicate index, IE to change its distances or to disable it.
+    global near_duplicate_index, near_duplicate_index_checked
+    with near_duplicate_index_lock:
+        near_duplicate_index = NearDuplicateIndex(**kwargs) if enabled else None
+        near_duplicate_index_checked = True
+    return near_duplicate_index
+
+
+near_duplicate_index_lock = threading.Lock()
+near_duplicate_index = None
+near_duplicate_index_checked = False
@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class RectangleLocator:
+    def __init__(self, img_mask):
+        # Count the white pixels in every row and column of a black and white mask once,
+        # so that every rectangle scan of the mask (IE a second pass) can share them.
+        self.img_h, self.img_w = img_mask.shape
+        self.row_counts = np.count_nonzero(img_mask, axis=1)
+        self.col_counts = np.count_nonzero(img_mask, axis=0)
+
+    def findRowEdges(self, required_pixels, border=None):
+        # Find the top and bottom rows with more than the required number of white pixels,
+        # ignoring any rows within the border of the top and bottom of the image.
+        return findEdges(findQualifyingIndexes(self.row_counts, required_pixels, border))
+
+    def findColumnEdges(self, required_pixels, border=None, left_border_gap=None):
+        # Find the left and right columns with more than the required number of white pixels,
+        # ignoring any columns within the border of the left and right of the image.
+        # If a left border gap is given, a white border on the far left of the image that is followed
+        # by a gap wider than the left border gap is skipped over when finding the left column.
+        indexes = findQualifyingIndexes(self.col_counts, required_pixels, border)
+        if left_border_gap is not None:
+            return findEdgesSkippingLeftBorder(indexes, left_border_gap)
+        return findEdges(indexes)
+
+
+def findQualifyingIndexes(counts, required_pixels, border=None):
+    # Get the ascending indexes of the counts over the required pixels, but not within the border of either end.
+    qualifying = counts > required_pixels
+    if border is not None:
+        qualifying[:border + 1] = False
+        qualifying[len(counts) - border:] = False
+    return np.flatnonzero(qualifying)
+
+
+def findEdges(indexes):
+    # Find the (min, max) edges from ascending qualifying indexes. This gives the same edges as scanning
+    # every index with 'if not min_i: min_i = i else: max_i = i', so the very first qualifying index
+    # is the min, the last qualifying index is the max, and a min of 0 is replaced by the next index.
+    num_indexes = len(indexes)
+    if num_indexes == 0:
+        return None, None
+
+    first = int(indexes[0])
+    if first == 0:
+        if num_indexes == 1:
+            return 0, None
+        return int(indexes[1]), int(indexes[-1]) if num_indexes >= 3 else None
+
+    return first, int(indexes[-1]) if num_indexes >= 2 else None
+
+
+def findEdgesSkippingLeftBorder(indexes, gap):
+    # Find the (min, max) edges like findEdges, but if the distance between a qualifying index and the
+    # previous one near the left edge is larger than the gap, use that index to move away from the
+    # leftmost white border or tab.
+    if len(indexes) == 0:
+        return None, None
+
+    previous = np.concatenate(([0], indexes[:-1]))
+    jumps = np.flatnonzero((indexes - previous > gap) & (previous < gap))
+    if len(jumps) == 0:
+        return findEdges(indexes)
+
+    # Every index from the jump onwards is past the left border, so the last index is always the max.
+    return int(indexes[jumps[-1]]), int(indexes[-1])
@@ -0,0 +1,132 @@
+import logging
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    def __init__(self, cache_dir, max_bytes=64 * 1024 * 1024):
+        # A persistent cache of reader results stored in a SQLite database in the cache directory.
+        # Results are keyed by the hash of the image pixels and whatever else changes the result,
+        # so a re-submitted screenshot returns its previous result without reading the image again.
+        # Once the stored results are larger than max_bytes, the least recently used results are removed.
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.db_file = os.path.join(cache_dir, 'results.sqlite3')
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with closing(self.connect()) as connection, connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS results ('
+                               'key TEXT PRIMARY KEY, '
+                               'result BLOB NOT NULL, '
+                               'size INTEGER NOT NULL, '
+                               'last_used REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+
+    def connect(self):
+        # A new connection is used for every call so that the cache can be shared by threads and
+        # batch worker processes, SQLite takes care of locking the database file between them.
+        connection = sqlite3.connect(self.db_file, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def get(self, key):
+        # Get a cached result, or None if the key is not in the cache.
+        with closing(self.connect()) as connection, connection:
+            row = connection.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+
+        try:
+            return pickle.loads(row[0])
+        except Exception as e:
+            logger.warning('Result cache could not read the result for key %s %s', key, e)
+            return None
+
+    def put(self, key, result):
+        # Store a result and remove the least recently used results if the cache is too large.
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+
+        with closing(self.connect()) as connection, connection:
+            connection.execute('INSERT OR REPLACE INTO results (key, result, size, last_used) VALUES (?, ?, ?, ?)',
+                               (key, data, len(data), time.time()))
+            self.evict(connection)
+
+    def evict(self, connection):
+        total_bytes = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        evicted_keys = []
+        for key, size in connection.execute('SELECT key, size FROM results ORDER BY last_used'):
+            if total_bytes <= self.max_bytes:
+                break
+            evicted_keys.append((key,))
+            total_bytes -= size
+        connection.executemany('DELETE FROM results WHERE key = ?', evicted_keys)
+
+    def clear(self):
+        with closing(self.connect()) as connection, connection:
+            connection.execute('DELETE FROM results')
+
+
+def createCacheKey(*parts):
+    # Create a cache key from the parts that can change a result, IE the image pixel hash and reader options.
+    key_hash = hashlib.sha256()
+    key_hash.update(repr(result_cache_version).encode())
+    for part in parts:
+        key_hash.update(repr(part).encode())
+        key_hash.update(b'\0')
+    return key_hash.hexdigest()
+
+
+def hashImage(image):
+    # Hash the decoded pixels of an image, so the same screenshot matches even when it was
+    # saved or uploaded again as a different file.
+    image_hash = hashlib.sha256()
+    image_hash.update(repr((image.shape, image.dtype.str)).encode())
+    image_hash.update(np.ascontiguousarray(image).data)
+    return image_hash.hexdigest()
+
+
+def getResultCache():
+    # Get the process wide result cache, or None if result caching is not enabled.
+    # The cache is enabled by setting the SCOREBIRD_CACHE_DIR environment variable (with an optional
+    # SCOREBIRD_CACHE_MAX_MB size limit) or by calling configureResultCache.
+    global result_cache, result_cache_checked
+    if not result_cache_checked:
+        with result_cache_lock:
+            if not result_cache_checked:
+                cache_dir = os.environ.get('SCOREBIRD_CACHE_DIR')
+                if cache_dir:
+                    max_mb = float(os.environ.get('SCOREBIRD_CACHE_MAX_MB', 64))
+                    result_cache = ResultCache(cache_dir, int(max_mb * 1024 * 1024))
+                result_cache_checked = True
+    return result_cache
+
+
+def configureResultCache(cache_dir, max_bytes=64 * 1024 * 1024):
+    # Replace the process wide result cache. A cache_dir of None disables result caching.
+    global result_cache, result_cache_checked
+    with result_cache_lock:
+        result_cache = ResultCache(cache_dir, max_bytes) if cache_dir is not None else None
+        result_cache_checked = True
+    return result_cache
+
+
+# Increase this when a change to the readers changes their results, so results from the old code aren't used.
+result_cache_version = 1
+
+result_cache_lock = threading.Lock()
+result_cache = None
+result_cache_checked = False
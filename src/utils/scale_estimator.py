@@ -0,0 +1,65 @@
+import logging
+import cv2
+
+from src.utils.templates import Template
+from src.utils.instrumentation import countEvent
+from src.utils.matching_point import findBestMatchingPoints, findTemplateMatchingPoints, findTemplateMatchingPointsInRegion, \
+    findTemplateMatchingPointsPyramid
+
+logger = logging.getLogger(__name__)
+
+
+class ScaleCandidate:
+    def __init__(self, scale, image_bgr, template: Template, threshold, regions=None, search_whole_image=True):
+        # An image resized to one of the candidate scales and the matches of a layout template
+        # (IE the scoreboard feather or the board air icon) on it.
+        # If (x1, y1, x2, y2) regions are given (IE from a cached layout), only those regions are matched.
+        # Otherwise the template's expected region is matched, and the whole image too if nothing matched
+        # there, unless search_whole_image is False.
+        self.scale = scale
+        self.image_bgr = image_bgr
+        self.image_gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+        if regions is None and search_whole_image:
+            self.matching_points_dict = findTemplateMatchingPointsInRegion(self.image_gray, template, threshold)
+        elif regions is None:
+            region = None
+            if template.region_prior is not None:
+                img_h, img_w = self.image_gray.shape
+                region = template.region_prior.getSearchRegion(img_w, img_h, template.w, template.h)
+            self.matching_points_dict = findTemplateMatchingPointsPyramid(self.image_gray, template, threshold, region)
+        else:
+            self.matching_points_dict = {}
+            for region in regions:
+                self.matching_points_dict.update(findTemplateMatchingPoints(self.image_gray, template, threshold, region))
+
+        self.num_matches = 0
+        self.best_value = 0
+        if self.matching_points_dict:
+            self.num_matches = len(findBestMatchingPoints(self.matching_points_dict))
+            self.best_value = max(point.value for point in self.matching_points_dict.values())
+
+
+def estimateScale(image_bgr, sizes, template: Template, threshold, min_matches=1) -> ScaleCandidate:
+    # Find the scale to resize an image to so that a layout template matches it, in a single pass over the sizes.
+    # The sizes are a list of (scale, (width, height)) with the expected scale first, IE from the image ratio.
+    # The expected scale is used if the template matches at least min_matches times there. Otherwise, every
+    # other scale is tried and the one with the most matches (then the best matching value) is used,
+    # instead of running the whole detection again for each scale.
+    # Only the expected scale falls back to searching the whole image, the other scales are only matched
+    # in the template's expected region so that an image without the template (IE not a scoreboard)
+    # doesn't search every scale twice.
+    candidates = []
+    for scale, (width, height) in sizes:
+        resized_bgr = cv2.resize(image_bgr, (width, height))
+        candidate = ScaleCandidate(scale, resized_bgr, template, threshold, search_whole_image=not candidates)
+        logger.debug('\tScale %s W, H: %s %s template matches: %s best value: %.4f',
+                     scale, width, height, candidate.num_matches, candidate.best_value)
+
+        if not candidates and candidate.num_matches >= min_matches:
+            return candidate
+        if not candidates:
+            countEvent('scale_fallbacks')
+        candidates.append(candidate)
+
+    # Sorting is stable, so the earliest (most expected) scale wins any ties.
+    return sorted(candidates, key=lambda c: (min(c.num_matches, min_matches), c.best_value), reverse=True)[0]
@@ -0,0 +1,133 @@
+import os
+import cv2
+import math
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+
+class RegionPrior:
+    def __init__(self, left=0.0, top=0.0, right=1.0, bottom=1.0):
+        # Where a template is expected to match, as fractions of the image's width and height
+        # that the template's top left point should be between.
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+
+    def getSearchRegion(self, img_w, img_h, template_w, template_h):
+        # Get the (x1, y1, x2, y2) pixel region of the image to search, which includes
+        # the size of the template past the right and bottom of the expected region.
+        x1 = max(int(self.left * img_w), 0)
+        y1 = max(int(self.top * img_h), 0)
+        x2 = min(int(math.ceil(self.right * img_w)) + template_w, img_w)
+        y2 = min(int(math.ceil(self.bottom * img_h)) + template_h, img_h)
+        return x1, y1, x2, y2
+
+
+class Template:
+    def __init__(self, name, path):
+        self.name = name  # The path relative to the templates directory IE 'scoreboard/winner_badge.png'
+        self.path = path
+        self.label = Path(path).stem  # The digit for digit templates IE '7' for '7.png'
+        self.region_prior = template_region_priors.get(name)  # None if the template can be anywhere
+
+        # Templates are always matched in grayscale, so only the grayscale image is kept.
+        self.image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if self.image is None:
+            raise FileNotFoundError(f'Template image could not be read: {path}')
+        self.h, self.w = self.image.shape
+
+        # A half sized copy of the template for coarse to fine matching, only created when first needed.
+        self.image_half = None
+
+    def getHalfImage(self):
+        if self.image_half is None:
+            self.image_half = cv2.resize(self.image, (self.w // 2, self.h // 2), interpolation=cv2.INTER_AREA)
+        return self.image_half
+
+
+def getTemplatesDir():
+    # The templates directory sits at the top level of the repository next to the src directory.
+    utils_dir = os.path.dirname(os.path.abspath(__file__))
+    src_dir = os.path.dirname(utils_dir)
+    scorebird_dir = os.path.dirname(src_dir)
+    return Path(os.path.join(scorebird_dir, 'templates'))
+
+
+def getTemplate(name) -> Template:
+    # Get a template by its path relative to the templates directory.
+    # Each template image is only read from disk the first time it is requested.
+    template = template_dict.get(name)
+    if template is None:
+        with template_lock:
+            template = template_dict.get(name)
+            if template is None:
+                template = Template(name, getTemplatesDir() / name)
+                template_dict[name] = template
+    return template
+
+
+def getDigitTemplates(score_type) -> List[Template]:
+    # Get the digit templates for either the 'final_score' or 'detailed_score' digits sorted by their filenames.
+    templates = digit_templates_dict.get(score_type)
+    if templates is None:
+        directory = Path('scoreboard/digits') / score_type
+        filenames = sorted(os.listdir(getTemplatesDir() / directory))
+        templates = [getTemplate((directory / filename).as_posix()) for filename in filenames]
+        digit_templates_dict[score_type] = templates
+    return templates
+
+
+def loadAllTemplates():
+    # Read every template image under the templates directory so that no disk reads happen while matching.
+    templates_dir = getTemplatesDir()
+    for root, _, filenames in os.walk(templates_dir):
+        for filename in sorted(filenames):
+            if filename.endswith('.png'):
+                name = Path(os.path.relpath(os.path.join(root, filename), templates_dir)).as_posix()
+                getTemplate(name)
+
+    getDigitTemplates('final_score')
+    getDigitTemplates('detailed_score')
+    return template_dict
+
+
+def getTemplateVersion():
+    # Get a hash of every template image file under the templates directory.
+    # Results that were read with a different set of templates (IE a cached result) can be told apart by it.
+    global template_version
+    if template_version is None:
+        templates_dir = getTemplatesDir()
+        version_hash = hashlib.sha256()
+        for root, dirnames, filenames in os.walk(templates_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith('.png'):
+                    path = os.path.join(root, filename)
+                    version_hash.update(Path(os.path.relpath(path, templates_dir)).as_posix().encode())
+                    with open(path, 'rb') as f:
+                        version_hash.update(f.read())
+        template_version = version_hash.hexdigest()
+    return template_version
+
+
+# The expected regions of templates that always appear in the same area of a resized scoreboard or board.
+# Scoreboard feathers sit right of each player's final score which moves with the score, so only the far
+# left of the scoreboard is excluded. The winner badge is near the top and the air icon is in the top left.
+template_region_priors: Dict[str, RegionPrior] = {
+    'scoreboard/scoreboard_feather.png': RegionPrior(left=0.2),
+    'scoreboard/scoreboard_feather_oe.png': RegionPrior(left=0.2),
+    'scoreboard/winner_badge.png': RegionPrior(bottom=0.45),
+    'gameboard/board_air.png': RegionPrior(right=0.15, bottom=0.25),
+}
+
+template_lock = threading.Lock()
+template_dict: Dict[str, Template] = {}
+digit_templates_dict: Dict[str, List[Template]] = {}
+template_version = None
+
+# Long running processes (IE a discord bot) can load every template up front instead of on the first image.
+if os.environ.get('SCOREBIRD_PRELOAD_TEMPLATES'):
+    loadAllTemplates()
@@ -0,0 +1,135 @@
+import logging
+import os
+import queue
+import atexit
+import threading
+import tesserocr
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class TesseractPool:
+    def __init__(self, size=1, psm=tesserocr.PSM.AUTO, **api_kwargs):
+        # A thread safe pool of initialized tesseract APIs. Initializing tesseract and loading its
+        # traineddata is slow, so each API is created once (the first time it is needed) and reused.
+        self.size = size
+        self.psm = psm
+        self.api_kwargs = api_kwargs
+
+        self.idle_apis = queue.LifoQueue()
+        self.num_created = 0
+        self.lock = threading.Lock()
+
+    def createApi(self):
+        return tesserocr.PyTessBaseAPI(psm=self.psm, **self.api_kwargs)
+
+    def warmUp(self):
+        # Create every API in the pool up front instead of when they are first checked out.
+        while True:
+            with self.lock:
+                if self.num_created >= self.size:
+                    return
+                self.num_created += 1
+            try:
+                self.idle_apis.put(self.createApi())
+            except Exception:
+                with self.lock:
+                    self.num_created -= 1
+                raise
+
+    def acquire(self, timeout=None):
+        # Use an idle API if there is one, otherwise create a new API if the pool isn't full yet,
+        # otherwise wait for another caller to release their API.
+        try:
+            return self.idle_apis.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            create = self.num_created < self.size
+            if create:
+                self.num_created += 1
+
+        if create:
+            try:
+                return self.createApi()
+            except Exception:
+                with self.lock:
+                    self.num_created -= 1
+                raise
+
+        try:
+            return self.idle_apis.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError('Timed out waiting for a tesseract API from the pool')
+
+    def release(self, api, healthy=True):
+        # Reset the API before the next caller uses it. An API that failed while checked out
+        # is ended instead so that a fresh one gets created the next time one is needed.
+        if healthy:
+            try:
+                api.Clear()
+                api.SetPageSegMode(self.psm)
+                self.idle_apis.put(api)
+                return
+            except Exception as e:
+                logger.warning('Tesseract API reset failed: %s', e)
+
+        try:
+            api.End()
+        finally:
+            with self.lock:
+                self.num_created -= 1
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        # Usage:
+        #   with pool.checkout() as api:
+        #       api.SetImage(image)
+        api = self.acquire(timeout)
+        healthy = False
+        try:
+            yield api
+            healthy = True
+        finally:
+            self.release(api, healthy)
+
+    def close(self):
+        # End every idle API in the pool.
+        while True:
+            try:
+                api = self.idle_apis.get_nowait()
+            except queue.Empty:
+                return
+            api.End()
+            with self.lock:
+                self.num_created -= 1
+
+
+def getTesseractPool() -> TesseractPool:
+    # Get the process wide tesseract pool which is created the first time it is needed.
+    # The pool size can be set with the SCOREBIRD_TESSERACT_POOL_SIZE environment variable.
+    global tesseract_pool
+    if tesseract_pool is None:
+        with tesseract_pool_lock:
+            if tesseract_pool is None:
+                size = int(os.environ.get('SCOREBIRD_TESSERACT_POOL_SIZE', 1))
+                tesseract_pool = TesseractPool(size)
+                atexit.register(tesseract_pool.close)
+    return tesseract_pool
+
+
+def configureTesseractPool(size=1, **kwargs) -> TesseractPool:
+    # Replace the process wide tesseract pool, IE for a bot that reads several images at once on threads.
+    global tesseract_pool
+    with tesseract_pool_lock:
+        if tesseract_pool is not None:
+            tesseract_pool.close()
+        tesseract_pool = TesseractPool(size, **kwargs)
+        atexit.register(tesseract_pool.close)
+    return tesseract_pool
+
+
+tesseract_pool_lock = threading.Lock()
+tesseract_pool = None
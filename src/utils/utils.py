@@ -1,4 +1,3 @@
-import cv2
 from enum import Enum
 from datetime import datetime
 
@@ -15,11 +14,5 @@ class Version(Enum):
     AE_DUET_OE = 3
 
 
-def getImageSize(image_path):
-    template = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
-    w, h = template.shape[::-1]
-    return w, h
-
-
 def timestamp():
     return f'{datetime.now():%Y%m%d%H%M%S}'